@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Script to move reservations that checked out long ago to the cold archive
+
+Reservations (with their guests) that checked out more than --months months ago
+are written to the archive configured by ARCHIVE_URL and then deleted from the
+table. Listings, exports and reports keep returning them from the archive.
+Run it from one place at a time.
+
+Usage: python archive-reservations.py [--hotel loc1] [--months 12] [--dry-run] [--segments 8]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from booking_system.services.reservation_service import archive_reservations
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive past reservations")
+    parser.add_argument('--hotel', help="Only archive reservations of this hotel (location) id")
+    parser.add_argument('--months', type=int, default=None, help="Archive stays that checked out more than this many months ago (ARCHIVE_AFTER_MONTHS)")
+    parser.add_argument('--dry-run', action='store_true', help="Only count what would be archived")
+    parser.add_argument('--segments', type=int, default=8)
+    args = parser.parse_args()
+
+    report = archive_reservations(args.hotel, months=args.months, dry_run=args.dry_run, segments=args.segments)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Script to compare the memory and CPU cost of holding reservations as boto3 item
+dicts and as the compact records the integrity check keeps
+
+Builds synthetic scan items shaped like SCAN_PROJECTION (guest rows included),
+measures the memory retained by each representation with tracemalloc, and times
+the conversion and the integrity checks. Needs no table.
+
+Usage: python benchmark-records.py [--reservations 50000] [--hotels 20] [--rooms 40]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from booking_system.db.sharding import date_partition_key
+from booking_system.models.records import PersonRows, ReservationRecord
+from booking_system.services.integrity import find_orphaned_persons, find_overlaps, find_stale_index_keys
+
+def scan_items(reservations: int, hotels: int, rooms: int):
+    """Items as a parallel scan yields them: fresh strings (''.join copies) and Decimals for every item"""
+    rng = random.Random(42)
+    start = date(2024, 1, 1)
+    for i in range(reservations):
+        hotel_id, room_id = f"loc{rng.randrange(hotels)}", str(100 + rng.randrange(rooms))
+        check_in = start + timedelta(days=rng.randrange(900))
+        key = f"RESERVATION#res_{1700000000000 + i}"
+        guests = rng.randint(1, 3)
+        yield {
+            'PK': key, 'SK': 'METADATA', 'EntityType': 'Reservation',
+            'HotelId': ''.join(hotel_id), 'RoomId': ''.join(room_id),
+            'CheckInDate': check_in.isoformat(), 'CheckOutDate': (check_in + timedelta(days=rng.randint(1, 7))).isoformat(),
+            'IsDeleted': False, 'GuestCount': Decimal(guests),
+            'GSI4PK': f"ROOM#{room_id}", 'GSI4SK': ''.join(key),
+            'GSI5PK': date_partition_key(check_in.isoformat(), hotel_id, key), 'GSI5SK': ''.join(key),
+        }
+        for number in range(1, guests + 1):
+            yield {'PK': ''.join(key), 'SK': f"PERSON#{number}", 'EntityType': 'ReservationPerson'}
+
+def collect(items, convert: bool):
+    reservations, persons = [], PersonRows() if convert else []
+    for item in items:
+        if item['EntityType'] == 'Reservation':
+            reservations.append(ReservationRecord.from_item(item) if convert else item)
+        elif convert:
+            persons.append_item(item)
+        else:
+            persons.append(item)
+    return reservations, persons
+
+def measure(args, convert: bool):
+    """Memory retained by the collected rows, then the time to collect them again untraced"""
+    gc.collect()
+    tracemalloc.start()
+    reservations, persons = collect(scan_items(args.reservations, args.hotels, args.rooms), convert)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del reservations, persons
+
+    gc.collect()
+    started = time.perf_counter()
+    reservations, persons = collect(scan_items(args.reservations, args.hotels, args.rooms), convert)
+    return reservations, persons, time.perf_counter() - started, retained
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compact reservation records against item dicts")
+    parser.add_argument('--reservations', type=int, default=50000)
+    parser.add_argument('--hotels', type=int, default=20)
+    parser.add_argument('--rooms', type=int, default=40)
+    args = parser.parse_args()
+
+    items, persons, collected, retained = measure(args, convert=False)
+    print(f"dicts:   {len(items)} reservations, {len(persons)} guest rows, {retained / 2**20:.1f} MiB retained, generated and collected in {collected:.2f}s")
+    del items, persons
+
+    reservations, persons, collected, retained = measure(args, convert=True)
+    print(f"records: {len(reservations)} reservations, {len(persons)} guest rows, {retained / 2**20:.1f} MiB retained, generated and collected in {collected:.2f}s")
+
+    started = time.perf_counter()
+    issues = find_overlaps(reservations) + find_stale_index_keys(reservations) + find_orphaned_persons(reservations, persons)
+    print(f"checks:  {len(issues)} issues in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Script to check reservations for double bookings, stale index keys and orphaned guest rows
+
+Reads the whole table once with a parallel scan and writes a JSON report to
+stdout (or --output). Exits with status 1 when any issue is found.
+
+Usage: python check-integrity.py [--hotel loc1] [--fix] [--segments 8] [--workers 4] [--rcu 500] [--output report.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from booking_system.services.reservation_service import check_integrity
+
+def main():
+    parser = argparse.ArgumentParser(description="Check reservation integrity")
+    parser.add_argument('--hotel', help="Only check reservations of this hotel (location) id")
+    parser.add_argument('--fix', action='store_true', help="Rewrite stale index keys and delete orphaned guest rows")
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rcu', type=float, default=None, help="Read capacity units per second to stay under")
+    parser.add_argument('--output', help="Report file (defaults to stdout)")
+    args = parser.parse_args()
+
+    report = check_integrity(args.hotel, fix=args.fix, segments=args.segments, workers=args.workers, read_capacity_per_second=args.rcu)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            fh.write(text)
+    else:
+        print(text)
+
+    summary = ', '.join(f"{count} {issue_type}" for issue_type, count in report['counts'].items()) or "no issues"
+    status = "✅" if not report['issues'] else "❌"
+    print(f"{status} {report['reservations_checked']} reservations checked: {summary}", file=sys.stderr)
+    sys.exit(1 if report['issues'] else 0)
+
+if __name__ == "__main__":
+    main()
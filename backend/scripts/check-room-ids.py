@@ -1,38 +1,55 @@
 #!/usr/bin/env python3
 """
 Script to check the actual room IDs in the database
+
+Usage: python check-room-ids.py [--segments 8] [--workers 4] [--rcu 200] [--checkpoint file --job name]
 """
 
-import boto3
-from boto3.dynamodb.conditions import Key
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb', region_name='eu-central-1')
-table = dynamodb.Table('booking-system')
+from booking_system.db.parallel_scan import FileCheckpointStore, ParallelScan
+from booking_system.services.reservation_service import table
 
-def check_room_ids():
+def check_room_ids(args):
     print("Checking room IDs in database...")
-    
+
+    scan = ParallelScan(
+        table,
+        total_segments=args.segments,
+        workers=args.workers,
+        scan_kwargs={
+            'FilterExpression': "EntityType = :entity_type",
+            'ExpressionAttributeValues': {":entity_type": "Room"},
+        },
+        checkpoint_store=FileCheckpointStore(args.checkpoint) if args.checkpoint else None,
+        job_id=args.job,
+        read_capacity_per_second=args.rcu,
+    )
+
     try:
-        # Get all rooms
-        response = table.scan(
-            FilterExpression=Key('EntityType').eq('Room')
-        )
-        
-        rooms = response.get('Items', [])
-        print(f"Total rooms in database: {len(rooms)}")
-        
-        for room in rooms:
+        for room in scan.items():
             pk = room['PK']
             room_id = room.get('RoomId', 'N/A')
             number = room.get('Number', 'N/A')
             location_id = room.get('LocationId', 'N/A')
             gsi2pk = room.get('GSI2PK', 'N/A')
-            
+
             print(f"  - PK: {pk}, RoomId: {room_id}, Number: {number}, LocationId: {location_id}, GSI2PK: {gsi2pk}")
-        
+
+        print(f"Total rooms in database: {scan.items_scanned} ({scan.consumed_capacity:.1f} RCU consumed)")
+
     except Exception as e:
         print(f"Error checking room IDs: {e}")
 
 if __name__ == "__main__":
-    check_room_ids()
+    parser = argparse.ArgumentParser(description="List every room item with a parallel scan")
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rcu', type=float, default=None, help="Read capacity units per second to stay under")
+    parser.add_argument('--checkpoint', help="Checkpoint file; rerun with the same --job to resume")
+    parser.add_argument('--job', default='check-room-ids')
+    check_room_ids(parser.parse_args())
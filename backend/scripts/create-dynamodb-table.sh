@@ -1,7 +1,7 @@
 #!/bin/bash
 
 # Create DynamoDB table for booking system based on SQL schema
-# This script creates a single-table design with 5 Global Secondary Indexes
+# This script creates a single-table design with 6 Global Secondary Indexes
 
 echo "Creating DynamoDB table: booking-system"
 
@@ -20,6 +20,10 @@ aws dynamodb create-table \
         AttributeName=GSI4SK,AttributeType=S \
         AttributeName=GSI5PK,AttributeType=S \
         AttributeName=GSI5SK,AttributeType=S \
+        AttributeName=GSI6PK,AttributeType=S \
+        AttributeName=GSI6SK,AttributeType=S \
+        AttributeName=GSI7PK,AttributeType=S \
+        AttributeName=GSI7SK,AttributeType=S \
     --key-schema \
         AttributeName=PK,KeyType=HASH \
         AttributeName=SK,KeyType=RANGE \
@@ -29,6 +33,8 @@ aws dynamodb create-table \
         'IndexName=GSI3,KeySchema=[{AttributeName=GSI3PK,KeyType=HASH},{AttributeName=GSI3SK,KeyType=RANGE}],Projection={ProjectionType=ALL},ProvisionedThroughput={ReadCapacityUnits=5,WriteCapacityUnits=5}' \
         'IndexName=GSI4,KeySchema=[{AttributeName=GSI4PK,KeyType=HASH},{AttributeName=GSI4SK,KeyType=RANGE}],Projection={ProjectionType=ALL},ProvisionedThroughput={ReadCapacityUnits=5,WriteCapacityUnits=5}' \
         'IndexName=GSI5,KeySchema=[{AttributeName=GSI5PK,KeyType=HASH},{AttributeName=GSI5SK,KeyType=RANGE}],Projection={ProjectionType=ALL},ProvisionedThroughput={ReadCapacityUnits=5,WriteCapacityUnits=5}' \
+        'IndexName=GSI6,KeySchema=[{AttributeName=GSI6PK,KeyType=HASH},{AttributeName=GSI6SK,KeyType=RANGE}],Projection={ProjectionType=ALL},ProvisionedThroughput={ReadCapacityUnits=5,WriteCapacityUnits=5}' \
+        'IndexName=GSI7,KeySchema=[{AttributeName=GSI7PK,KeyType=HASH},{AttributeName=GSI7SK,KeyType=RANGE}],Projection={ProjectionType=ALL},ProvisionedThroughput={ReadCapacityUnits=5,WriteCapacityUnits=5}' \
     --billing-mode PROVISIONED \
     --provisioned-throughput ReadCapacityUnits=5,WriteCapacityUnits=5 \
     --region eu-central-1
@@ -36,6 +42,12 @@ aws dynamodb create-table \
 echo "Waiting for table to be created..."
 aws dynamodb wait table-exists --table-name booking-system --region eu-central-1
 
+echo "Enabling TTL on ExpiresAt..."
+aws dynamodb update-time-to-live \
+    --table-name booking-system \
+    --time-to-live-specification "Enabled=true, AttributeName=ExpiresAt" \
+    --region eu-central-1
+
 echo "Table 'booking-system' created successfully!"
 echo "You can now use the table with the following access patterns:"
 echo ""
@@ -52,3 +64,5 @@ echo "- GSI2: Get all rooms for a location"
 echo "- GSI3: Get all reservations for a user"
 echo "- GSI4: Get all reservations for a room"
 echo "- GSI5: Get reservations by date"
+echo "- GSI6: Search reservations of a hotel by guest name or phone"
+echo "- GSI7: Latest reservations of a hotel by creation time"
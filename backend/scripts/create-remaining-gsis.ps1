@@ -136,6 +136,86 @@ aws dynamodb update-table --table-name booking-system --cli-input-json file://gs
 
 Wait-ForGSI "booking-system" "GSI5" "eu-central-1" "private"
 
+# Create GSI6
+Write-Host "Creating GSI6..."
+$gsi6Config = @{
+    "AttributeDefinitions" = @(
+        @{
+            "AttributeName" = "GSI6PK"
+            "AttributeType" = "S"
+        },
+        @{
+            "AttributeName" = "GSI6SK"
+            "AttributeType" = "S"
+        }
+    )
+    "GlobalSecondaryIndexUpdates" = @(
+        @{
+            "Create" = @{
+                "IndexName" = "GSI6"
+                "KeySchema" = @(
+                    @{
+                        "AttributeName" = "GSI6PK"
+                        "KeyType" = "HASH"
+                    },
+                    @{
+                        "AttributeName" = "GSI6SK"
+                        "KeyType" = "RANGE"
+                    }
+                )
+                "Projection" = @{
+                    "ProjectionType" = "ALL"
+                }
+            }
+        }
+    )
+} | ConvertTo-Json -Depth 10
+
+$gsi6Config | Out-File -FilePath "gsi6-config.json" -Encoding UTF8
+aws dynamodb update-table --table-name booking-system --cli-input-json file://gsi6-config.json --region eu-central-1 --profile private
+
+Wait-ForGSI "booking-system" "GSI6" "eu-central-1" "private"
+
+# Create GSI7
+Write-Host "Creating GSI7..."
+$gsi7Config = @{
+    "AttributeDefinitions" = @(
+        @{
+            "AttributeName" = "GSI7PK"
+            "AttributeType" = "S"
+        },
+        @{
+            "AttributeName" = "GSI7SK"
+            "AttributeType" = "S"
+        }
+    )
+    "GlobalSecondaryIndexUpdates" = @(
+        @{
+            "Create" = @{
+                "IndexName" = "GSI7"
+                "KeySchema" = @(
+                    @{
+                        "AttributeName" = "GSI7PK"
+                        "KeyType" = "HASH"
+                    },
+                    @{
+                        "AttributeName" = "GSI7SK"
+                        "KeyType" = "RANGE"
+                    }
+                )
+                "Projection" = @{
+                    "ProjectionType" = "ALL"
+                }
+            }
+        }
+    )
+} | ConvertTo-Json -Depth 10
+
+$gsi7Config | Out-File -FilePath "gsi7-config.json" -Encoding UTF8
+aws dynamodb update-table --table-name booking-system --cli-input-json file://gsi7-config.json --region eu-central-1 --profile private
+
+Wait-ForGSI "booking-system" "GSI7" "eu-central-1" "private"
+
 Write-Host "All GSIs created successfully!"
 Write-Host "Final table status:"
 aws dynamodb describe-table --table-name booking-system --region eu-central-1 --profile private --query "Table.GlobalSecondaryIndexes[].{IndexName:IndexName,Status:IndexStatus}"
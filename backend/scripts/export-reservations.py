@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Script to export reservations of a hotel or a whole company as NDJSON or CSV
+
+Rows are streamed to stdout (or --output) as they are read, so memory use stays
+flat no matter how many reservations are exported.
+
+Usage: python export-reservations.py (--hotel loc1 | --company comp1) --start 2025-01-01 --end 2025-12-31 [--format csv] [--include-deleted] [--output file] [--segments 8]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from booking_system.services.reservation_service import export_reservations
+
+def main():
+    parser = argparse.ArgumentParser(description="Export reservations as NDJSON or CSV")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument('--hotel', help="Hotel (location) id")
+    scope.add_argument('--company', help="Company id")
+    parser.add_argument('--start', required=True, help="First date (YYYY-MM-DD)")
+    parser.add_argument('--end', required=True, help="Last date (YYYY-MM-DD)")
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    parser.add_argument('--include-deleted', action='store_true')
+    parser.add_argument('--output', help="Output file (defaults to stdout)")
+    parser.add_argument('--segments', type=int, default=1, help="Parallel scan segments (rows are then unordered)")
+    args = parser.parse_args()
+
+    chunks = export_reservations(
+        args.start, args.end, args.format,
+        hotel_id=args.hotel, company_id=args.company, include_deleted=args.include_deleted,
+        segments=args.segments
+    )
+
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        rows = 0
+        for chunk in chunks:
+            output.write(chunk)
+            rows += 1
+        print(f"✅ Exported {rows - (1 if args.format == 'csv' else 0)} reservations", file=sys.stderr)
+    finally:
+        if args.output:
+            output.close()
+
+if __name__ == "__main__":
+    main()
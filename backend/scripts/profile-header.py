@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Script to print an X-Profile header value that enables profiling of one API path
+
+The value is signed with the API's PROFILE_SIGNING_KEY and expires after --ttl
+seconds. The profile id comes back in the X-Profile-Id response header.
+
+Usage: PROFILE_SIGNING_KEY=... python profile-header.py /hotels/loc1/reservations [--ttl 300]
+       curl -H "X-Profile: $(python profile-header.py /hotels/loc1/reservations)" ...
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from booking_system.observability.profiling import sign_request
+
+def main():
+    parser = argparse.ArgumentParser(description="Sign an X-Profile header for one API path")
+    parser.add_argument('path', help="Request path without the query string, e.g. /hotels/loc1/reservations")
+    parser.add_argument('--ttl', type=int, default=300, help="Seconds the header stays valid")
+    args = parser.parse_args()
+
+    key = os.getenv("PROFILE_SIGNING_KEY")
+    if not key:
+        sys.exit("PROFILE_SIGNING_KEY is not set")
+    print(sign_request(key, args.path, int(time.time()) + args.ttl))
+
+if __name__ == "__main__":
+    main()
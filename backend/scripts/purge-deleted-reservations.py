@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Script to purge soft-deleted reservations past their retention
+
+Reservations deleted more than --days days ago (DELETED_RETENTION_DAYS) are
+written, with their guests, to the archive configured by ARCHIVE_URL and then
+expired through the table TTL. The deleted-reservations report keeps answering
+from the archive. Run it from one place at a time, for example daily.
+
+Usage: python purge-deleted-reservations.py [--hotel loc1] [--days 30] [--dry-run] [--segments 8]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from booking_system.services.reservation_service import purge_deleted_reservations
+
+def main():
+    parser = argparse.ArgumentParser(description="Purge soft-deleted reservations")
+    parser.add_argument('--hotel', help="Only purge reservations of this hotel (location) id")
+    parser.add_argument('--days', type=int, default=None, help="Purge reservations deleted more than this many days ago (DELETED_RETENTION_DAYS)")
+    parser.add_argument('--dry-run', action='store_true', help="Only count what would be purged")
+    parser.add_argument('--segments', type=int, default=8)
+    args = parser.parse_args()
+
+    report = purge_deleted_reservations(args.hotel, retention_days=args.days, dry_run=args.dry_run, segments=args.segments)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
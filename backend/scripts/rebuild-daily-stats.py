@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script to recompute the materialised daily hotel aggregates and report drift
+
+Usage: python rebuild-daily-stats.py <start_date> <end_date> [--fix]
+Without --fix the script only reports days whose stored counters differ from
+the counters recomputed from the reservations.
+
+Required once on deploy of the daily stats: the counters only see writes made
+after it, so run it with --fix over every date that has reservations (past and
+future), or edits and deletes of older reservations leave the counters short.
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from booking_system.services.reservation_service import get_hotels, rebuild_daily_stats
+
+def rebuild_all_daily_stats(start_date, end_date, fix):
+    print(f"{'Rebuilding' if fix else 'Checking'} daily stats from {start_date} to {end_date}...")
+
+    for hotel in get_hotels():
+        hotel_id = hotel['PK'].split('#', 1)[1]
+        try:
+            drift = rebuild_daily_stats(hotel_id, start_date, end_date, fix=fix)
+        except Exception as e:
+            print(f"❌ {hotel.get('Name', hotel_id)} ({hotel_id}): {e}")
+            continue
+
+        if not drift:
+            print(f"✅ {hotel.get('Name', hotel_id)} ({hotel_id}): no drift")
+            continue
+
+        print(f"⚠️  {hotel.get('Name', hotel_id)} ({hotel_id}): {len(drift)} drifted days{' fixed' if fix else ''}")
+        for entry in drift:
+            print(json.dumps(entry, default=str))
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != '--fix']
+    if len(args) != 2:
+        print(__doc__)
+        sys.exit(1)
+    rebuild_all_daily_stats(args[0], args[1], '--fix' in sys.argv[1:])
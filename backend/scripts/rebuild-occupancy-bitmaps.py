@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Script to (re)build the per room-year occupancy bitmaps from existing reservations
+
+Usage: python rebuild-occupancy-bitmaps.py <year> [<year> ...]
+Run it once before setting OCCUPANCY_BITMAPS_ENABLED=true, and again whenever the
+bitmaps are suspected to have drifted from the reservations.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from booking_system.services.reservation_service import get_hotels, rebuild_hotel_occupancy
+
+def rebuild_occupancy_bitmaps(years):
+    print(f"Rebuilding occupancy bitmaps for years {', '.join(str(year) for year in years)}...")
+
+    for hotel in get_hotels():
+        hotel_id = hotel['PK'].split('#', 1)[1]
+        try:
+            written = rebuild_hotel_occupancy(hotel_id, years)
+            print(f"✅ {hotel.get('Name', hotel_id)} ({hotel_id}): {written} room-year bitmaps written")
+        except Exception as e:
+            print(f"❌ {hotel.get('Name', hotel_id)} ({hotel_id}): {e}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    rebuild_occupancy_bitmaps([int(year) for year in sys.argv[1:]])
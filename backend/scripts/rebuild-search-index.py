@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild the reservation search entries (GSI6)
+
+Rewrites the name and phone search entries of every reservation from the
+reservation and guest items. Run once after GSI6 is created to backfill
+existing reservations, and again to repair entries a failed write left behind.
+
+Usage: python rebuild-search-index.py [--hotel loc1] [--segments 8]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from booking_system.services.reservation_service import rebuild_search_index
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the reservation search index")
+    parser.add_argument('--hotel', help="Only rebuild entries of this hotel (location) id")
+    parser.add_argument('--segments', type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"Rebuilding search entries{f' of hotel {args.hotel}' if args.hotel else ''}...")
+    result = rebuild_search_index(args.hotel, segments=args.segments)
+    print(f"✅ Rebuilt search entries of {result['reservations']} reservations")
+
+if __name__ == "__main__":
+    main()
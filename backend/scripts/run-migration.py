@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Script to run an item migration or backfill online, while the API keeps serving
+
+Progress is checkpointed in the table, so an interrupted run picks up where it
+stopped when started again. Use --dry-run first to see how many items would
+change, and --verify afterwards to confirm none are left.
+
+Usage: python run-migration.py <migration> [--dry-run | --verify | --restart] [--segments 8] [--workers 4] [--rcu 500] [--wcu 200]
+       python run-migration.py --list
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from booking_system.db.migrations import MIGRATIONS, MigrationRunner
+from booking_system.services.reservation_service import table
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an online item migration")
+    parser.add_argument('migration', nargs='?', help="Migration name")
+    parser.add_argument('--list', action='store_true', help="List available migrations")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--dry-run', action='store_true', help="Count the items that would change without writing")
+    mode.add_argument('--verify', action='store_true', help="Count the items that still need migrating")
+    mode.add_argument('--restart', action='store_true', help="Discard checkpoints and migrate from the beginning")
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rcu', type=float, default=None, help="Read capacity units per second to stay under")
+    parser.add_argument('--wcu', type=float, default=None, help="Write capacity units per second to stay under")
+    args = parser.parse_args()
+
+    if args.list or not args.migration:
+        for name, migration in MIGRATIONS.items():
+            print(f"  {name}: {migration.description}")
+        return
+
+    if args.migration not in MIGRATIONS:
+        print(f"❌ Unknown migration {args.migration}")
+        sys.exit(1)
+
+    runner = MigrationRunner(
+        MIGRATIONS[args.migration](table),
+        total_segments=args.segments,
+        workers=args.workers,
+        read_capacity_per_second=args.rcu,
+        write_capacity_per_second=args.wcu,
+    )
+
+    if args.verify:
+        counts = runner.verify()
+        status = "✅" if counts['pending'] == 0 else "⚠️"
+        print(f"{status} {args.migration}: {counts['pending']} of {counts['scanned']} scanned items still need migrating")
+        sys.exit(0 if counts['pending'] == 0 else 1)
+
+    if args.restart:
+        runner.restart()
+
+    counts = runner.run(dry_run=args.dry_run)
+    prefix = "Dry run: would migrate" if args.dry_run else "Migrated"
+    print(f"✅ {args.migration}: {prefix} {counts['migrated']} items "
+          f"({counts['scanned']} scanned, {counts['skipped']} already migrated, {counts['conflicts']} conflicts)")
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from ..auth import get_current_user, verify_cognito_token, set_current_user
+from ..observability import logs, tracing
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,12 @@ async def get_authenticated_user(
     """
     Dependency to get the current authenticated user from Cognito JWT token
     """
+    with tracing.span("get_authenticated_user") as span:
+        user_data = _authenticate(credentials)
+        span.set_attribute("enduser.id", user_data.get('username'))
+        return user_data
+
+def _authenticate(credentials: HTTPAuthorizationCredentials) -> Dict[str, Any]:
     try:
         token = credentials.credentials
         
@@ -34,14 +41,13 @@ async def get_authenticated_user(
         
         # Set the current user in context
         set_current_user(user_data)
-        
-        logger.info(f"User authenticated: {user_data.get('username')}")
+        logs.bind(user=user_data.get('username'))
         return user_data
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Authentication error: {e}")
+        logger.error("Authentication error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication failed",
@@ -62,7 +68,8 @@ async def get_optional_user(
         user_data = verify_cognito_token(token)
         if user_data:
             set_current_user(user_data)
+            logs.bind(user=user_data.get('username'))
         return user_data
     except Exception as e:
-        logger.warning(f"Optional authentication failed: {e}")
+        logger.warning("Optional authentication failed: %s", e)
         return None
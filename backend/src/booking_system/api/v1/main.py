@@ -1,28 +1,45 @@
 from datetime import datetime
-from fastapi import FastAPI, HTTPException, Depends
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Depends, Header, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
-from ...services.reservation_service import add_reservation, get_hotels, get_hotel, get_rooms, get_reservations, update_reservation, get_companies, get_company, soft_delete_reservation, get_deleted_reservations
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from ...services.reservation_service import add_reservation, get_hotels, get_hotel, get_rooms, get_reservations, get_reservations_partial, update_reservation, get_companies, get_company, soft_delete_reservation, get_deleted_reservations, VersionConflictError, WriteContentionError, idempotency_store, single_flight, query_cache, get_room_free_slots, get_hotel_occupancy, get_occupancy_analytics, get_daily_stats, import_reservations, export_reservations, search_reservations, get_arrivals, get_latest_reservations
+from ...db.client import ServiceUnavailableError, circuit_breaker
+from ...db.deadline import DeadlineExceededError, reset_deadline, set_deadline
+from ...services.export import MEDIA_TYPES
+from ...services.idempotency import IdempotencyInProgressError, IdempotencyKeyReusedError, request_fingerprint
 from ...models.schemas import Reservation, ReservationUpdate, ReservationSoftDelete
 from ...api.dependencies import get_authenticated_user
 from ...auth import initialize_cognito_auth
+from ...observability import logs, profiling, tracing
 import logging
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-logging.basicConfig(level=logging.INFO)
+logs.configure_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# Profiled requests follow their synchronous endpoint into the threadpool
+if profiling.PROFILING_ENABLED:
+    app.router.route_class = profiling.ProfiledRoute
+
 # Initialize Cognito authentication
 cognito_region = os.getenv("COGNITO_REGION", "eu-central-1")
 cognito_user_pool_id = os.getenv("COGNITO_USER_POOL_ID", "")
 if cognito_user_pool_id:
     initialize_cognito_auth(cognito_region, cognito_user_pool_id)
-    logger.info(f"Cognito authentication initialized for region: {cognito_region}")
+    logger.info("Cognito authentication initialized for region: %s", cognito_region)
 else:
     logger.warning("COGNITO_USER_POOL_ID not set - authentication disabled")
 
@@ -39,118 +56,476 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Time budget per request; API Gateway gives up on the client after 29 seconds
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "25"))
+# Kept back from the Lambda's remaining time to send the response
+REQUEST_DEADLINE_SAFETY_SECONDS = float(os.getenv("REQUEST_DEADLINE_SAFETY_SECONDS", "1"))
+# Streamed responses send their 200 headers before reading DynamoDB, so a deadline passing
+# mid-body would cut the file short behind a successful status; they only get the Lambda cap
+STREAMING_PATH_SUFFIXES = ("/reservations/export",)
+
+class RequestDeadlineMiddleware:
+    """
+    Sets the deadline of each request: the configured budget, or the Lambda's
+    remaining time less a safety margin when that is shorter. Streamed exports
+    have no budget of their own.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        budget = None if scope["path"].endswith(STREAMING_PATH_SUFFIXES) else REQUEST_DEADLINE_SECONDS
+        lambda_context = scope.get("aws.context")
+        if lambda_context is not None:
+            remaining = lambda_context.get_remaining_time_in_millis() / 1000 - REQUEST_DEADLINE_SAFETY_SECONDS
+            budget = remaining if budget is None else min(budget, remaining)
+
+        if budget is None:
+            return await self.app(scope, receive, send)
+        token = set_deadline(budget)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_deadline(token)
+
+app.add_middleware(RequestDeadlineMiddleware)
+
+class RequestLoggingMiddleware:
+    """Opens each request's log context and writes one access record when it finishes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        lambda_context = scope.get("aws.context")
+        request_id = getattr(lambda_context, "aws_request_id", None) or uuid.uuid4().hex
+        token = logs.begin_request(request_id)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            logger.info(
+                "%s %s %s", scope["method"], scope["path"], status_code,
+                extra={"status": status_code, "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+            )
+            logs.end_request(token)
+
+app.add_middleware(RequestLoggingMiddleware)
+
+class TracingMiddleware:
+    """Opens a server span per request, named after the matched route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracing.enabled():
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        parent = tracing.parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        attributes = {"http.request.method": scope["method"], "url.path": scope["path"]}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.set_status(tracing.ERROR)
+            await send(message)
+
+        with tracing.span(scope["method"], tracing.SERVER, attributes, parent) as span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # The router records the matched route in the scope
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    span.name = f"{scope['method']} {route}"
+                    span.set_attribute("http.route", route)
+
+app.add_middleware(TracingMiddleware)
+
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+def _caused_by(exc: BaseException, error_type) -> bool:
+    """Whether an exception was raised while handling an error_type exception"""
+    while exc is not None:
+        if isinstance(exc, error_type):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+@app.exception_handler(StarletteHTTPException)
+async def unavailable_exception_handler(request: Request, exc: StarletteHTTPException):
+    """
+    Endpoints turn unexpected errors into 500s; report an open DynamoDB circuit
+    as 503 and a passed request deadline as 504 instead
+    """
+    if exc.status_code >= 500 and _caused_by(exc, ServiceUnavailableError):
+        return JSONResponse(status_code=503, content={"detail": "Service temporarily unavailable, please retry shortly"}, headers={"Retry-After": "5"})
+    if exc.status_code >= 500 and _caused_by(exc, DeadlineExceededError):
+        return JSONResponse(status_code=504, content={"detail": "Request took too long and was aborted, please retry or narrow the query"})
+    return await http_exception_handler(request, exc)
+
+@app.exception_handler(ServiceUnavailableError)
+async def service_unavailable_handler(request: Request, exc: ServiceUnavailableError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+@app.exception_handler(DeadlineExceededError)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededError):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+def _idempotent(request: Request, idempotency_key: Optional[str], current_user: dict, payload, handler):
+    """
+    Run a write handler once per Idempotency-Key and replay its stored response
+    on retries; retryable conflicts are not stored, so a retry runs again.
+    Requests without the header run as usual.
+    """
+    if not idempotency_key:
+        return handler()
+
+    def run():
+        try:
+            return 200, jsonable_encoder(handler())
+        except HTTPException as e:
+            if e.status_code >= 500:
+                raise
+            return e.status_code, {"detail": jsonable_encoder(e.detail)}
+
+    try:
+        status_code, body = idempotency_store.run(
+            current_user.get('username', 'unknown'),
+            idempotency_key,
+            request_fingerprint(request.method, request.url.path, payload),
+            run
+        )
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse(status_code=status_code, content=body)
+
 @app.get("/health")
 def health_check():
     return {"status": "ok", "message": "Backend is running"}
 
+@app.get("/metrics")
+def read_metrics(current_user: dict = Depends(get_authenticated_user)):
+    """In-process performance counters of this worker"""
+    return {
+        "single_flight": single_flight.stats(),
+        "query_cache": query_cache.stats() if query_cache else {"backend": "off"},
+        "circuit_breaker": circuit_breaker.stats() if circuit_breaker else {"state": "disabled"},
+    }
+
 @app.get("/companies/")
 def read_companies(current_user: dict = Depends(get_authenticated_user)):
     try:
-        logger.info(f"User {current_user.get('username')} accessing companies")
+        logger.debug("User %s accessing companies", current_user.get('username'))
         return {"companies": get_companies()}
     except Exception as e:
-        logger.error(f"Error retrieving companies: {str(e)}", exc_info=True)
+        logger.error("Error retrieving companies: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 @app.get("/companies/{company_id}")
 def read_company(company_id: str, current_user: dict = Depends(get_authenticated_user)):
     try:
-        logger.info(f"User {current_user.get('username')} accessing company {company_id}")
+        logger.debug("User %s accessing company %s", current_user.get('username'), company_id)
         return {"company": get_company(company_id)}
     except Exception as e:
-        logger.error(f"Error retrieving company {company_id}: {str(e)}", exc_info=True)
+        logger.error("Error retrieving company %s: %s", company_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error retrieving company: {str(e)}")
 
+@app.get("/companies/{company_id}/analytics")
+def read_company_analytics(company_id: str, start_date: str, end_date: str, granularity: str = "day", current_user: dict = Depends(get_authenticated_user)):
+    """Get occupancy and revenue analytics across all hotels of a company"""
+    try:
+        logger.debug("User %s accessing analytics for company %s", current_user.get('username'), company_id)
+        return {"analytics": get_occupancy_analytics(start_date, end_date, granularity, company_id=company_id)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error computing analytics for company %s: %s", company_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error computing analytics: {str(e)}")
+
+@app.get("/companies/{company_id}/reservations/export")
+def export_company_reservations(company_id: str, start_date: str, end_date: str, format: str = "ndjson", include_deleted: bool = False, current_user: dict = Depends(get_authenticated_user)):
+    """Stream every reservation of a company's hotels as NDJSON or CSV"""
+    try:
+        logger.debug("User %s exporting reservations for company %s", current_user.get('username'), company_id)
+        chunks = export_reservations(start_date, end_date, format, company_id=company_id, include_deleted=include_deleted)
+        return StreamingResponse(chunks, media_type=MEDIA_TYPES[format])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error exporting reservations for company %s: %s", company_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error exporting reservations: {str(e)}")
+
+@app.get("/companies/{company_id}/arrivals")
+def read_company_arrivals(company_id: str, start_date: str, end_date: str, current_user: dict = Depends(get_authenticated_user)):
+    """Get the reservations checking in across a company's hotels within a date range"""
+    try:
+        logger.debug("User %s accessing arrivals for company %s", current_user.get('username'), company_id)
+        return {"arrivals": get_arrivals(start_date, end_date, company_id=company_id)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error retrieving arrivals for company %s: %s", company_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error retrieving arrivals: {str(e)}")
+
+@app.get("/companies/{company_id}/search")
+def search_company_reservations(company_id: str, q: str, limit: int = 20, current_user: dict = Depends(get_authenticated_user)):
+    """Find reservations across a company's hotels by guest or contact name or phone number"""
+    try:
+        logger.debug("User %s searching reservations for company %s", current_user.get('username'), company_id)
+        return {"results": search_reservations(q, company_id=company_id, limit=limit)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error searching reservations for company %s: %s", company_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error searching reservations: {str(e)}")
+
 @app.get("/hotels/")
 def read_hotels(current_user: dict = Depends(get_authenticated_user)):
     try:
-        logger.info(f"User {current_user.get('username')} accessing hotels")
+        logger.debug("User %s accessing hotels", current_user.get('username'))
         return {"hotels": get_hotels()}
     except Exception as e:
-        logger.error(f"Error retrieving hotels: {str(e)}", exc_info=True)
+        logger.error("Error retrieving hotels: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 @app.get("/hotels/{hotel_id}")
 def read_hotel(hotel_id: str, current_user: dict = Depends(get_authenticated_user)):
     try:
-        logger.info(f"User {current_user.get('username')} accessing hotel {hotel_id}")
+        logger.debug("User %s accessing hotel %s", current_user.get('username'), hotel_id)
         return {"hotel": get_hotel(hotel_id)}
     except Exception as e:
-        logger.error(f"Error retrieving hotel {hotel_id}: {str(e)}", exc_info=True)
+        logger.error("Error retrieving hotel %s: %s", hotel_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error retrieving hotel: {str(e)}")
 
 @app.get("/hotels/{hotel_id}/rooms")
 def read_rooms(hotel_id: str, current_user: dict = Depends(get_authenticated_user)):
     try:
-        logger.info(f"User {current_user.get('username')} accessing rooms for hotel {hotel_id}")
+        logger.debug("User %s accessing rooms for hotel %s", current_user.get('username'), hotel_id)
         return {"rooms": get_rooms(hotel_id)}
     except Exception as e:
-        logger.error(f"Error retrieving rooms for hotel {hotel_id}: {str(e)}", exc_info=True)
+        logger.error("Error retrieving rooms for hotel %s: %s", hotel_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error retrieving rooms: {str(e)}")
 
+@app.get("/hotels/{hotel_id}/rooms/{room_id}/free-slots")
+def read_room_free_slots(hotel_id: str, room_id: str, start_date: str, end_date: str, current_user: dict = Depends(get_authenticated_user)):
+    """Get the free date ranges of a room within a date range"""
+    try:
+        logger.debug("User %s accessing free slots for room %s in hotel %s", current_user.get('username'), room_id, hotel_id)
+        return {"free_slots": get_room_free_slots(hotel_id, room_id, start_date, end_date)}
+    except Exception as e:
+        logger.error("Error retrieving free slots for room %s in hotel %s: %s", room_id, hotel_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error retrieving free slots: {str(e)}")
+
+@app.get("/hotels/{hotel_id}/occupancy")
+def read_hotel_occupancy(hotel_id: str, start_date: str, end_date: str, current_user: dict = Depends(get_authenticated_user)):
+    """Get night-by-night room occupancy for a hotel within a date range"""
+    try:
+        logger.debug("User %s accessing occupancy for hotel %s", current_user.get('username'), hotel_id)
+        return {"occupancy": get_hotel_occupancy(hotel_id, start_date, end_date)}
+    except Exception as e:
+        logger.error("Error retrieving occupancy for hotel %s from %s to %s: %s", hotel_id, start_date, end_date, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error retrieving occupancy: {str(e)}")
+
+@app.get("/hotels/{hotel_id}/analytics")
+def read_hotel_analytics(hotel_id: str, start_date: str, end_date: str, granularity: str = "day", current_user: dict = Depends(get_authenticated_user)):
+    """Get occupancy and revenue analytics (occupancy %, ADR, RevPAR, room-type mix) for a hotel"""
+    try:
+        logger.debug("User %s accessing analytics for hotel %s", current_user.get('username'), hotel_id)
+        return {"analytics": get_occupancy_analytics(start_date, end_date, granularity, hotel_id=hotel_id)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error computing analytics for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error computing analytics: {str(e)}")
+
+@app.get("/hotels/{hotel_id}/daily-stats")
+def read_daily_stats(hotel_id: str, start_date: str, end_date: str, current_user: dict = Depends(get_authenticated_user)):
+    """Get the materialised per-day counters (rooms sold, arrivals, departures, guests, revenue) for a hotel"""
+    try:
+        logger.debug("User %s accessing daily stats for hotel %s", current_user.get('username'), hotel_id)
+        return {"daily_stats": get_daily_stats(hotel_id, start_date, end_date)}
+    except Exception as e:
+        logger.error("Error retrieving daily stats for hotel %s from %s to %s: %s", hotel_id, start_date, end_date, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error retrieving daily stats: {str(e)}")
+
+@app.get("/hotels/{hotel_id}/arrivals")
+def read_hotel_arrivals(hotel_id: str, start_date: str, end_date: str, current_user: dict = Depends(get_authenticated_user)):
+    """Get the reservations checking in at a hotel within a date range, with guests"""
+    try:
+        logger.debug("User %s accessing arrivals for hotel %s", current_user.get('username'), hotel_id)
+        return {"arrivals": get_arrivals(start_date, end_date, hotel_id=hotel_id)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error retrieving arrivals for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error retrieving arrivals: {str(e)}")
+
+@app.get("/hotels/{hotel_id}/search")
+def search_hotel_reservations(hotel_id: str, q: str, limit: int = 20, current_user: dict = Depends(get_authenticated_user)):
+    """Find a hotel's reservations by guest or contact name (Cyrillic or Latin, any order) or by phone number"""
+    try:
+        logger.debug("User %s searching reservations for hotel %s", current_user.get('username'), hotel_id)
+        return {"results": search_reservations(q, hotel_id=hotel_id, limit=limit)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error searching reservations for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error searching reservations: {str(e)}")
+
 @app.get("/hotels/{hotel_id}/reservations")
-def read_reservations(hotel_id: str, start_date: str, end_date: str, current_user: dict = Depends(get_authenticated_user)):
+def read_reservations(hotel_id: str, start_date: str, end_date: str, partial: bool = False, current_user: dict = Depends(get_authenticated_user)):
+    """With partial=true, a request near its deadline returns the reservations read so far and "partial": true"""
     try:
-        logger.info(f"User {current_user.get('username')} accessing reservations for hotel {hotel_id}")
+        logger.debug("User %s accessing reservations for hotel %s", current_user.get('username'), hotel_id)
+        if partial:
+            reservations, complete = get_reservations_partial(hotel_id, start_date, end_date)
+            return {"reservations": reservations, "partial": not complete}
         return {"reservations": get_reservations(hotel_id, start_date, end_date)}
     except Exception as e:
-        logger.error(f"Error retrieving reservations for hotel {hotel_id} from {start_date} to {end_date}: {str(e)}", exc_info=True)
+        logger.error("Error retrieving reservations for hotel %s from %s to %s: %s", hotel_id, start_date, end_date, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error retrieving reservations: {str(e)}")
 
-@app.post("/hotels/{hotel_id}/reservations")
-def create_reservation(hotel_id: str, reservation: Reservation, current_user: dict = Depends(get_authenticated_user)):
+@app.get("/hotels/{hotel_id}/reservations/export")
+def export_hotel_reservations(hotel_id: str, start_date: str, end_date: str, format: str = "ndjson", include_deleted: bool = False, current_user: dict = Depends(get_authenticated_user)):
+    """Stream every reservation of a hotel as NDJSON or CSV"""
     try:
-        logger.info(f"User {current_user.get('username')} creating reservation for hotel {hotel_id}")
-        reservation_data = reservation.model_dump()
-        created_item = add_reservation(hotel_id, reservation_data)
-        return {"message": "Reservation created successfully", "reservation": created_item}
+        logger.debug("User %s exporting reservations for hotel %s", current_user.get('username'), hotel_id)
+        chunks = export_reservations(start_date, end_date, format, hotel_id=hotel_id, include_deleted=include_deleted)
+        return StreamingResponse(chunks, media_type=MEDIA_TYPES[format])
     except ValueError as e:
-        logger.warning(f"Validation error creating reservation for hotel {hotel_id}: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error creating reservation for hotel {hotel_id}: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error creating reservation: {str(e)}")
+        logger.error("Error exporting reservations for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error exporting reservations: {str(e)}")
 
-@app.put("/hotels/{hotel_id}/reservations/{reservation_id}")
-def modify_reservation(hotel_id: str, reservation_id: str, reservation: ReservationUpdate, current_user: dict = Depends(get_authenticated_user)):
-    try:
-        logger.info(f"User {current_user.get('username')} updating reservation {reservation_id} for hotel {hotel_id}")
-        logger.info(f"Received reservation data: {reservation}")
-        reservation_data = reservation.model_dump()
-        logger.info(f"Converted to dict: {reservation_data}")
-        logger.info(f"Final update data: {reservation_data}")
-        updated_item = update_reservation(hotel_id, reservation_id, reservation_data)
-        if not updated_item:
-            logger.warning(f"Reservation not found or no updates applied for hotel_id: {hotel_id}, reservation_id: {reservation_id}")
-            raise HTTPException(status_code=404, detail="Reservation not found or no updates applied")
-        return {"message": "Reservation updated successfully", "reservation": updated_item}
+@app.get("/hotels/{hotel_id}/reservations/latest")
+def read_latest_reservations(hotel_id: str, limit: int = 20, created_from: Optional[str] = None, created_to: Optional[str] = None, before: Optional[str] = None, current_user: dict = Depends(get_authenticated_user)):
+    """Get a hotel's most recently created reservations, newest first; pass the last GSI7SK as `before` for the next page"""
+    try:
+        logger.debug("User %s accessing latest reservations for hotel %s", current_user.get('username'), hotel_id)
+        return {"reservations": get_latest_reservations(hotel_id, limit, created_from, created_to, before)}
     except ValueError as e:
-        logger.warning(f"Validation error updating reservation {reservation_id} for hotel {hotel_id}: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error updating reservation {reservation_id} for hotel {hotel_id}: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error updating reservation: {str(e)}")
+        logger.error("Error retrieving latest reservations for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error retrieving latest reservations: {str(e)}")
 
-@app.delete("/hotels/{hotel_id}/reservations/{reservation_id}")
-def delete_reservation(hotel_id: str, reservation_id: str, current_user: dict = Depends(get_authenticated_user)):
-    """Soft delete a reservation"""
+@app.post("/hotels/{hotel_id}/reservations")
+def create_reservation(hotel_id: str, reservation: Reservation, request: Request, current_user: dict = Depends(get_authenticated_user), idempotency_key: Optional[str] = Header(None)):
+    reservation_data = reservation.model_dump()
+
+    def create():
+        try:
+            logger.debug("User %s creating reservation for hotel %s", current_user.get('username'), hotel_id)
+            created_item = add_reservation(hotel_id, reservation_data)
+            return {"message": "Reservation created successfully", "reservation": created_item}
+        except WriteContentionError as e:
+            logger.warning("Concurrent writes kept blocking a reservation for hotel %s: %s", hotel_id, e)
+            raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e:
+            logger.warning("Validation error creating reservation for hotel %s: %s", hotel_id, e)
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error("Error creating reservation for hotel %s: %s", hotel_id, e, exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Error creating reservation: {str(e)}")
+
+    return _idempotent(request, idempotency_key, current_user, reservation_data, create)
+
+@app.post("/hotels/{hotel_id}/reservations/import")
+async def import_reservations_endpoint(hotel_id: str, request: Request, current_user: dict = Depends(get_authenticated_user)):
+    """Bulk import reservations sent as JSON lines or CSV (Content-Type: text/csv)"""
     try:
-        logger.info(f"User {current_user.get('username')} soft deleting reservation {reservation_id} for hotel {hotel_id}")
-        deleted_item = soft_delete_reservation(reservation_id, current_user.get('username', 'unknown'))
-        return {"message": "Reservation deleted successfully", "reservation": deleted_item}
+        logger.debug("User %s importing reservations for hotel %s", current_user.get('username'), hotel_id)
+        body = await request.body()
+        report = await run_in_threadpool(import_reservations, hotel_id, body, request.headers.get('content-type', ''))
+        return {"message": "Reservation import finished", "report": report}
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Import body must be UTF-8: {str(e)}")
     except Exception as e:
-        logger.error(f"Error soft deleting reservation {reservation_id} for hotel {hotel_id}: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error deleting reservation: {str(e)}")
+        logger.error("Error importing reservations for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error importing reservations: {str(e)}")
+
+@app.put("/hotels/{hotel_id}/reservations/{reservation_id}")
+@app.patch("/hotels/{hotel_id}/reservations/{reservation_id}")
+def modify_reservation(hotel_id: str, reservation_id: str, reservation: ReservationUpdate, request: Request, current_user: dict = Depends(get_authenticated_user), idempotency_key: Optional[str] = Header(None)):
+    reservation_data = reservation.model_dump(exclude_none=True)
+
+    def modify():
+        try:
+            update_data = dict(reservation_data)
+            expected_version = update_data.pop('version', None)
+            logger.debug("User %s updating reservation %s for hotel %s at version %s: %s", current_user.get('username'), reservation_id, hotel_id, expected_version, update_data)
+            updated_item = update_reservation(hotel_id, reservation_id, update_data, expected_version)
+            if not updated_item:
+                logger.warning("Reservation not found or no updates applied for hotel_id: %s, reservation_id: %s", hotel_id, reservation_id)
+                raise HTTPException(status_code=404, detail="Reservation not found or no updates applied")
+            return {"message": "Reservation updated successfully", "reservation": updated_item}
+        except VersionConflictError as e:
+            logger.warning("Version conflict updating reservation %s for hotel %s: %s", reservation_id, hotel_id, e)
+            raise HTTPException(status_code=409, detail={"message": str(e), "reservation": jsonable_encoder(e.reservation)})
+        except WriteContentionError as e:
+            logger.warning("Concurrent writes kept blocking update of reservation %s for hotel %s: %s", reservation_id, hotel_id, e)
+            raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e:
+            logger.warning("Validation error updating reservation %s for hotel %s: %s", reservation_id, hotel_id, e)
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error("Error updating reservation %s for hotel %s: %s", reservation_id, hotel_id, e, exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Error updating reservation: {str(e)}")
+
+    return _idempotent(request, idempotency_key, current_user, reservation_data, modify)
+
+@app.delete("/hotels/{hotel_id}/reservations/{reservation_id}")
+def delete_reservation(hotel_id: str, reservation_id: str, request: Request, current_user: dict = Depends(get_authenticated_user), idempotency_key: Optional[str] = Header(None)):
+    """Soft delete a reservation"""
+    def delete():
+        try:
+            logger.debug("User %s soft deleting reservation %s for hotel %s", current_user.get('username'), reservation_id, hotel_id)
+            deleted_item = soft_delete_reservation(reservation_id, current_user.get('username', 'unknown'))
+            return {"message": "Reservation deleted successfully", "reservation": deleted_item}
+        except WriteContentionError as e:
+            logger.warning("Concurrent writes kept blocking deletion of reservation %s for hotel %s: %s", reservation_id, hotel_id, e)
+            raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e:
+            logger.warning("Validation error deleting reservation %s for hotel %s: %s", reservation_id, hotel_id, e)
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            logger.error("Error soft deleting reservation %s for hotel %s: %s", reservation_id, hotel_id, e, exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Error deleting reservation: {str(e)}")
+
+    return _idempotent(request, idempotency_key, current_user, None, delete)
 
 @app.get("/hotels/{hotel_id}/reservations/deleted")
 def get_deleted_reservations_endpoint(hotel_id: str, start_date: str, end_date: str, current_user: dict = Depends(get_authenticated_user)):
     """Get deleted reservations for a hotel within a date range"""
     try:
-        logger.info(f"User {current_user.get('username')} accessing deleted reservations for hotel {hotel_id}")
+        logger.debug("User %s accessing deleted reservations for hotel %s", current_user.get('username'), hotel_id)
         deleted_reservations = get_deleted_reservations(hotel_id, start_date, end_date)
         return {"deleted_reservations": deleted_reservations}
     except Exception as e:
-        logger.error(f"Error retrieving deleted reservations for hotel {hotel_id}: {str(e)}", exc_info=True)
+        logger.error("Error retrieving deleted reservations for hotel %s: %s", hotel_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error retrieving deleted reservations: {str(e)}")
 
 if __name__ == "__main__":
@@ -9,6 +9,8 @@ from jose import jwt, JWTError
 from fastapi import HTTPException, status
 from contextvars import ContextVar
 
+from ..observability import tracing
+
 # Context variable to store current user
 current_user_var: ContextVar[Optional[Dict[str, Any]]] = ContextVar('current_user', default=None)
 
@@ -32,13 +34,14 @@ class CognitoAuth:
             time.time() - self._jwks_cache_time > 3600):
             
             try:
-                response = requests.get(self.jwks_url, timeout=10)
-                response.raise_for_status()
+                with tracing.span("CognitoAuth.get_jwks", tracing.CLIENT, {"http.request.method": "GET", "url.full": self.jwks_url}):
+                    response = requests.get(self.jwks_url, timeout=10)
+                    response.raise_for_status()
                 self._jwks_cache = response.json()
                 self._jwks_cache_time = time.time()
                 logger.info("Successfully fetched JWKS from Cognito")
             except requests.RequestException as e:
-                logger.error(f"Failed to fetch JWKS: {e}")
+                logger.error("Failed to fetch JWKS: %s", e)
                 raise HTTPException(
                     status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                     detail="Authentication service unavailable"
@@ -64,26 +67,22 @@ class CognitoAuth:
                 if key.get('kid') == kid:
                     return json.dumps(key)
             
-            logger.warning(f"No matching key found for kid: {kid}")
+            logger.warning("No matching key found for kid: %s", kid)
             return None
             
         except JWTError as e:
-            logger.error(f"Error getting signing key: {e}")
+            logger.error("Error getting signing key: %s", e)
             return None
     
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Verify and decode the JWT token"""
         try:
-            logger.info(f"Verifying token: {token[:50]}...")
-            
             # Get the signing key
             signing_key = self.get_signing_key(token)
             if not signing_key:
                 logger.error("Failed to get signing key")
                 return None
             
-            logger.info("Got signing key, attempting to decode token")
-            
             # Verify and decode the token
             payload = jwt.decode(
                 token,
@@ -99,21 +98,19 @@ class CognitoAuth:
                 }
             )
             
-            logger.info(f"Token decoded successfully, payload keys: {list(payload.keys())}")
-            
             # Validate token type
             if payload.get('token_use') != 'access':
-                logger.warning(f"Invalid token type: {payload.get('token_use')}")
+                logger.warning("Invalid token type: %s", payload.get('token_use'))
                 return None
             
-            logger.info(f"Successfully verified token for user: {payload.get('username')}")
+            logger.debug("Verified token for user %s", payload.get('username'))
             return payload
             
         except JWTError as e:
-            logger.error(f"Token verification failed: {e}")
+            logger.error("Token verification failed: %s", e)
             return None
         except Exception as e:
-            logger.error(f"Unexpected error during token verification: {e}")
+            logger.error("Unexpected error during token verification: %s", e)
             return None
 
 # Global Cognito auth instance
@@ -123,7 +120,7 @@ def initialize_cognito_auth(region: str, user_pool_id: str):
     """Initialize the global Cognito auth instance"""
     global cognito_auth
     cognito_auth = CognitoAuth(region, user_pool_id)
-    logger.info(f"Cognito auth initialized for region: {region}, user pool: {user_pool_id}")
+    logger.info("Cognito auth initialized for region: %s, user pool: %s", region, user_pool_id)
 
 def get_current_user() -> Optional[Dict[str, Any]]:
     """Get the current authenticated user from context"""
@@ -0,0 +1,170 @@
+"""
+Central factory for the service's DynamoDB resource.
+
+Connection pool size, TCP keep-alive, connect/read timeouts and the retry mode
+come from the environment, defaulting to a larger pool than botocore's 10
+connections, keep-alive on, tight timeouts and adaptive retries (which add
+client-side rate limiting when DynamoDB throttles). A circuit breaker hooked
+into the client's events makes every call fail fast with ServiceUnavailableError
+while DynamoDB is degraded, instead of letting requests pile up behind timeouts,
+and the request deadline hooks (see deadline.py) stop calls and retries once the
+current request's time budget is spent.
+"""
+import logging
+import os
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ConnectionError, HTTPClientError
+
+from . import deadline
+from ..observability import tracing
+
+logger = logging.getLogger(__name__)
+
+REGION = os.getenv("DYNAMODB_REGION", "eu-central-1")
+MAX_POOL_CONNECTIONS = int(os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "50"))
+TCP_KEEPALIVE = os.getenv("DYNAMODB_TCP_KEEPALIVE", "true").lower() == "true"
+CONNECT_TIMEOUT = float(os.getenv("DYNAMODB_CONNECT_TIMEOUT", "2"))
+READ_TIMEOUT = float(os.getenv("DYNAMODB_READ_TIMEOUT", "5"))
+RETRY_MODE = os.getenv("DYNAMODB_RETRY_MODE", "adaptive")
+MAX_ATTEMPTS = int(os.getenv("DYNAMODB_MAX_ATTEMPTS", "5"))
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+CIRCUIT_BREAKER_RESET_SECONDS = float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30"))
+
+# Errors that, after botocore's own retries, mean DynamoDB is degraded rather than the request being wrong
+DEGRADED_ERRORS = (
+    'InternalServerError',
+    'ServiceUnavailable',
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+)
+
+# Exceptions that, after botocore's own retries, mean DynamoDB could not be reached or did not answer
+TRANSPORT_ERRORS = (ConnectionError, HTTPClientError)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ServiceUnavailableError(Exception):
+    """Raised instead of calling DynamoDB while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive degraded calls, rejects calls for
+    `reset_seconds`, then lets a single trial call through: its success closes
+    the circuit again, its failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _reject(self):
+        self.rejected += 1
+        raise ServiceUnavailableError("DynamoDB is temporarily unavailable, please retry shortly")
+
+    def before_call(self, **kwargs):
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    self._reject()
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN:
+                if self._trial_in_flight:
+                    self._reject()
+                self._trial_in_flight = True
+
+    def _record(self, degraded: bool):
+        with self._lock:
+            if not degraded:
+                if self.state != CLOSED:
+                    logger.info("DynamoDB circuit breaker closed")
+                self.state = CLOSED
+                self.consecutive_failures = 0
+                return
+
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                    logger.warning("DynamoDB circuit breaker opened after %s degraded calls", self.consecutive_failures)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def _release_trial(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = False
+
+    def after_call(self, http_response=None, parsed=None, **kwargs):
+        status_code = getattr(http_response, 'status_code', 200)
+        error_code = (parsed or {}).get('Error', {}).get('Code')
+        self._record(status_code >= 500 or error_code in DEGRADED_ERRORS)
+
+    def after_call_error(self, exception=None, **kwargs):
+        # A spent request deadline or a rejected call says nothing about DynamoDB's health;
+        # only connection errors and timeouts that outlasted botocore's retries count
+        if isinstance(exception, (deadline.DeadlineExceededError, ServiceUnavailableError)) \
+                or not isinstance(exception, TRANSPORT_ERRORS):
+            self._release_trial()
+            return
+        self._record(True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
+
+
+def client_config() -> Config:
+    return Config(
+        region_name=REGION,
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        tcp_keepalive=TCP_KEEPALIVE,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        retries={'mode': RETRY_MODE, 'max_attempts': MAX_ATTEMPTS},
+    )
+
+
+def create_dynamodb_resource(circuit_breaker: CircuitBreaker = None):
+    """DynamoDB resource with tuned client settings (IAM role in Lambda, 'private' profile in local dev)"""
+    try:
+        # Try to use private profile for local development
+        session = boto3.Session(profile_name='private')
+    except Exception:
+        # Fall back to default credentials (IAM role in Lambda)
+        session = boto3.Session()
+    dynamodb = session.resource('dynamodb', region_name=REGION, config=client_config())
+    deadline.register(dynamodb.meta.client)
+
+    if circuit_breaker is not None:
+        events = dynamodb.meta.client.meta.events
+        events.register('before-call.dynamodb', circuit_breaker.before_call)
+        events.register('after-call.dynamodb', circuit_breaker.after_call)
+        events.register('after-call-error.dynamodb', circuit_breaker.after_call_error)
+    tracing.instrument_dynamodb(dynamodb.meta.client)
+    return dynamodb
+
+
+circuit_breaker = CircuitBreaker(CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_RESET_SECONDS) if CIRCUIT_BREAKER_ENABLED else None
@@ -0,0 +1,73 @@
+"""
+Per-request deadlines for DynamoDB work.
+
+The API middleware sets a deadline for the current request (from the Lambda's
+remaining time or a configured budget) in a context variable, which follows the
+request into the worker thread running a synchronous endpoint. Hooks on the
+DynamoDB client check it before every call and every retry attempt, so a
+request whose caller has already given up stops issuing DynamoDB calls instead
+of running on in the background. Pagination loops can also ask whether the
+deadline is near, to return a partial result while there is still time to
+send it.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+_deadline: ContextVar[Optional[float]] = ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request's deadline passed before its DynamoDB work was done"""
+
+
+def set_deadline(seconds: float):
+    """Start a deadline `seconds` from now in the current context; returns a token for reset_deadline"""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+@contextmanager
+def suspended():
+    """Run clean-up work (e.g. releasing a claim) even after the deadline has passed"""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline, or None when no deadline is set"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def near(margin: float) -> bool:
+    """Whether fewer than `margin` seconds are left"""
+    left = remaining()
+    return left is not None and left < margin
+
+
+def check(operation: str = "DynamoDB call"):
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError(f"Request deadline exceeded before {operation}")
+
+
+def before_call(model=None, **kwargs):
+    check(getattr(model, 'name', "DynamoDB call"))
+
+
+def before_send(**kwargs):
+    # Fires for every HTTP attempt, so retries and backoff stop once the budget is spent
+    check("DynamoDB request attempt")
+
+
+def register(client):
+    client.meta.events.register('before-call.dynamodb', before_call)
+    client.meta.events.register('before-send.dynamodb', before_send)
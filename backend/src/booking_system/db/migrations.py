@@ -0,0 +1,296 @@
+"""
+Online, resumable item migrations and backfills.
+
+A migration describes an idempotent per-item transform. The runner feeds it
+every matching item from a checkpointed parallel scan and writes the returned
+changes back in small transactions of conditional updates. Each update is
+conditioned on the attributes the transform depends on still holding the values
+that were read, so a concurrent API write is never overwritten: the item is read
+again and transformed afresh instead. Writes are capped with a capacity budget,
+and a run can be a dry run (nothing written) or a verify pass (count items the
+transform would still change).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from . import ids
+from .parallel_scan import CapacityBudget, ParallelScan, TableCheckpointStore
+from .sharding import date_partition_key
+
+logger = logging.getLogger(__name__)
+
+# Value returned by a transform for an attribute that should be removed
+REMOVE = object()
+
+TRANSACTION_BATCH = 25
+MAX_ITEM_ATTEMPTS = 3
+
+
+class Migration:
+    """
+    Base class for item migrations.
+
+    Subclasses set `name`, `scan_kwargs` (normally a FilterExpression selecting the
+    entity type) and `depends_on`, and implement `transform`, which returns the
+    attributes to set (or REMOVE) or None when the item is already migrated.
+    """
+
+    name: str = None
+    description: str = ""
+    scan_kwargs: dict = {}
+    depends_on: tuple = ('Version',)
+
+    def __init__(self, table):
+        self.table = table
+
+    def transform(self, item: dict) -> Optional[dict]:
+        raise NotImplementedError
+
+
+class BackfillGuestCount(Migration):
+    """Record GuestCount on reservations written before it existed, so exports can batch-get guests"""
+
+    name = 'reservation-guest-count'
+    description = "Backfill GuestCount on reservations from their PERSON# rows"
+    scan_kwargs = {
+        'FilterExpression': "EntityType = :entity_type AND attribute_not_exists(GuestCount)",
+        'ExpressionAttributeValues': {":entity_type": "Reservation"},
+        'ProjectionExpression': "PK, SK, Version, GuestCount",
+    }
+    depends_on = ('Version', 'GuestCount')
+
+    def transform(self, item: dict) -> Optional[dict]:
+        if 'GuestCount' in item:
+            return None
+        response = self.table.query(
+            KeyConditionExpression=Key('PK').eq(item['PK']) & Key('SK').begins_with('PERSON#'),
+            Select='COUNT',
+            ConsistentRead=True
+        )
+        return {'GuestCount': response['Count']}
+
+
+class ShardDateIndex(Migration):
+    """Rewrite GSI5PK of reservations to the configured date index shard scheme (see sharding.py)"""
+
+    name = 'reservation-date-index-shards'
+    description = "Move reservations' GSI5PK to the DATE_INDEX_SHARDS / DATE_INDEX_SHARD_BY key scheme"
+    scan_kwargs = {
+        'FilterExpression': "EntityType = :entity_type",
+        'ExpressionAttributeValues': {":entity_type": "Reservation"},
+        'ProjectionExpression': "PK, SK, Version, HotelId, CheckInDate, GSI5PK",
+    }
+    depends_on = ('Version', 'HotelId', 'CheckInDate')
+
+    def transform(self, item: dict) -> Optional[dict]:
+        if 'CheckInDate' not in item:
+            return None
+        expected = date_partition_key(item['CheckInDate'], item.get('HotelId'), item['PK'])
+        return {'GSI5PK': expected} if item.get('GSI5PK') != expected else None
+
+
+class BackfillBookingIndex(Migration):
+    """Give reservations created before GSI7 their keys, so they appear in the latest bookings listing"""
+
+    name = 'reservation-booking-index'
+    description = "Backfill GSI7PK/GSI7SK (bookings by hotel in creation order) from HotelId and CreatedOn"
+    scan_kwargs = {
+        'FilterExpression': "EntityType = :entity_type AND attribute_exists(HotelId) AND attribute_not_exists(GSI7SK)",
+        'ExpressionAttributeValues': {":entity_type": "Reservation"},
+        'ProjectionExpression': "PK, SK, Version, HotelId, CreatedOn, GSI7SK",
+    }
+    depends_on = ('Version', 'GSI7SK')
+
+    def transform(self, item: dict) -> Optional[dict]:
+        if 'GSI7SK' in item or 'HotelId' not in item:
+            return None
+        reservation_id = item['PK'].split('#', 1)[1]
+        if ids.is_ulid(reservation_id):
+            sort_key = reservation_id
+        else:
+            # Seeded with the PK so a rerun after a failed write computes the same key
+            try:
+                created = datetime.fromisoformat(item['CreatedOn']).replace(tzinfo=timezone.utc) if item.get('CreatedOn') else None
+            except ValueError:
+                created = None
+            sort_key = ids.from_timestamp(int(created.timestamp() * 1000) if created else 0, item['PK'])
+        return {'GSI7PK': f"BOOKING#{item['HotelId']}", 'GSI7SK': sort_key}
+
+
+MIGRATIONS = {migration.name: migration for migration in (BackfillGuestCount, ShardDateIndex, BackfillBookingIndex)}
+
+
+class MigrationRunner:
+    """Run a migration over the table with checkpointed progress and a write budget"""
+
+    def __init__(self, migration: Migration, total_segments: int = 8, workers: int = None,
+                 read_capacity_per_second: float = None, write_capacity_per_second: float = None,
+                 write_workers: int = 4, job_id: str = None):
+        self.migration = migration
+        self.table = migration.table
+        self.client = self.table.meta.client
+        self.total_segments = total_segments
+        self.workers = workers
+        self.read_capacity_per_second = read_capacity_per_second
+        self.write_budget = CapacityBudget(write_capacity_per_second) if write_capacity_per_second else None
+        self.write_workers = write_workers
+        self.job_id = job_id or f"migration-{migration.name}"
+        self.counts = {'scanned': 0, 'migrated': 0, 'skipped': 0, 'conflicts': 0}
+
+    def _scan(self, checkpointed: bool) -> ParallelScan:
+        return ParallelScan(
+            self.table,
+            total_segments=self.total_segments,
+            workers=self.workers,
+            scan_kwargs=self.migration.scan_kwargs,
+            checkpoint_store=TableCheckpointStore(self.table) if checkpointed else None,
+            job_id=self.job_id if checkpointed else None,
+            read_capacity_per_second=self.read_capacity_per_second,
+        )
+
+    def _update_action(self, item: dict, changes: dict) -> dict:
+        names, values, assignments, removals, conditions = {}, {}, [], [], ["attribute_exists(PK)"]
+        for i, (attribute, value) in enumerate(changes.items()):
+            names[f"#c{i}"] = attribute
+            if value is REMOVE:
+                removals.append(f"#c{i}")
+            else:
+                values[f":c{i}"] = value
+                assignments.append(f"#c{i} = :c{i}")
+
+        for i, attribute in enumerate(self.migration.depends_on):
+            names[f"#d{i}"] = attribute
+            if attribute in item:
+                values[f":d{i}"] = item[attribute]
+                conditions.append(f"#d{i} = :d{i}")
+            else:
+                conditions.append(f"attribute_not_exists(#d{i})")
+
+        update_expression = ' '.join(
+            clause for clause in (
+                f"SET {', '.join(assignments)}" if assignments else '',
+                f"REMOVE {', '.join(removals)}" if removals else '',
+            ) if clause
+        )
+        action = {
+            'TableName': self.table.name,
+            'Key': {'PK': item['PK'], 'SK': item['SK']},
+            'UpdateExpression': update_expression,
+            'ConditionExpression': ' AND '.join(conditions),
+            'ExpressionAttributeNames': names,
+        }
+        if values:
+            action['ExpressionAttributeValues'] = values
+        return action
+
+    def _charge(self, response: dict):
+        if self.write_budget:
+            consumed = response.get('ConsumedCapacity', [])
+            if isinstance(consumed, dict):
+                consumed = [consumed]
+            self.write_budget.consume(sum(entry.get('CapacityUnits', 0) for entry in consumed))
+
+    def _write_item(self, item: dict, changes: dict) -> str:
+        """Write one item's changes, re-reading and re-transforming it on a lost race"""
+        for _ in range(MAX_ITEM_ATTEMPTS):
+            if self.write_budget:
+                self.write_budget.wait()
+            try:
+                self._charge(self.client.update_item(**self._update_action(item, changes), ReturnConsumedCapacity='TOTAL'))
+                return 'migrated'
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+
+            item = self.table.get_item(Key={'PK': item['PK'], 'SK': item['SK']}, ConsistentRead=True).get('Item')
+            changes = self.migration.transform(item) if item else None
+            if not changes:
+                return 'skipped'
+        return 'conflicts'
+
+    def _write_batch(self, batch: List[tuple]) -> Dict[str, int]:
+        """Write up to TRANSACTION_BATCH items in one transaction, falling back to single updates"""
+        outcome = {'migrated': 0, 'skipped': 0, 'conflicts': 0}
+        if self.write_budget:
+            self.write_budget.wait()
+        try:
+            self._charge(self.client.transact_write_items(
+                TransactItems=[{'Update': self._update_action(item, changes)} for item, changes in batch],
+                ReturnConsumedCapacity='TOTAL'
+            ))
+            outcome['migrated'] = len(batch)
+            return outcome
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('TransactionCanceledException', 'TransactionConflictException'):
+                raise
+            logger.info("Migration %s: batch of %s cancelled, retrying items one by one", self.migration.name, len(batch))
+
+        for item, changes in batch:
+            outcome[self._write_item(item, changes)] += 1
+        return outcome
+
+    def restart(self):
+        """Forget checkpointed progress so the next run scans the whole table again"""
+        TableCheckpointStore(self.table).clear(self.job_id)
+
+    def run(self, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Migrate every matching item and return counts.
+
+        Progress is checkpointed per scan segment (JOB#{job_id} items), so rerunning
+        an interrupted migration resumes it. A dry run writes nothing and starts over
+        every time.
+        """
+        started = datetime.utcnow().isoformat()
+        executor = ThreadPoolExecutor(max_workers=self.write_workers)
+
+        def process(page):
+            pending = []
+            for item in page:
+                self.counts['scanned'] += 1
+                changes = self.migration.transform(item)
+                if changes:
+                    pending.append((item, changes))
+                else:
+                    self.counts['skipped'] += 1
+
+            if dry_run:
+                self.counts['migrated'] += len(pending)
+                return
+
+            batches = [pending[i:i + TRANSACTION_BATCH] for i in range(0, len(pending), TRANSACTION_BATCH)]
+            # The page is checkpointed only after all of its batches are written
+            for outcome in executor.map(self._write_batch, batches):
+                for key, count in outcome.items():
+                    self.counts[key] += count
+
+        try:
+            self._scan(checkpointed=not dry_run).run(process)
+        finally:
+            executor.shutdown(wait=True)
+
+        if not dry_run:
+            self.table.put_item(Item={
+                'PK': f"JOB#{self.job_id}",
+                'SK': 'SUMMARY',
+                'EntityType': 'MigrationSummary',
+                'Migration': self.migration.name,
+                'StartedOn': started,
+                'FinishedOn': datetime.utcnow().isoformat(),
+                **{key.capitalize(): count for key, count in self.counts.items()},
+            })
+        return dict(self.counts)
+
+    def verify(self) -> Dict[str, int]:
+        """Count the items the migration would still change, without writing or checkpointing"""
+        counts = {'scanned': 0, 'pending': 0}
+        for item in self._scan(checkpointed=False).items():
+            counts['scanned'] += 1
+            if self.migration.transform(item):
+                counts['pending'] += 1
+        return counts
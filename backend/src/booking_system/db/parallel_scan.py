@@ -0,0 +1,282 @@
+"""
+Parallel segmented table scans for maintenance and analytics jobs.
+
+A scan is split into `TotalSegments` segments that a pool of worker threads
+reads concurrently through the (thread-safe) low-level client. Pages are handed
+to the caller through an iterator or a callback in the calling thread; after a
+page has been consumed its segment position is checkpointed, so an interrupted
+job resumes where it stopped (pages are delivered at least once). Throttling is
+retried with exponential backoff, and an optional read-capacity budget keeps a
+job from starving the API of provisioned throughput.
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional
+
+from botocore.exceptions import ClientError
+
+from . import deadline
+
+logger = logging.getLogger(__name__)
+
+THROTTLING_ERRORS = (
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+)
+
+
+class FileCheckpointStore:
+    """Segment checkpoints kept in a local JSON file, for scripts run from a workstation"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self, job_id: str) -> Dict[int, dict]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r', encoding='utf-8') as fh:
+            jobs = json.load(fh)
+        return {int(segment): state for segment, state in jobs.get(job_id, {}).items()}
+
+    def save(self, job_id: str, segment: int, last_key: Optional[dict], done: bool):
+        with self._lock:
+            jobs = {}
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as fh:
+                    jobs = json.load(fh)
+            jobs.setdefault(job_id, {})[str(segment)] = {'last_key': last_key, 'done': done}
+
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, 'w', encoding='utf-8') as fh:
+                json.dump(jobs, fh, default=str)
+            os.replace(temporary_path, self.path)
+
+    def clear(self, job_id: str):
+        with self._lock:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                jobs = json.load(fh)
+            jobs.pop(job_id, None)
+            with open(self.path, 'w', encoding='utf-8') as fh:
+                json.dump(jobs, fh, default=str)
+
+
+class TableCheckpointStore:
+    """Segment checkpoints kept as JOB#{job_id} / SEGMENT#{n} items in a DynamoDB table"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def load(self, job_id: str) -> Dict[int, dict]:
+        checkpoints = {}
+        query_kwargs = {
+            'KeyConditionExpression': "PK = :pk AND begins_with(SK, :segment)",
+            'ExpressionAttributeValues': {":pk": f"JOB#{job_id}", ":segment": "SEGMENT#"},
+            'ConsistentRead': True,
+        }
+        while True:
+            response = self.table.query(**query_kwargs)
+            for item in response.get('Items', []):
+                checkpoints[int(item['SK'].split('#', 1)[1])] = {
+                    'last_key': item.get('LastEvaluatedKey'),
+                    'done': bool(item.get('Done', False)),
+                }
+            if not response.get('LastEvaluatedKey'):
+                return checkpoints
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def save(self, job_id: str, segment: int, last_key: Optional[dict], done: bool):
+        item = {
+            'PK': f"JOB#{job_id}",
+            'SK': f"SEGMENT#{segment:05d}",
+            'EntityType': 'ScanCheckpoint',
+            'Done': done,
+            'UpdatedOn': datetime.utcnow().isoformat(),
+        }
+        if last_key:
+            item['LastEvaluatedKey'] = last_key
+        self.table.put_item(Item=item)
+
+    def clear(self, job_id: str):
+        with self.table.batch_writer() as batch:
+            for segment in self.load(job_id):
+                batch.delete_item(Key={'PK': f"JOB#{job_id}", 'SK': f"SEGMENT#{segment:05d}"})
+
+
+class CapacityBudget:
+    """Token bucket of capacity units per second shared by the workers of a job"""
+
+    def __init__(self, units_per_second: float):
+        self.units_per_second = units_per_second
+        self._tokens = units_per_second
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the bucket is no longer in debt"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.units_per_second, self._tokens + (now - self._updated) * self.units_per_second)
+                self._updated = now
+                if self._tokens > 0:
+                    return
+                delay = -self._tokens / self.units_per_second
+            time.sleep(delay)
+
+    def consume(self, units: float):
+        with self._lock:
+            self._tokens -= units
+
+
+class _Page:
+    def __init__(self, segment: int, items: list, last_key: Optional[dict]):
+        self.segment = segment
+        self.items = items
+        self.last_key = last_key
+
+
+class ParallelScan:
+    """
+    Scan a table with `total_segments` segments read by `workers` threads.
+
+    `scan_kwargs` are passed to every Scan request (FilterExpression,
+    ProjectionExpression, ...) in the high-level, Python-typed form. With a
+    `checkpoint_store` and `job_id`, finished segments are skipped and unfinished
+    ones restart from their last consumed page.
+    """
+
+    def __init__(self, table, total_segments: int = 8, workers: int = None, scan_kwargs: dict = None,
+                 checkpoint_store=None, job_id: str = None, read_capacity_per_second: float = None,
+                 page_size: int = None, max_retries: int = 8):
+        if checkpoint_store is not None and not job_id:
+            raise ValueError("job_id is required when checkpointing a scan")
+        self.table = table
+        self.client = table.meta.client
+        self.total_segments = total_segments
+        self.workers = workers or min(total_segments, 8)
+        self.scan_kwargs = dict(scan_kwargs or {})
+        self.checkpoint_store = checkpoint_store
+        self.job_id = job_id
+        self.budget = CapacityBudget(read_capacity_per_second) if read_capacity_per_second else None
+        self.page_size = page_size
+        self.max_retries = max_retries
+        self.items_scanned = 0
+        self.consumed_capacity = 0.0
+
+    def _scan_page(self, segment: int, start_key: Optional[dict]) -> dict:
+        request = {
+            **self.scan_kwargs,
+            'TableName': self.table.name,
+            'Segment': segment,
+            'TotalSegments': self.total_segments,
+            'ReturnConsumedCapacity': 'TOTAL',
+        }
+        if self.page_size:
+            request['Limit'] = self.page_size
+        if start_key:
+            request['ExclusiveStartKey'] = start_key
+
+        for attempt in range(self.max_retries + 1):
+            if self.budget:
+                self.budget.wait()
+            try:
+                response = self.client.scan(**request)
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in THROTTLING_ERRORS or attempt == self.max_retries:
+                    raise
+                delay = min(20.0, 0.1 * 2 ** attempt) * random.uniform(0.5, 1.0)
+                left = deadline.remaining()
+                if left is not None and delay >= left:
+                    raise deadline.DeadlineExceededError(f"Request deadline exceeded while scan segment {segment} was throttled") from e
+                logger.warning("Scan segment %s throttled, backing off %.2fs", segment, delay)
+                time.sleep(delay)
+                continue
+
+            units = response.get('ConsumedCapacity', {}).get('CapacityUnits', 0)
+            if self.budget:
+                self.budget.consume(units)
+            self.consumed_capacity += units
+            return response
+
+    def _worker(self, segments: "queue.Queue", pages: "queue.Queue", stop: threading.Event, checkpoints: dict):
+        try:
+            while not stop.is_set():
+                try:
+                    segment = segments.get_nowait()
+                except queue.Empty:
+                    return
+
+                start_key = checkpoints.get(segment, {}).get('last_key')
+                while not stop.is_set():
+                    response = self._scan_page(segment, start_key)
+                    start_key = response.get('LastEvaluatedKey')
+                    pages.put(_Page(segment, response.get('Items', []), start_key))
+                    if not start_key:
+                        break
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(None)
+
+    def pages(self) -> Iterator[list]:
+        """Yield pages of items as workers read them, checkpointing each consumed page"""
+        checkpoints = self.checkpoint_store.load(self.job_id) if self.checkpoint_store else {}
+        segments = queue.Queue()
+        for segment in range(self.total_segments):
+            if not checkpoints.get(segment, {}).get('done'):
+                segments.put(segment)
+
+        # A small bound keeps memory flat when the consumer is slower than DynamoDB
+        pages = queue.Queue(maxsize=self.workers * 2)
+        stop = threading.Event()
+        # Workers run in copies of the caller's context, so its request deadline applies to their calls
+        threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(self._worker, segments, pages, stop, checkpoints), daemon=True)
+            for _ in range(min(self.workers, segments.qsize()))
+        ]
+        for thread in threads:
+            thread.start()
+
+        running = len(threads)
+        try:
+            while running:
+                page = pages.get()
+                if page is None:
+                    running -= 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+
+                self.items_scanned += len(page.items)
+                yield page.items
+                if self.checkpoint_store:
+                    self.checkpoint_store.save(self.job_id, page.segment, page.last_key, page.last_key is None)
+        finally:
+            stop.set()
+            # Unblock workers waiting on a full queue so they can exit
+            while any(thread.is_alive() for thread in threads):
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    def items(self) -> Iterator[dict]:
+        for page in self.pages():
+            yield from page
+
+    def run(self, callback: Callable[[list], None]) -> int:
+        """Call `callback` with every page and return the number of items scanned"""
+        for page in self.pages():
+            callback(page)
+        return self.items_scanned
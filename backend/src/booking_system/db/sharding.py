@@ -0,0 +1,58 @@
+"""
+Write sharding of the date-keyed GSI5 partitions.
+
+`GSI5PK=DATE#{check_in_date}` puts every hotel's arrivals for a date in one GSI
+partition, which throttles on peak dates. With DATE_INDEX_SHARDS above 1 the key
+becomes `DATE#{check_in_date}#{shard}`, the shard being a stable hash of the
+reservation id (spreads best; readers query every shard of a date) or of the
+hotel id (DATE_INDEX_SHARD_BY=hotel; a hotel's arrivals stay in one shard, so a
+per-hotel read queries one partition per date). One shard keeps the unsharded
+key.
+
+Changing the scheme is an online migration: deploy with the new settings and
+DATE_INDEX_PREVIOUS_SHARDS set to the old count, so readers also query the old
+keys, run the `reservation-date-index-shards` migration, then unset it.
+"""
+import os
+import zlib
+from typing import List, Optional
+
+DATE_INDEX_SHARDS = int(os.getenv("DATE_INDEX_SHARDS", "1"))
+DATE_INDEX_SHARD_BY = os.getenv("DATE_INDEX_SHARD_BY", "reservation").lower()
+DATE_INDEX_PREVIOUS_SHARDS = int(os.getenv("DATE_INDEX_PREVIOUS_SHARDS", "0"))
+
+
+def shard_of(value: str, shards: int) -> int:
+    """Stable shard of a value (crc32, the same in every process, unlike hash())"""
+    return zlib.crc32(value.encode('utf-8')) % shards
+
+
+def date_partition_key(check_in_date: str, hotel_id: Optional[str], reservation_key: str,
+                       shards: int = None, shard_by: str = None) -> str:
+    """GSI5PK of a reservation"""
+    shards = DATE_INDEX_SHARDS if shards is None else shards
+    shard_by = DATE_INDEX_SHARD_BY if shard_by is None else shard_by
+    if shards <= 1:
+        return f"DATE#{check_in_date}"
+    source = hotel_id if shard_by == 'hotel' and hotel_id else reservation_key
+    return f"DATE#{check_in_date}#{shard_of(source, shards)}"
+
+
+def date_partition_keys(check_in_date: str, hotel_ids: List[str] = None) -> List[str]:
+    """
+    Every GSI5PK that can hold arrivals on check_in_date (of the given hotels),
+    including the previous scheme's while a migration is pending.
+    """
+    keys = []
+    # The previous scheme may have sharded by something else, so all its shards are read
+    for shards, shard_by in ((DATE_INDEX_SHARDS, DATE_INDEX_SHARD_BY), (DATE_INDEX_PREVIOUS_SHARDS, None)):
+        if not shards:
+            continue
+        if shards <= 1:
+            candidates = [f"DATE#{check_in_date}"]
+        elif shard_by == 'hotel' and hotel_ids:
+            candidates = [f"DATE#{check_in_date}#{shard_of(hotel_id, shards)}" for hotel_id in hotel_ids]
+        else:
+            candidates = [f"DATE#{check_in_date}#{shard}" for shard in range(shards)]
+        keys.extend(key for key in candidates if key not in keys)
+    return keys
@@ -0,0 +1,132 @@
+"""
+Compact in-memory records for tooling that holds many reservations at once.
+
+boto3 returns every item as a dict keyed by attribute name with Decimal
+numbers; a whole-table check keeps one per reservation and guest row. Records
+keep only the attributes the checks read, in __slots__, with dates as day
+ordinals, numbers as ints and the strings that repeat across items (hotel and
+room ids, index partition keys, reservation keys shared with their guest rows)
+interned so each is stored once. Guest rows, the most numerous, are kept as
+columns rather than one object each.
+"""
+from array import array
+from datetime import date
+from functools import lru_cache
+from sys import intern
+from typing import Iterator, Optional, Tuple
+
+
+# A table holds a few thousand distinct dates, each parsed and formatted once
+@lru_cache(maxsize=8192)
+def _ordinal(value) -> Optional[int]:
+    try:
+        return date.fromisoformat(value[:10]).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=8192)
+def _iso_date(ordinal: int) -> str:
+    return intern(date.fromordinal(ordinal).isoformat())
+
+
+class ReservationRecord:
+    """A reservation item's identity, stay and derived index keys"""
+
+    __slots__ = ('key', 'hotel_id', 'room_id', 'check_in', 'check_out', 'is_deleted', 'guest_count', 'index_keys', 'raw_dates')
+
+    # Index attributes kept, in the order of index_keys
+    INDEX_ATTRIBUTES = ('GSI4PK', 'GSI4SK', 'GSI5PK', 'GSI5SK')
+
+    def __init__(self, key: str, hotel_id: Optional[str], room_id: Optional[str], check_in: Optional[int], check_out: Optional[int],
+                 is_deleted: bool = False, guest_count: Optional[int] = None, index_keys: Tuple = (None, None, None, None),
+                 raw_dates: Optional[Tuple] = None):
+        self.key = key
+        self.hotel_id = hotel_id
+        self.room_id = room_id
+        self.check_in = check_in
+        self.check_out = check_out
+        self.is_deleted = is_deleted
+        self.guest_count = guest_count
+        self.index_keys = index_keys
+        # The stored CheckInDate/CheckOutDate when either is not a plain YYYY-MM-DD
+        self.raw_dates = raw_dates
+
+    @classmethod
+    def from_item(cls, item: dict) -> 'ReservationRecord':
+        get = item.get
+        key = intern(item['PK'])
+        hotel_id, room_id, gsi4_pk, gsi5_pk = get('HotelId'), get('RoomId'), get('GSI4PK'), get('GSI5PK')
+        gsi4_sk, gsi5_sk = get('GSI4SK'), get('GSI5SK')
+        check_in_date, check_out_date = get('CheckInDate'), get('CheckOutDate')
+        check_in, check_out = _ordinal(check_in_date), _ordinal(check_out_date)
+        guest_count = get('GuestCount')
+        return cls(
+            key,
+            intern(hotel_id) if hotel_id.__class__ is str else hotel_id,
+            intern(room_id) if room_id.__class__ is str else room_id,
+            check_in,
+            check_out,
+            bool(get('IsDeleted')),
+            int(guest_count) if guest_count is not None else None,
+            # Sort keys normally repeat the PK; reuse its string instead of keeping a copy
+            (intern(gsi4_pk) if gsi4_pk.__class__ is str else gsi4_pk, key if gsi4_sk == key else gsi4_sk,
+             intern(gsi5_pk) if gsi5_pk.__class__ is str else gsi5_pk, key if gsi5_sk == key else gsi5_sk),
+            None if check_in is not None and check_out is not None and len(check_in_date) == 10 and len(check_out_date) == 10
+            else (check_in_date, check_out_date),
+        )
+
+    @property
+    def reservation_id(self) -> str:
+        return self.key.split('#', 1)[1]
+
+    @property
+    def check_in_date(self) -> Optional[str]:
+        return self.raw_dates[0] if self.raw_dates else _iso_date(self.check_in)
+
+    @property
+    def check_out_date(self) -> Optional[str]:
+        return self.raw_dates[1] if self.raw_dates else _iso_date(self.check_out)
+
+    def to_item(self) -> dict:
+        """The attributes the record was built from, in the item's JSON shape"""
+        item = {'PK': self.key, 'SK': 'METADATA', 'EntityType': 'Reservation', 'IsDeleted': self.is_deleted}
+        for attribute, value in (('HotelId', self.hotel_id), ('RoomId', self.room_id),
+                                 ('CheckInDate', self.check_in_date), ('CheckOutDate', self.check_out_date),
+                                 ('GuestCount', self.guest_count)):
+            if value is not None:
+                item[attribute] = value
+        item.update((attribute, value) for attribute, value in zip(self.INDEX_ATTRIBUTES, self.index_keys) if value is not None)
+        return item
+
+
+class PersonRows:
+    """
+    PERSON# rows as two columns, the reservation key (interned) and the person
+    number; rows of a purged reservation, which the table TTL removes in no
+    particular order, are only counted.
+    """
+
+    __slots__ = ('keys', 'numbers', 'expiring')
+
+    def __init__(self):
+        self.keys = []
+        self.numbers = array('I')
+        self.expiring = 0
+
+    def append_item(self, item: dict):
+        if 'ExpiresAt' in item:
+            self.expiring += 1
+            return
+        self.keys.append(intern(item['PK']))
+        self.numbers.append(int(item['SK'][7:]))  # after 'PERSON#'
+
+    def __len__(self) -> int:
+        return len(self.keys) + self.expiring
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        return zip(self.keys, self.numbers)
+
+    def to_items(self) -> Iterator[dict]:
+        for key, number in self:
+            yield {'PK': key, 'SK': f"PERSON#{number}", 'EntityType': 'ReservationPerson'}
@@ -1,13 +1,15 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+from decimal import Decimal
 
 class Guest(BaseModel):
     first_name: str
     last_name: str
 
 class Reservation(BaseModel):
-    reservation_id: str
+    # Generated by the server (time-sortable) when missing
+    reservation_id: Optional[str] = None
     room_number: str
     check_in_date: str
     check_out_date: str
@@ -17,20 +19,25 @@ class Reservation(BaseModel):
     contact_phone: str
     notes: str
     guests: List[Guest]
+    room_price: Optional[Decimal] = None
+    transport_price: Optional[Decimal] = None
     is_deleted: Optional[bool] = False
     deleted_on: Optional[datetime] = None
     deleted_by: Optional[str] = None
 
 class ReservationUpdate(BaseModel):
-    room_number: str
-    check_in_date: str
-    check_out_date: str
-    status: str
-    contact_name: str
-    contact_last_name: str
-    contact_phone: str
-    notes: str
-    guests: List[Guest]
+    room_number: Optional[str] = None
+    check_in_date: Optional[str] = None
+    check_out_date: Optional[str] = None
+    status: Optional[str] = None
+    contact_name: Optional[str] = None
+    contact_last_name: Optional[str] = None
+    contact_phone: Optional[str] = None
+    notes: Optional[str] = None
+    guests: Optional[List[Guest]] = None
+    room_price: Optional[Decimal] = None
+    transport_price: Optional[Decimal] = None
+    version: Optional[int] = None
 
 class Room(BaseModel):
     room_number: str
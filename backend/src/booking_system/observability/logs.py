@@ -0,0 +1,147 @@
+"""
+Structured, low-overhead logging for the API.
+
+configure_logging() replaces the root handlers with one that writes a JSON
+object per record (or plain text with LOG_FORMAT=text). Messages use %-style
+arguments, which are only formatted once a record passes the level check and is
+emitted. Levels are set per module from LOG_LEVELS, e.g.
+"booking_system.auth=WARNING,botocore=ERROR".
+
+Each request gets a mutable log context with its request id (and the user once
+authenticated) that is attached to every record it emits. Debug records are
+kept for a LOG_DEBUG_SAMPLE_RATE fraction of requests only, so debug detail can
+stay on in production at a bounded cost.
+
+With LOG_QUEUE=true records are handed to a background thread through a queue,
+so request threads never block on the stream (for uvicorn deployments; in Lambda
+the process is frozen between invocations and records could be left behind).
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0"))
+LOG_QUEUE = os.getenv("LOG_QUEUE", "false").lower() == "true"
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request'}
+
+# "booking_system", or "src.booking_system" as packaged for Lambda
+_PACKAGE = __name__.rsplit('.', 2)[0]
+
+_request: ContextVar[Optional[dict]] = ContextVar('log_request', default=None)
+
+
+def begin_request(request_id: str, sample_rate: float = None):
+    """Open the log context of a request; returns a token for end_request"""
+    rate = LOG_DEBUG_SAMPLE_RATE if sample_rate is None else sample_rate
+    return _request.set({'request_id': request_id, 'sampled': rate > 0 and random.random() < rate})
+
+
+def end_request(token):
+    _request.reset(token)
+
+
+def bind(**fields):
+    """Add fields (e.g. the authenticated user) to every later record of the current request"""
+    context = _request.get()
+    if context is not None:
+        context.update(fields)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attaches the request's log context to records and drops debug records of unsampled requests"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _request.get()
+        if context is None:
+            return True
+        if record.levelno < logging.INFO and not context['sampled']:
+            return False
+        record.request = {key: value for key, value in context.items() if key != 'sampled'}
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'request', None) or {})
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        request = getattr(record, 'request', None)
+        return f"{line} {request}" if request else line
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting of the message to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+def parse_levels(spec: str) -> dict:
+    """'a=DEBUG,b.c=WARNING' -> {'a': 'DEBUG', 'b.c': 'WARNING'}"""
+    levels = {}
+    for part in spec.split(','):
+        if '=' in part:
+            name, level = part.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """Install the structured handler on the root logger, replacing any existing handlers"""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else TextFormatter())
+
+    if LOG_QUEUE:
+        records = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        handler = _LazyQueueHandler(records)
+    # The filter runs on the request's own thread, where its context is visible
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+
+    # Sampled requests need debug records of our own modules to reach the filter
+    if LOG_DEBUG_SAMPLE_RATE > 0:
+        logging.getLogger(_PACKAGE).setLevel(logging.DEBUG)
+    for name, level in parse_levels(LOG_LEVELS).items():
+        if name.split('.')[0] == 'booking_system':
+            name = _PACKAGE + name[len('booking_system'):]
+        logging.getLogger(name).setLevel(level)
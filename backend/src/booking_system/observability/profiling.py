@@ -0,0 +1,275 @@
+"""
+On-demand profiling of single API requests.
+
+A request is profiled when PROFILE_ALL_REQUESTS is on, or when it carries an
+`X-Profile` header signed with PROFILE_SIGNING_KEY for its path (see
+sign_request). When neither is configured the middleware and route class are not
+installed at all, so there is no overhead.
+
+A profiled request is followed on the event loop thread (middleware, auth,
+serialization) and on the worker thread running its synchronous endpoint:
+
+- sampling (default): a background thread records the stacks of those threads
+  every PROFILE_SAMPLE_INTERVAL_MS and writes them in the collapsed-stack format
+  read by flamegraph.pl and speedscope. Shows wall-clock time, including
+  waiting on DynamoDB.
+- deterministic: cProfile, written as a .prof file for pstats or snakeviz.
+
+Profiles go to the PROFILE_OUTPUT directory, or to the log with
+PROFILE_OUTPUT=log. The response carries the profile id in `X-Profile-Id`.
+Under uvicorn, other requests interleaving on the event loop can show up in a
+profile.
+"""
+import cProfile
+import functools
+import hashlib
+import hmac
+import inspect
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ALL_REQUESTS = os.getenv("PROFILE_ALL_REQUESTS", "false").lower() == "true"
+PROFILE_SIGNING_KEY = os.getenv("PROFILE_SIGNING_KEY", "")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sampling").lower()
+PROFILE_OUTPUT = os.getenv("PROFILE_OUTPUT", "/tmp/profiles")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "2"))
+
+PROFILING_ENABLED = PROFILE_ALL_REQUESTS or bool(PROFILE_SIGNING_KEY)
+
+PROFILE_HEADER = b"x-profile"
+
+_active: ContextVar[Optional["_Profile"]] = ContextVar('active_profile', default=None)
+
+
+def sign_request(key: str, path: str, expires: int) -> str:
+    """Value of the X-Profile header that enables profiling of `path` until `expires` (unix time)"""
+    signature = hmac.new(key.encode('utf-8'), f"{expires}:{path}".encode('utf-8'), hashlib.sha256).hexdigest()
+    return f"{expires}:{signature}"
+
+
+def verify_request(key: str, path: str, header: str) -> bool:
+    expires, _, signature = header.partition(':')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(sign_request(key, path, int(expires)), header)
+
+
+class _Profile:
+    extension = ''
+
+    def __init__(self, profile_id: str):
+        self.profile_id = profile_id
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def run(self, function, *args, **kwargs):
+        """Run part of the request on the current (worker) thread, profiling it too"""
+        return function(*args, **kwargs)
+
+    def render(self) -> str:
+        raise NotImplementedError
+
+    def save(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.profile_id}{self.extension}")
+        with open(path, 'w') as f:
+            f.write(self.render())
+        return path
+
+
+class SamplingProfile(_Profile):
+    extension = '.collapsed'
+
+    def __init__(self, profile_id: str, interval_seconds: float):
+        super().__init__(profile_id)
+        self.interval_seconds = interval_seconds
+        self.samples = Counter()
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def _follow(self, ident: int, name: str):
+        with self._lock:
+            self._threads[ident] = name
+
+    def _unfollow(self, ident: int):
+        with self._lock:
+            self._threads.pop(ident, None)
+
+    def start(self):
+        self._follow(threading.get_ident(), 'event-loop')
+        self._sampler = threading.Thread(target=self._sample, name='request-profiler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def run(self, function, *args, **kwargs):
+        ident = threading.get_ident()
+        self._follow(ident, 'worker')
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self._unfollow(ident)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval_seconds):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for ident, name in threads:
+                frame = frames.get(ident)
+                # An idle event loop is waiting for the worker thread, which is sampled itself
+                if frame is None or frame.f_code.co_filename.endswith('selectors.py'):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(name)
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def render(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class DeterministicProfile(_Profile):
+    extension = '.prof'
+
+    def __init__(self, profile_id: str):
+        super().__init__(profile_id)
+        self._profiles = []
+        self._loop_profile = None
+        self._lock = threading.Lock()
+
+    def _enable(self) -> Optional[cProfile.Profile]:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler, which then already sees every thread
+            return None
+        with self._lock:
+            self._profiles.append(profile)
+        return profile
+
+    def start(self):
+        self._loop_profile = self._enable()
+
+    def stop(self):
+        if self._loop_profile is not None:
+            self._loop_profile.disable()
+
+    def run(self, function, *args, **kwargs):
+        profile = self._enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+
+    def stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self._profiles[0], stream=io.StringIO())
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def render(self) -> str:
+        stream = io.StringIO()
+        stats = self.stats()
+        stats.stream = stream
+        stats.sort_stats('cumulative').print_stats(40)
+        return stream.getvalue()
+
+    def save(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.profile_id}{self.extension}")
+        self.stats().dump_stats(path)
+        return path
+
+
+def _new_profile() -> _Profile:
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    if PROFILE_MODE == 'deterministic':
+        return DeterministicProfile(profile_id)
+    return SamplingProfile(profile_id, PROFILE_SAMPLE_INTERVAL_MS / 1000)
+
+
+def _profiled(endpoint):
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        return profile.run(endpoint, *args, **kwargs)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Route class that lets a request's profile follow its synchronous endpoint into the threadpool"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def _wanted(self, scope) -> bool:
+        if PROFILE_ALL_REQUESTS:
+            return True
+        header = dict(scope["headers"]).get(PROFILE_HEADER)
+        return header is not None and verify_request(PROFILE_SIGNING_KEY, scope["path"], header.decode('latin-1'))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        profile = _new_profile()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.profile_id.encode())]
+            await send(message)
+
+        token = _active.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            _active.reset(token)
+            self._write(scope, profile)
+
+    def _write(self, scope, profile: _Profile):
+        try:
+            if PROFILE_OUTPUT == 'log':
+                logger.info("Profile %s of %s %s", profile.profile_id, scope["method"], scope["path"], extra={"profile": profile.render()})
+            else:
+                path = profile.save(PROFILE_OUTPUT)
+                logger.info("Profile %s of %s %s written to %s", profile.profile_id, scope["method"], scope["path"], path)
+        except Exception as e:
+            logger.error("Failed to write profile %s: %s", profile.profile_id, e, exc_info=True)
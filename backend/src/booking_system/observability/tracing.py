@@ -0,0 +1,306 @@
+"""
+Lightweight tracing with the OpenTelemetry data model.
+
+Spans carry W3C trace and span ids (an incoming `traceparent` header continues
+the caller's trace), a kind, start/end times, attributes named after the
+OpenTelemetry semantic conventions (`http.route`, `db.operation`,
+`aws.dynamodb.index_name`, ...) and a status. The current span lives in a
+context variable, so spans opened in a synchronous endpoint's worker thread
+nest under the request's span.
+
+Finished spans go to a pluggable exporter, anything with `export(spans)`.
+TRACING_EXPORTER selects a built-in exporter:
+
+- off (default): span() hands out a shared no-op span and the DynamoDB hooks
+  return straight away.
+- memory: kept in a list, for tests.
+- file: one JSON object per span appended to TRACING_FILE.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "off").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "/tmp/traces.jsonl")
+
+INTERNAL = 'INTERNAL'
+SERVER = 'SERVER'
+CLIENT = 'CLIENT'
+
+UNSET = 'UNSET'
+OK = 'OK'
+ERROR = 'ERROR'
+
+_current: ContextVar[Optional["Span"]] = ContextVar('current_span', default=None)
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: str, attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes)
+        self.status = UNSET
+        self.status_message = None
+        self.events = []
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_status(self, status: str, message: str = None):
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, exception: BaseException):
+        self.events.append({
+            'name': 'exception',
+            'timestamp': time.time_ns(),
+            'attributes': {'exception.type': type(exception).__name__, 'exception.message': str(exception)},
+        })
+        self.set_status(ERROR, str(exception))
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        _export(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        """Same shape as the OpenTelemetry SDK's ReadableSpan.to_json()"""
+        def timestamp(ns):
+            return datetime.fromtimestamp(ns / 1e9, timezone.utc).isoformat() if ns else None
+        return {
+            'name': self.name,
+            'context': {'trace_id': f"0x{self.trace_id}", 'span_id': f"0x{self.span_id}", 'trace_state': '[]'},
+            'kind': f"SpanKind.{self.kind}",
+            'parent_id': f"0x{self.parent_id}" if self.parent_id else None,
+            'start_time': timestamp(self.start_ns),
+            'end_time': timestamp(self.end_ns),
+            'status': {'status_code': self.status, **({'description': self.status_message} if self.status_message else {})},
+            'attributes': self.attributes,
+            'events': [{**event, 'timestamp': timestamp(event['timestamp'])} for event in self.events],
+            'links': [],
+            'resource': {'attributes': {'service.name': 'booking-system'}},
+        }
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+    def set_status(self, status, message=None):
+        pass
+
+    def record_exception(self, exception):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class InMemorySpanExporter:
+    def __init__(self):
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        with self._lock:
+            self._spans.extend(spans)
+
+    def get_finished_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+class FileSpanExporter:
+    """Appends one JSON object per span to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = ''.join(json.dumps(span.to_dict(), default=str) + '\n' for span in spans)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(lines)
+
+
+def _default_exporter():
+    if TRACING_EXPORTER == 'memory':
+        return InMemorySpanExporter()
+    if TRACING_EXPORTER == 'file':
+        return FileSpanExporter(TRACING_FILE)
+    return None
+
+
+exporter = _default_exporter()
+
+
+def set_exporter(new_exporter):
+    """Route finished spans to `new_exporter` (None turns span() into a no-op)"""
+    global exporter
+    exporter = new_exporter
+
+
+def enabled() -> bool:
+    return exporter is not None
+
+
+def _export(span: Span):
+    try:
+        exporter.export([span])
+    except Exception as e:
+        logger.warning("Failed to export span %s: %s", span.name, e)
+
+
+def parse_traceparent(header: Optional[str]):
+    """(trace_id, parent span_id) of a W3C traceparent header, or None"""
+    parts = (header or '').split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def start_span(name: str, kind: str = INTERNAL, attributes: dict = None, parent: tuple = None):
+    """
+    Start a span under the current one (or under `parent`, a (trace_id, span_id)
+    pair from another process) without making it current. The caller ends it.
+    """
+    if exporter is None:
+        return NOOP_SPAN
+    if parent is None:
+        current = _current.get()
+        parent = (current.trace_id, current.span_id) if current is not None else None
+    trace_id, parent_id = parent if parent else (f"{random.getrandbits(128):032x}", None)
+    return Span(name, trace_id, parent_id, kind, attributes or {})
+
+
+@contextmanager
+def span(name: str, kind: str = INTERNAL, attributes: dict = None, parent: tuple = None):
+    """Run a block in a span that is current for everything the block calls"""
+    if exporter is None:
+        yield NOOP_SPAN
+        return
+    current = start_span(name, kind, attributes, parent)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+# DynamoDB operations that accept ReturnConsumedCapacity
+_CAPACITY_OPERATIONS = {
+    'GetItem', 'PutItem', 'UpdateItem', 'DeleteItem', 'Query', 'Scan',
+    'BatchGetItem', 'BatchWriteItem', 'TransactGetItems', 'TransactWriteItems',
+}
+
+
+def _dynamodb_params(params=None, model=None, context=None, **kwargs):
+    if exporter is None:
+        return
+    if model.name in _CAPACITY_OPERATIONS:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+    context['trace_attributes'] = {
+        'aws.dynamodb.table_names': [params['TableName']] if 'TableName' in params else None,
+        'aws.dynamodb.index_name': params.get('IndexName'),
+        'aws.dynamodb.consistent_read': params.get('ConsistentRead'),
+        'aws.dynamodb.limit': params.get('Limit'),
+        'aws.dynamodb.segment': params.get('Segment'),
+    }
+
+
+def _dynamodb_before_call(model=None, context=None, **kwargs):
+    if exporter is None:
+        return
+    attributes = {'db.system': 'dynamodb', 'db.operation': model.name, 'rpc.service': 'DynamoDB', 'rpc.method': model.name}
+    current = start_span(f"DynamoDB.{model.name}", CLIENT, attributes)
+    for key, value in context.get('trace_attributes', {}).items():
+        current.set_attribute(key, value)
+    context['trace_span'] = current
+
+
+def _consumed_capacity(parsed: dict) -> Optional[float]:
+    consumed = parsed.get('ConsumedCapacity')
+    if consumed is None:
+        return None
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return sum(entry.get('CapacityUnits', 0) for entry in consumed)
+
+
+def _item_count(parsed: dict) -> Optional[int]:
+    if 'Count' in parsed:
+        return parsed['Count']
+    if 'Items' in parsed:
+        return len(parsed['Items'])
+    if 'Responses' in parsed:
+        responses = parsed['Responses']
+        return sum(len(items) for items in responses.values()) if isinstance(responses, dict) else len(responses)
+    if 'Item' in parsed:
+        return 1
+    return None
+
+
+def _dynamodb_after_call(http_response=None, parsed=None, context=None, **kwargs):
+    current = context.pop('trace_span', None)
+    if current is None:
+        return
+    parsed = parsed or {}
+    current.set_attribute('aws.dynamodb.item_count', _item_count(parsed))
+    current.set_attribute('aws.dynamodb.scanned_count', parsed.get('ScannedCount'))
+    current.set_attribute('aws.dynamodb.consumed_capacity', _consumed_capacity(parsed))
+    current.set_attribute('aws.dynamodb.has_more', 'LastEvaluatedKey' in parsed or None)
+    current.set_attribute('http.response.status_code', getattr(http_response, 'status_code', None))
+    error_code = parsed.get('Error', {}).get('Code')
+    if error_code:
+        current.set_status(ERROR, error_code)
+    current.end()
+
+
+def _dynamodb_after_call_error(exception=None, context=None, **kwargs):
+    current = context.pop('trace_span', None)
+    if current is not None:
+        current.record_exception(exception)
+        current.end()
+
+
+def instrument_dynamodb(client):
+    """
+    Record a client span per DynamoDB call, with index name, item count and consumed
+    capacity. Register after other before-call hooks, so calls they reject start no span.
+    """
+    events = client.meta.events
+    events.register('before-parameter-build.dynamodb', _dynamodb_params)
+    events.register('before-call.dynamodb', _dynamodb_before_call)
+    events.register('after-call.dynamodb', _dynamodb_after_call)
+    events.register('after-call-error.dynamodb', _dynamodb_after_call_error)
@@ -0,0 +1,125 @@
+"""
+Vectorised occupancy and revenue analytics.
+
+Stays are expanded into room-nights with NumPy index arithmetic and aggregated
+with bincount, so the cost grows with the number of stays and days rather than
+with Python-level loops over every night.
+"""
+from datetime import date
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+class StayColumns:
+    """Column-oriented stays collected from reservation items"""
+
+    def __init__(self):
+        self.check_in: List[int] = []
+        self.check_out: List[int] = []
+        self.room_price: List[float] = []
+        self.transport_price: List[float] = []
+        self.room_type: List[str] = []
+
+    def append(self, check_in: int, check_out: int, room_price, transport_price, room_type: str):
+        self.check_in.append(check_in)
+        self.check_out.append(check_out)
+        self.room_price.append(float(room_price or 0))
+        self.transport_price.append(float(transport_price or 0))
+        self.room_type.append(room_type)
+
+
+def _period_labels(start: int, days: int, granularity: str) -> np.ndarray:
+    """Label every day of the window with the day, ISO week start or month it belongs to"""
+    ordinals = np.arange(start, start + days)
+    if granularity == 'week':
+        # date.fromordinal(1) is a Monday, so (ordinal - 1) % 7 is the weekday
+        ordinals = ordinals - (ordinals - 1) % 7
+    dates = [date.fromordinal(int(ordinal)) for ordinal in ordinals]
+    if granularity == 'month':
+        return np.array([d.strftime('%Y-%m') for d in dates])
+    return np.array([d.isoformat() for d in dates])
+
+
+def compute_analytics(stays: StayColumns, rooms_available: int, start: int, end: int, granularity: str = 'day') -> Dict:
+    """
+    Occupancy %, ADR, RevPAR and room-type mix for the nights [start, end).
+
+    RoomPrice is a nightly rate. TransportPrice is counted once per stay, on its
+    check-in day, and kept out of ADR and RevPAR.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    days = max(end - start, 0)
+    check_in = np.asarray(stays.check_in, dtype=np.int64) - start
+    check_out = np.asarray(stays.check_out, dtype=np.int64) - start
+    rate = np.asarray(stays.room_price, dtype=np.float64)
+    transport = np.asarray(stays.transport_price, dtype=np.float64)
+    type_names, type_codes = np.unique(np.asarray(stays.room_type, dtype=object).astype(str), return_inverse=True)
+
+    # Expand each stay into one entry per night that falls inside the window
+    first = np.clip(check_in, 0, days)
+    last = np.clip(check_out, 0, days)
+    nights = np.maximum(last - first, 0)
+    total = int(nights.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(nights) - nights, nights)
+    night_day = np.repeat(first, nights) + offsets
+
+    sold = np.bincount(night_day, minlength=days)[:days]
+    revenue = np.bincount(night_day, weights=np.repeat(rate, nights), minlength=days)[:days]
+    mix = np.bincount(
+        np.repeat(type_codes, nights) * days + night_day,
+        minlength=len(type_names) * days
+    ).reshape(len(type_names), days)
+
+    arrives = (check_in >= 0) & (check_in < days)
+    transport_revenue = np.bincount(check_in[arrives], weights=transport[arrives], minlength=days)[:days]
+
+    # Roll days up into periods
+    labels, period = np.unique(_period_labels(start, days, granularity), return_inverse=True)
+    periods = len(labels)
+    period_days = np.bincount(period, minlength=periods)
+    period_sold = np.bincount(period, weights=sold, minlength=periods)
+    period_revenue = np.bincount(period, weights=revenue, minlength=periods)
+    period_transport = np.bincount(period, weights=transport_revenue, minlength=periods)
+    period_mix = np.array([np.bincount(period, weights=row, minlength=periods) for row in mix]).reshape(len(type_names), periods)
+
+    capacity = period_days * rooms_available
+    with np.errstate(divide='ignore', invalid='ignore'):
+        occupancy = np.where(capacity > 0, period_sold / capacity * 100, 0.0)
+        adr = np.where(period_sold > 0, period_revenue / period_sold, 0.0)
+        revpar = np.where(capacity > 0, period_revenue / capacity, 0.0)
+
+    def summary(sold_total, revenue_total, capacity_total, transport_total, mix_totals: Sequence[float]):
+        return {
+            'rooms_available': int(capacity_total),
+            'rooms_sold': int(sold_total),
+            'occupancy_pct': round(float(sold_total / capacity_total * 100), 2) if capacity_total else 0.0,
+            'room_revenue': round(float(revenue_total), 2),
+            'adr': round(float(revenue_total / sold_total), 2) if sold_total else 0.0,
+            'revpar': round(float(revenue_total / capacity_total), 2) if capacity_total else 0.0,
+            'transport_revenue': round(float(transport_total), 2),
+            'room_type_mix': {str(name): int(count) for name, count in zip(type_names, mix_totals) if count},
+        }
+
+    return {
+        'granularity': granularity,
+        'periods': [
+            {
+                'period': str(labels[i]),
+                'rooms_available': int(capacity[i]),
+                'rooms_sold': int(period_sold[i]),
+                'occupancy_pct': round(float(occupancy[i]), 2),
+                'room_revenue': round(float(period_revenue[i]), 2),
+                'adr': round(float(adr[i]), 2),
+                'revpar': round(float(revpar[i]), 2),
+                'transport_revenue': round(float(period_transport[i]), 2),
+                'room_type_mix': {str(name): int(period_mix[t, i]) for t, name in enumerate(type_names) if period_mix[t, i]},
+            }
+            for i in range(periods)
+        ],
+        'totals': summary(sold.sum(), revenue.sum(), capacity.sum(), transport_revenue.sum(), mix.sum(axis=1)),
+    }
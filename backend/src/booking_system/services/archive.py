@@ -0,0 +1,224 @@
+"""
+Cold storage for reservations whose stay is long over.
+
+The archival job moves reservations that checked out before a cutoff, with
+their guests, out of the table into gzipped NDJSON partitions, one per hotel and
+check-in month: `{hotel_id}/{YYYY-MM}.ndjson.gz`. Each line is the reservation
+item as it was stored plus its "Guests", so reads return the same shape as the
+table. A per-hotel `manifest.json` lists the archived months, the longest
+archived stay and the latest check-out date of archived active and deleted
+reservations; a range starting after that date (every hot-path query) never
+touches the partitions. It also keeps
+the span of deletion times per month, so questions about deleted reservations
+only read the months that hold deletions in the asked range.
+
+Partitions live in a store: a local directory (`file:///path`, also the local
+stand-in for S3) or an S3-compatible bucket (`s3://bucket/prefix`, with an
+endpoint URL for MinIO and the like). Partitions are rewritten whole, so the
+archive and purge jobs take a per-hotel lock item (LOCATION#{hotel_id} /
+ARCHIVE_LOCK) before writing a hotel's partitions.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import boto3
+from botocore.exceptions import ClientError
+
+MANIFEST = 'manifest.json'
+
+
+class LocalArchiveStore:
+    """Partitions as files under a directory"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.root, key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Readers see the old or the new file, never half of one
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+
+
+class S3ArchiveStore:
+    """Partitions as objects under a prefix of an S3-compatible bucket"""
+
+    def __init__(self, client, bucket: str, prefix: str = ''):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body'].read()
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return None
+            raise
+
+    def put(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+
+def open_store(url: str, endpoint_url: str = None):
+    """Store for an archive URL: file:///path or s3://bucket/prefix"""
+    parsed = urlparse(url)
+    if parsed.scheme == 'file':
+        return LocalArchiveStore(parsed.path)
+    if parsed.scheme == 's3':
+        return S3ArchiveStore(boto3.client('s3', endpoint_url=endpoint_url or None), parsed.netloc, parsed.path)
+    raise ValueError(f"Unsupported archive URL {url}, use file:///path or s3://bucket/prefix")
+
+
+def months_before(day: date, months: int) -> date:
+    """The same day `months` calendar months earlier, clamped to the end of shorter months"""
+    year, month = divmod(day.year * 12 + day.month - 1 - months, 12)
+    month += 1
+    next_month = date(year + (month == 12), month % 12 + 1, 1)
+    return date(year, month, min(day.day, (next_month - timedelta(days=1)).day))
+
+
+def _months(first: str, last: str) -> Iterator[str]:
+    year, month = int(first[:4]), int(first[5:7])
+    while f"{year:04d}-{month:02d}" <= last:
+        yield f"{year:04d}-{month:02d}"
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_partition(items: List[dict]) -> bytes:
+    items = sorted(items, key=lambda item: (item.get('CheckInDate', ''), item['PK']))
+    lines = ''.join(json.dumps(item, default=_json_default, ensure_ascii=False, sort_keys=True) + '\n' for item in items)
+    return gzip.compress(lines.encode('utf-8'), mtime=0)
+
+
+def decode_partition(data: bytes) -> List[dict]:
+    """Items of a partition, numbers as Decimal like the items boto3 returns"""
+    text = gzip.decompress(data).decode('utf-8')
+    return [json.loads(line, parse_float=Decimal, parse_int=Decimal) for line in text.splitlines() if line]
+
+
+def _stay_nights(item: dict) -> int:
+    return (date.fromisoformat(item['CheckOutDate']) - date.fromisoformat(item['CheckInDate'])).days
+
+
+class ReservationArchive:
+    def __init__(self, store, manifest_ttl_seconds: int = 300):
+        self.store = store
+        self.manifest_ttl_seconds = manifest_ttl_seconds
+        self._manifests: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _partition_key(hotel_id: str, month: str) -> str:
+        return f"{hotel_id}/{month}.ndjson.gz"
+
+    def manifest(self, hotel_id: str) -> Optional[dict]:
+        """The hotel's manifest, or None when nothing of it is archived; cached for manifest_ttl_seconds"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._manifests.get(hotel_id)
+        if cached is not None and now - cached[0] < self.manifest_ttl_seconds:
+            return cached[1]
+        data = self.store.get(f"{hotel_id}/{MANIFEST}")
+        manifest = json.loads(data) if data is not None else None
+        with self._lock:
+            self._manifests[hotel_id] = (now, manifest)
+        return manifest
+
+    def covers(self, hotel_id: str, start_date: str, include_deleted: bool = False) -> bool:
+        """Whether archived stays of the hotel can reach into a range starting at start_date"""
+        manifest = self.manifest(hotel_id)
+        if manifest is None:
+            return False
+        latest = max(manifest['latest_check_out'], manifest.get('latest_deleted_check_out', '')) if include_deleted else manifest['latest_check_out']
+        return start_date <= latest
+
+    def reservations(self, hotel_id: str, start_date: str, end_date: str) -> Iterator[dict]:
+        """Archived reservations whose stay overlaps [start_date, end_date], deleted ones included"""
+        manifest = self.manifest(hotel_id)
+        if manifest is None:
+            return
+        first = (date.fromisoformat(start_date) - timedelta(days=manifest['max_nights'])).isoformat()[:7]
+        for month in _months(first, end_date[:7]):
+            if month not in manifest['months']:
+                continue
+            data = self.store.get(self._partition_key(hotel_id, month))
+            for item in decode_partition(data) if data is not None else []:
+                if item['CheckInDate'] <= end_date and item['CheckOutDate'] >= start_date:
+                    yield item
+
+    def deleted_reservations(self, hotel_id: str, start: str, end: str) -> Iterator[dict]:
+        """Archived reservations deleted between start and end (ISO timestamps, inclusive)"""
+        manifest = self.manifest(hotel_id)
+        if manifest is None:
+            return
+        for month, (first, last) in sorted(manifest.get('deletions', {}).items()):
+            if first > end or last < start:
+                continue
+            data = self.store.get(self._partition_key(hotel_id, month))
+            for item in decode_partition(data) if data is not None else []:
+                if item.get('IsDeleted') and start <= item.get('DeletedOn', '') <= end:
+                    yield item
+
+    def append(self, hotel_id: str, items: List[dict]):
+        """
+        Merge reservations into the hotel's partitions, replacing earlier copies
+        with the same PK, then publish them in the manifest.
+        """
+        by_month: Dict[str, List[dict]] = {}
+        for item in items:
+            by_month.setdefault(item['CheckInDate'][:7], []).append(item)
+
+        self._forget(hotel_id)
+        manifest = self.manifest(hotel_id) or {'months': [], 'max_nights': 0, 'latest_check_out': '', 'latest_deleted_check_out': ''}
+        deletions = dict(manifest.get('deletions', {}))
+        for item in items:
+            if item.get('IsDeleted') and item.get('DeletedOn'):
+                month = item['CheckInDate'][:7]
+                first, last = deletions.get(month, (item['DeletedOn'], item['DeletedOn']))
+                deletions[month] = [min(first, item['DeletedOn']), max(last, item['DeletedOn'])]
+        for month, month_items in by_month.items():
+            key = self._partition_key(hotel_id, month)
+            existing = self.store.get(key)
+            merged = {item['PK']: item for item in (decode_partition(existing) if existing is not None else [])}
+            merged.update((item['PK'], item) for item in month_items)
+            self.store.put(key, encode_partition(list(merged.values())))
+
+        # Written last: readers only look at partitions the manifest lists
+        manifest = {
+            'months': sorted(set(manifest['months']) | set(by_month)),
+            'max_nights': max([manifest['max_nights']] + [_stay_nights(item) for item in items]),
+            'latest_check_out': max([manifest['latest_check_out']] + [item['CheckOutDate'] for item in items if not item.get('IsDeleted')]),
+            'latest_deleted_check_out': max([manifest.get('latest_deleted_check_out', '')] + [item['CheckOutDate'] for item in items if item.get('IsDeleted')]),
+            'deletions': deletions,
+        }
+        self.store.put(f"{hotel_id}/{MANIFEST}", json.dumps(manifest, indent=2).encode('utf-8'))
+        self._forget(hotel_id)
+
+    def _forget(self, hotel_id: str):
+        with self._lock:
+            self._manifests.pop(hotel_id, None)
@@ -0,0 +1,180 @@
+"""
+Parsing and batch availability validation for bulk reservation imports.
+
+Rows arrive as JSON lines or CSV. All rows are validated together with the
+hotel's existing bookings in a single sweep over intervals sorted by room and
+check-in day, so an import of n rows against m bookings costs O((n + m) log(n + m))
+instead of one availability query per row.
+"""
+import csv
+import io
+import json
+from typing import Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from ..db.ids import new_id
+from ..models.schemas import Reservation
+from .interval_index import to_ordinal
+
+CREATED = 'created'
+CONFLICT = 'conflict'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+
+
+class ImportRow:
+    """One parsed import row and its outcome"""
+
+    def __init__(self, row: int, data: dict):
+        self.row = row
+        self.data = data
+        self.reservation = None
+        self.status = None
+        self.error = None
+
+    @property
+    def reservation_id(self):
+        return self.data.get('reservation_id')
+
+    def reject(self, status: str, error: str):
+        self.status = status
+        self.error = error
+
+    def report(self) -> dict:
+        entry = {'row': self.row, 'reservation_id': self.reservation_id, 'status': self.status}
+        if self.error:
+            entry['error'] = self.error
+        return entry
+
+
+def _parse_guests(value: str) -> List[dict]:
+    """CSV guests column: 'First Last; First Last'"""
+    guests = []
+    for name in (value or '').split(';'):
+        parts = name.strip().split(' ', 1)
+        if parts[0]:
+            guests.append({'first_name': parts[0], 'last_name': parts[1] if len(parts) > 1 else ''})
+    return guests
+
+
+def parse_rows(body: bytes, content_type: str) -> List[ImportRow]:
+    """
+    Parse an import body into rows numbered from 1.
+
+    CSV needs a header row using the reservation field names, with guests given as
+    'First Last; First Last'. Anything that is not CSV is read as JSON lines.
+    """
+    text = body.decode('utf-8-sig')
+    rows = []
+
+    if 'csv' in (content_type or ''):
+        for number, record in enumerate(csv.DictReader(io.StringIO(text)), start=1):
+            data = {key.strip(): (value or '').strip() for key, value in record.items() if key}
+            data['guests'] = _parse_guests(data.get('guests', ''))
+            for price in ('room_price', 'transport_price'):
+                if not data.get(price):
+                    data.pop(price, None)
+            rows.append(ImportRow(number, data))
+        return rows
+
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            row = ImportRow(number, {})
+            row.reject(INVALID, f"Invalid JSON: {e}")
+            rows.append(row)
+            continue
+        rows.append(ImportRow(number, data if isinstance(data, dict) else {}))
+    return rows
+
+
+def validate_rows(rows: List[ImportRow]):
+    """
+    Validate each pending row against the Reservation schema and its own dates,
+    giving rows without a reservation_id a generated one.
+    """
+    seen = set()
+    for row in rows:
+        if row.status:
+            continue
+        try:
+            row.reservation = Reservation(**row.data).model_dump()
+        except ValidationError as e:
+            row.reject(INVALID, str(e))
+            continue
+        if not row.reservation['reservation_id']:
+            row.data['reservation_id'] = row.reservation['reservation_id'] = new_id()
+
+        try:
+            check_in = to_ordinal(row.reservation['check_in_date'])
+            check_out = to_ordinal(row.reservation['check_out_date'])
+        except ValueError as e:
+            row.reject(INVALID, f"Invalid date: {e}")
+            continue
+        if check_out <= check_in:
+            row.reject(INVALID, "check_out_date must be after check_in_date")
+            continue
+
+        if row.reservation_id in seen:
+            row.reject(DUPLICATE, f"Reservation {row.reservation_id} appears more than once in the import")
+            continue
+        seen.add(row.reservation_id)
+
+
+def sweep_conflicts(rows: List[ImportRow], existing: List[Tuple[str, int, int, str]]):
+    """
+    Reject pending rows that overlap an existing booking or an earlier accepted row.
+
+    `existing` holds (room_id, check_in, check_out, reservation_id) day-ordinal
+    intervals. Intervals are swept per room in check-in order; accepted rows of a
+    room never overlap, so only the most recently accepted one can collide with a
+    later existing booking, in which case that row is rejected instead.
+    """
+    events = [(room_id, check_in, 0, check_out, reservation_id) for room_id, check_in, check_out, reservation_id in existing]
+    for row in rows:
+        if not row.status:
+            reservation = row.reservation
+            events.append((
+                reservation['room_number'],
+                to_ordinal(reservation['check_in_date']),
+                1,
+                to_ordinal(reservation['check_out_date']),
+                row
+            ))
+    # Existing bookings sort before new rows starting on the same day
+    events.sort(key=lambda event: event[:3])
+
+    room = None
+    existing_end, existing_id = 0, None
+    accepted: List[Tuple[int, ImportRow]] = []
+    for room_id, check_in, is_new, check_out, owner in events:
+        if room_id != room:
+            room = room_id
+            existing_end, existing_id = 0, None
+            accepted = []
+
+        if not is_new:
+            # A booking that starts inside the last accepted row pushes that row out
+            if accepted and check_in < accepted[-1][0]:
+                accepted.pop()[1].reject(CONFLICT, f"Room {room_id} is already booked by reservation {owner}")
+            if check_out > existing_end:
+                existing_end, existing_id = check_out, owner
+            continue
+
+        if check_in < existing_end:
+            owner.reject(CONFLICT, f"Room {room_id} is already booked by reservation {existing_id}")
+        elif accepted and check_in < accepted[-1][0]:
+            owner.reject(CONFLICT, f"Room {room_id} overlaps import row {accepted[-1][1].row}")
+        else:
+            accepted.append((check_out, owner))
+
+
+def summarize(rows: List[ImportRow]) -> Dict:
+    counts = {}
+    for row in rows:
+        counts[row.status] = counts.get(row.status, 0) + 1
+    return {'total': len(rows), 'counts': counts, 'rows': [row.report() for row in rows]}
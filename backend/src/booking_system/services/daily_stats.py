@@ -0,0 +1,52 @@
+"""
+Per-hotel, per-day aggregate counters maintained at write time.
+
+A stay contributes to the day items it touches: one room sold, its guests and its
+nightly room price for every night, an arrival on its check-in day (plus its
+transport price) and a departure on its check-out day. Write paths add the
+signed contributions of the old and new versions of a reservation with atomic
+ADD updates; the rebuild tool sums the same contributions from source data.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable
+
+COUNTERS = ('RoomsSold', 'Arrivals', 'Departures', 'Guests', 'RoomRevenue', 'TransportRevenue')
+
+
+def stay_contributions(check_in_date: str, check_out_date: str, guests: int, room_price=None, transport_price=None, sign: int = 1) -> Dict[str, Dict[str, Decimal]]:
+    """Return {YYYY-MM-DD: {counter: delta}} for one stay"""
+    check_in = date.fromisoformat(check_in_date[:10])
+    check_out = date.fromisoformat(check_out_date[:10])
+    room_price = Decimal(str(room_price or 0))
+    transport_price = Decimal(str(transport_price or 0))
+
+    days: Dict[str, Dict[str, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
+    night = check_in
+    while night < check_out:
+        day = days[night.isoformat()]
+        day['RoomsSold'] += sign
+        day['Guests'] += sign * guests
+        day['RoomRevenue'] += sign * room_price
+        night += timedelta(days=1)
+
+    days[check_in.isoformat()]['Arrivals'] += sign
+    days[check_in.isoformat()]['TransportRevenue'] += sign * transport_price
+    days[check_out.isoformat()]['Departures'] += sign
+    return days
+
+
+def merge_contributions(contributions: Iterable[Dict[str, Dict[str, Decimal]]]) -> Dict[str, Dict[str, Decimal]]:
+    """Sum several contribution maps, dropping counters and days that net out to zero"""
+    merged: Dict[str, Dict[str, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
+    for contribution in contributions:
+        for day, counters in contribution.items():
+            for counter, delta in counters.items():
+                merged[day][counter] += delta
+
+    return {
+        day: {counter: delta for counter, delta in counters.items() if delta}
+        for day, counters in sorted(merged.items())
+        if any(counters.values())
+    }
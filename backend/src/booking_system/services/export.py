@@ -0,0 +1,88 @@
+"""
+Row formatting for streaming reservation exports.
+
+Reservation items are flattened into a fixed set of columns and rendered one
+row at a time as NDJSON or CSV, so an export never holds more than a page of
+reservations in memory. The CSV guests column uses the same 'First Last; First
+Last' form the bulk import reads.
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+EXPORT_COLUMNS = [
+    'reservation_id', 'hotel_id', 'room_id', 'check_in_date', 'check_out_date', 'status',
+    'contact_name', 'contact_last_name', 'contact_phone', 'notes', 'room_price',
+    'transport_price', 'guest_count', 'guests', 'is_deleted', 'created_on', 'modified_on',
+    'deleted_on', 'deleted_by',
+]
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def export_row(item: dict) -> dict:
+    """Flatten a reservation item with joined 'Guests' into export columns"""
+    guests = item.get('Guests', [])
+    return {
+        'reservation_id': item['PK'].split('#', 1)[1],
+        'hotel_id': item.get('HotelId'),
+        'room_id': item.get('RoomId'),
+        'check_in_date': item.get('CheckInDate'),
+        'check_out_date': item.get('CheckOutDate'),
+        'status': item.get('Status'),
+        'contact_name': item.get('ContactName'),
+        'contact_last_name': item.get('ContactLastName'),
+        'contact_phone': item.get('ContactPhone'),
+        'notes': item.get('Notes'),
+        'room_price': item.get('RoomPrice'),
+        'transport_price': item.get('TransportPrice'),
+        'guest_count': len(guests),
+        'guests': guests,
+        'is_deleted': bool(item.get('IsDeleted', False)),
+        'created_on': item.get('CreatedOn'),
+        'modified_on': item.get('ModifiedOn'),
+        'deleted_on': item.get('DeletedOn'),
+        'deleted_by': item.get('DeletedBy'),
+    }
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def ndjson_lines(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, default=_json_default, ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows: Iterable[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield flush()
+    for row in rows:
+        values = dict(row, guests='; '.join(f"{guest['first_name']} {guest['last_name']}".strip() for guest in row['guests']))
+        writer.writerow(['' if values[column] is None else values[column] for column in EXPORT_COLUMNS])
+        yield flush()
+
+
+def render(rows: Iterable[dict], export_format: str) -> Iterator[str]:
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    return csv_lines(rows) if export_format == 'csv' else ndjson_lines(rows)
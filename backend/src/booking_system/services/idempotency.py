@@ -0,0 +1,129 @@
+"""
+Idempotency keys for write endpoints.
+
+A client that sends an `Idempotency-Key` header claims the key with a conditional
+put before the write runs. The finished response is stored on the same record,
+so a retry with the same key gets the stored response back without repeating the
+availability check or any write. A claim is leased for about one request
+deadline (`InProgressUntil`), so a retry can take over the key of a request
+whose worker died before finishing it. Records expire through the table's TTL
+on `ExpiresAt`.
+"""
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from ..db import deadline
+
+IN_PROGRESS = 'IN_PROGRESS'
+COMPLETED = 'COMPLETED'
+
+# Conflicts the client is told to retry; the claim is released instead of storing them
+RETRYABLE_STATUS_CODES = (409, 429)
+
+
+class IdempotencyKeyReusedError(Exception):
+    """Raised when a key is replayed with a different request than it was first used for"""
+
+
+class IdempotencyInProgressError(Exception):
+    """Raised when a request with the same key is still being processed"""
+
+
+def request_fingerprint(method: str, path: str, payload) -> str:
+    body = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(f"{method} {path}\n{body}".encode('utf-8')).hexdigest()
+
+
+class IdempotencyStore:
+    """Idempotency records kept as IDEMPOTENCY#{scope}#{key} items in the booking table"""
+
+    def __init__(self, table, ttl_seconds: int, lease_seconds: int):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+
+    def _key(self, scope: str, idempotency_key: str) -> dict:
+        return {'PK': f"IDEMPOTENCY#{scope}#{idempotency_key}", 'SK': 'METADATA'}
+
+    def begin(self, scope: str, idempotency_key: str, fingerprint: str) -> Optional[Tuple[int, dict]]:
+        """
+        Claim a key for a new request. Returns None when the caller should run the
+        request, or the stored (status_code, body) of an earlier completed one.
+        """
+        now = int(time.time())
+        try:
+            self.table.put_item(
+                Item={
+                    **self._key(scope, idempotency_key),
+                    'EntityType': 'IdempotencyRecord',
+                    'Status': IN_PROGRESS,
+                    'Fingerprint': fingerprint,
+                    'CreatedOn': datetime.utcnow().isoformat(),
+                    'InProgressUntil': now + self.lease_seconds,
+                    'ExpiresAt': now + self.ttl_seconds,
+                },
+                # TTL deletes lazily, so an expired record may still be there; a claim whose
+                # lease ran out belongs to a request that was killed before it could release it
+                ConditionExpression="attribute_not_exists(PK) OR ExpiresAt < :now OR (#status = :in_progress AND InProgressUntil < :now)",
+                ExpressionAttributeNames={"#status": "Status"},
+                ExpressionAttributeValues={":now": now, ":in_progress": IN_PROGRESS}
+            )
+            return None
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+        record = self.table.get_item(Key=self._key(scope, idempotency_key), ConsistentRead=True).get('Item')
+        if record is None:
+            # Released between our put and our read; let the caller claim it again
+            return self.begin(scope, idempotency_key, fingerprint)
+        if record.get('Fingerprint') != fingerprint:
+            raise IdempotencyKeyReusedError(f"Idempotency-Key {idempotency_key} was already used for a different request")
+        if record.get('Status') != COMPLETED:
+            raise IdempotencyInProgressError(f"A request with Idempotency-Key {idempotency_key} is still being processed")
+        return int(record['StatusCode']), json.loads(record['ResponseBody'])
+
+    def complete(self, scope: str, idempotency_key: str, status_code: int, body):
+        self.table.update_item(
+            Key=self._key(scope, idempotency_key),
+            UpdateExpression="SET #status = :completed, StatusCode = :status_code, ResponseBody = :body REMOVE InProgressUntil",
+            ExpressionAttributeNames={"#status": "Status"},
+            ExpressionAttributeValues={
+                ":completed": COMPLETED,
+                ":status_code": status_code,
+                ":body": json.dumps(body, default=str),
+            }
+        )
+
+    def release(self, scope: str, idempotency_key: str):
+        """Drop the claim of a request that failed unexpectedly, so it can be retried"""
+        # Also when the request failed because its deadline passed
+        with deadline.suspended():
+            self.table.delete_item(Key=self._key(scope, idempotency_key))
+
+    def run(self, scope: str, idempotency_key: str, fingerprint: str, handler: Callable[[], Tuple[int, dict]]) -> Tuple[int, dict]:
+        """
+        Run `handler` at most once per key. Successful and client-error responses are
+        stored and replayed; on server errors and retryable conflicts the claim is
+        released, so a retry runs the request again.
+        """
+        stored = self.begin(scope, idempotency_key, fingerprint)
+        if stored is not None:
+            return stored
+
+        try:
+            status_code, body = handler()
+        except Exception:
+            self.release(scope, idempotency_key)
+            raise
+
+        if status_code >= 500 or status_code in RETRYABLE_STATUS_CODES:
+            self.release(scope, idempotency_key)
+        else:
+            self.complete(scope, idempotency_key, status_code, body)
+        return status_code, body
@@ -0,0 +1,123 @@
+"""
+Whole-table reservation integrity checks.
+
+Reservations and PERSON# rows collected in one scan are checked together:
+active stays are sorted by hotel, room and check-in day and swept once to find
+double bookings, every reservation's derived index keys are compared with the
+attributes they are built from, and guest rows are matched against their
+reservation. The whole pass is O(n log n) in the number of items.
+"""
+from typing import Dict, List
+
+from ..db.sharding import date_partition_key
+from ..models.records import PersonRows, ReservationRecord
+from .interval_index import from_ordinal
+
+OVERLAP = 'overlap'
+INVALID_DATES = 'invalid_dates'
+STALE_INDEX_KEY = 'stale_index_key'
+ORPHANED_PERSON = 'orphaned_person'
+
+# Projection covering everything the checks read
+SCAN_PROJECTION = "PK, SK, EntityType, HotelId, RoomId, CheckInDate, CheckOutDate, IsDeleted, GuestCount, GSI4PK, GSI4SK, GSI5PK, GSI5SK, ExpiresAt"
+
+
+def _index_keys(reservation_key: str, room_id, check_in_date, hotel_id) -> Dict[str, str]:
+    return {
+        'GSI4PK': f"ROOM#{room_id}",
+        'GSI4SK': reservation_key,
+        'GSI5PK': date_partition_key(check_in_date, hotel_id, reservation_key),
+        'GSI5SK': reservation_key,
+    }
+
+
+def expected_index_keys(reservation: dict) -> Dict[str, str]:
+    """The GSI4/GSI5 keys a reservation item should carry given its room and check-in date"""
+    return _index_keys(reservation['PK'], reservation.get('RoomId'), reservation.get('CheckInDate'), reservation.get('HotelId'))
+
+
+def find_stale_index_keys(reservations: List[ReservationRecord]) -> List[dict]:
+    issues = []
+    for reservation in reservations:
+        expected = _index_keys(reservation.key, reservation.room_id, reservation.check_in_date, reservation.hotel_id)
+        if tuple(expected.values()) == reservation.index_keys:
+            continue
+        found = dict(zip(ReservationRecord.INDEX_ATTRIBUTES, reservation.index_keys))
+        stale = {key: value for key, value in expected.items() if found[key] != value}
+        if stale:
+            issues.append({
+                'type': STALE_INDEX_KEY,
+                'hotel_id': reservation.hotel_id,
+                'reservation_id': reservation.reservation_id,
+                'found': {key: found[key] for key in stale},
+                'expected': stale,
+            })
+    return issues
+
+
+def find_overlaps(reservations: List[ReservationRecord]) -> List[dict]:
+    """
+    Report every active stay that shares a night with an earlier stay of its room.
+
+    Stays are swept per (hotel, room) in check-in order while tracking the stay
+    that runs longest so far; a stay starting before that one checks out is
+    double-booked against it.
+    """
+    issues = []
+    stays = []
+    for reservation in reservations:
+        if reservation.is_deleted:
+            continue
+        check_in, check_out = reservation.check_in, reservation.check_out
+        if check_in is None or check_out is None or check_out <= check_in:
+            issues.append({
+                'type': INVALID_DATES,
+                'hotel_id': reservation.hotel_id,
+                'reservation_id': reservation.reservation_id,
+                'check_in_date': reservation.check_in_date,
+                'check_out_date': reservation.check_out_date,
+            })
+            continue
+        stays.append((reservation.hotel_id or '', reservation.room_id or '', check_in, check_out, reservation.reservation_id))
+
+    stays.sort()
+    current_room = None
+    running_end, running_id = 0, None
+    for hotel_id, room_id, check_in, check_out, reservation_id in stays:
+        if (hotel_id, room_id) != current_room:
+            current_room = (hotel_id, room_id)
+            running_end, running_id = 0, None
+
+        if check_in < running_end:
+            issues.append({
+                'type': OVERLAP,
+                'hotel_id': hotel_id,
+                'room_id': room_id,
+                'reservation_id': reservation_id,
+                'conflicts_with': running_id,
+                'overlap_start': from_ordinal(check_in),
+                'overlap_end': from_ordinal(min(check_out, running_end)),
+            })
+        if check_out > running_end:
+            running_end, running_id = check_out, reservation_id
+    return issues
+
+
+def find_orphaned_persons(reservations: List[ReservationRecord], persons: PersonRows) -> List[dict]:
+    """PERSON# rows with no reservation item, or numbered beyond the reservation's GuestCount"""
+    guest_counts = {reservation.key: reservation.guest_count for reservation in reservations}
+    issues = []
+    for reservation_key, number in persons:
+        if reservation_key not in guest_counts:
+            reason = 'missing_reservation'
+        elif guest_counts[reservation_key] is not None and number > guest_counts[reservation_key]:
+            reason = 'beyond_guest_count'
+        else:
+            continue
+        issues.append({
+            'type': ORPHANED_PERSON,
+            'reservation_id': reservation_key.split('#', 1)[1],
+            'person': f"PERSON#{number}",
+            'reason': reason,
+        })
+    return issues
@@ -0,0 +1,170 @@
+"""
+In-memory per-hotel interval index for room availability checks.
+
+A warm Lambda container or uvicorn worker keeps one index per hotel, built from a
+single query of the hotel's bookings and kept current by this process's own
+writes plus a cheap version-marker read. The index only answers reads - while it
+is enabled every reservation write is guarded by the hotel version marker in
+DynamoDB, so a stale index can at worst report a room as available and have the
+write rejected.
+"""
+import bisect
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+
+def to_ordinal(iso_date: str) -> int:
+    """Convert a YYYY-MM-DD string into a day ordinal"""
+    return date.fromisoformat(iso_date[:10]).toordinal()
+
+
+def from_ordinal(ordinal: int) -> str:
+    """Convert a day ordinal back into a YYYY-MM-DD string"""
+    return date.fromordinal(ordinal).isoformat()
+
+
+class RoomIntervals:
+    """Stays of a single room kept sorted by check-in day"""
+
+    def __init__(self):
+        self._starts: List[int] = []
+        self._intervals: List[Tuple[int, int, str]] = []
+        self._max_length = 0
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def add(self, check_in: int, check_out: int, reservation_id: str):
+        position = bisect.bisect_right(self._starts, check_in)
+        self._starts.insert(position, check_in)
+        self._intervals.insert(position, (check_in, check_out, reservation_id))
+        self._max_length = max(self._max_length, check_out - check_in)
+
+    def remove(self, reservation_id: str) -> bool:
+        for position, interval in enumerate(self._intervals):
+            if interval[2] == reservation_id:
+                del self._starts[position]
+                del self._intervals[position]
+                return True
+        return False
+
+    def overlapping(self, check_in: int, check_out: int, exclude_reservation_id: str = None) -> List[Tuple[int, int, str]]:
+        """Return stays that share at least one night with [check_in, check_out)"""
+        # Only stays starting within max_length days before check_in can still be running
+        lower = bisect.bisect_left(self._starts, check_in - self._max_length)
+        upper = bisect.bisect_left(self._starts, check_out)
+        return [
+            interval for interval in self._intervals[lower:upper]
+            if interval[1] > check_in and interval[2] != exclude_reservation_id
+        ]
+
+    def free_slots(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """Return the free [from, to) gaps of this room inside [start, end)"""
+        slots = []
+        cursor = start
+        for interval_start, interval_end, _ in self.overlapping(start, end):
+            if interval_start > cursor:
+                slots.append((cursor, interval_start))
+            cursor = max(cursor, interval_end)
+        if cursor < end:
+            slots.append((cursor, end))
+        return slots
+
+
+class HotelIntervalIndex:
+    """Interval index of one hotel's active reservations inside a fixed day window"""
+
+    def __init__(self, hotel_id: str, version: int, window_start: int, window_end: int):
+        self.hotel_id = hotel_id
+        self.version = version
+        self.window_start = window_start
+        self.window_end = window_end
+        self.rooms: Dict[str, RoomIntervals] = {}
+        self._room_of: Dict[str, str] = {}
+
+    def __len__(self):
+        return len(self._room_of)
+
+    def covers(self, check_in: int, check_out: int) -> bool:
+        return self.window_start <= check_in and check_out <= self.window_end
+
+    def add(self, room_id: str, check_in: int, check_out: int, reservation_id: str):
+        self.remove(reservation_id)
+        self.rooms.setdefault(room_id, RoomIntervals()).add(check_in, check_out, reservation_id)
+        self._room_of[reservation_id] = room_id
+
+    def remove(self, reservation_id: str):
+        room_id = self._room_of.pop(reservation_id, None)
+        if room_id is not None:
+            self.rooms[room_id].remove(reservation_id)
+
+    def is_available(self, room_id: str, check_in: int, check_out: int, exclude_reservation_id: str = None) -> bool:
+        room = self.rooms.get(room_id)
+        return room is None or not room.overlapping(check_in, check_out, exclude_reservation_id)
+
+    def free_slots(self, room_id: str, start: int, end: int) -> List[Tuple[int, int]]:
+        room = self.rooms.get(room_id)
+        if room is None:
+            return [(start, end)] if start < end else []
+        return room.free_slots(start, end)
+
+
+class IntervalIndexCache:
+    """Thread-safe LRU of hotel interval indexes bounded by hotel and interval counts"""
+
+    def __init__(self, max_hotels: int = 16, max_intervals: int = 200000):
+        self.max_hotels = max_hotels
+        self.max_intervals = max_intervals
+        self._indexes: "OrderedDict[str, HotelIntervalIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, hotel_id: str) -> Optional[HotelIntervalIndex]:
+        with self._lock:
+            index = self._indexes.get(hotel_id)
+            if index is not None:
+                self._indexes.move_to_end(hotel_id)
+            return index
+
+    def put(self, index: HotelIntervalIndex):
+        with self._lock:
+            self._indexes[index.hotel_id] = index
+            self._indexes.move_to_end(index.hotel_id)
+            self._evict()
+
+    def invalidate(self, hotel_id: str):
+        with self._lock:
+            self._indexes.pop(hotel_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def record_write(self, hotel_id: str, expected_version: int, new_version: int, apply):
+        """
+        Apply one of this process's own writes to a cached index.
+
+        The change is applied only when the index was current at `expected_version`,
+        otherwise the index is dropped and rebuilt on the next read.
+        """
+        with self._lock:
+            index = self._indexes.get(hotel_id)
+            if index is None:
+                return
+            if index.version != expected_version:
+                del self._indexes[hotel_id]
+                return
+            apply(index)
+            index.version = new_version
+            self._evict()
+
+    def interval_count(self) -> int:
+        return sum(len(index) for index in self._indexes.values())
+
+    def _evict(self):
+        # Always keep the most recently used hotel, even if it alone exceeds the cap
+        while len(self._indexes) > 1 and (
+            len(self._indexes) > self.max_hotels or self.interval_count() > self.max_intervals
+        ):
+            self._indexes.popitem(last=False)
@@ -0,0 +1,105 @@
+"""
+Compact per-room, per-year occupancy bitmaps.
+
+Each room-year is one DynamoDB item holding a 46-byte binary attribute in which
+bit N (little-endian bit order) marks night N of the year as sold, January 1st
+being night 0. Loading a hotel's bitmaps yields a rooms x days boolean matrix,
+so availability and occupancy counts for any window are NumPy reductions
+instead of interval comparisons over reservation dicts.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# 366 nights rounded up to whole bytes
+YEAR_BYTES = 46
+EMPTY_YEAR = bytes(YEAR_BYTES)
+
+
+def year_start(year: int) -> int:
+    """Day ordinal of January 1st of the given year"""
+    return date(year, 1, 1).toordinal()
+
+
+def nights_by_year(check_in: int, check_out: int) -> Dict[int, Tuple[int, int]]:
+    """Split the nights [check_in, check_out) into per-year [first, last + 1) offsets"""
+    ranges = {}
+    cursor = check_in
+    while cursor < check_out:
+        year = date.fromordinal(cursor).year
+        start_of_year = year_start(year)
+        end = min(check_out, year_start(year + 1))
+        ranges[year] = (cursor - start_of_year, end - start_of_year)
+        cursor = end
+    return ranges
+
+
+def decode_nights(blob: Optional[bytes]) -> np.ndarray:
+    """Unpack a stored bitmap into a boolean array of YEAR_BYTES * 8 nights"""
+    if not blob:
+        return np.zeros(YEAR_BYTES * 8, dtype=bool)
+    packed = np.frombuffer(bytes(blob).ljust(YEAR_BYTES, b'\0'), dtype=np.uint8)
+    return np.unpackbits(packed, bitorder='little').astype(bool)
+
+
+def encode_nights(nights: np.ndarray) -> bytes:
+    """Pack a boolean night array back into its stored binary form"""
+    return np.packbits(nights.astype(np.uint8), bitorder='little').tobytes()
+
+
+def set_nights(blob: Optional[bytes], first: int, last: int, occupied: bool) -> bytes:
+    """Return `blob` with nights [first, last) of the year set or cleared"""
+    nights = decode_nights(blob)
+    nights[first:last] = occupied
+    return encode_nights(nights)
+
+
+class OccupancyMatrix:
+    """Rooms x days view of a hotel's occupancy for the day window [start, end)"""
+
+    def __init__(self, room_ids: Iterable[str], start: int, end: int):
+        self.room_ids: List[str] = list(room_ids)
+        self.start = start
+        self.end = end
+        self._rows = {room_id: row for row, room_id in enumerate(self.room_ids)}
+        self.nights = np.zeros((len(self.room_ids), max(end - start, 0)), dtype=bool)
+
+    def load_year(self, room_id: str, year: int, blob: Optional[bytes]):
+        """Copy the part of one stored room-year bitmap that falls inside the window"""
+        row = self._rows.get(room_id)
+        if row is None:
+            return
+        offset = year_start(year) - self.start
+        first = max(0, -offset)
+        last = min(year_start(year + 1) - year_start(year), self.end - self.start - offset)
+        if first < last:
+            self.nights[row, offset + first:offset + last] = decode_nights(blob)[first:last]
+
+    def mark(self, room_id: str, check_in: int, check_out: int):
+        """Mark the nights [check_in, check_out) of a room as sold, clipped to the window"""
+        row = self._rows.get(room_id)
+        first = max(check_in, self.start) - self.start
+        last = min(check_out, self.end) - self.start
+        if row is not None and first < last:
+            self.nights[row, first:last] = True
+
+    def _columns(self, check_in: int, check_out: int) -> slice:
+        if check_in < self.start or check_out > self.end:
+            raise ValueError("Requested dates fall outside the loaded occupancy window")
+        return slice(check_in - self.start, check_out - self.start)
+
+    def is_free(self, room_id: str, check_in: int, check_out: int) -> bool:
+        row = self._rows.get(room_id)
+        if row is None:
+            return True
+        return not self.nights[row, self._columns(check_in, check_out)].any()
+
+    def free_rooms(self, check_in: int, check_out: int) -> List[str]:
+        """Rooms that are free for every night of [check_in, check_out)"""
+        busy = self.nights[:, self._columns(check_in, check_out)].any(axis=1)
+        return [self.room_ids[row] for row in np.flatnonzero(~busy)]
+
+    def occupied_counts(self) -> np.ndarray:
+        """Number of sold rooms for each night of the window"""
+        return self.nights.sum(axis=0)
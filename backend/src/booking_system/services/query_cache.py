@@ -0,0 +1,130 @@
+"""
+Versioned cache of per-hotel query results.
+
+Entries are keyed by hotel, the hotel's data version and the normalised query
+(for example the reservation date window). Every write that changes what a
+hotel's queries return increments the version, so a reader that has fetched the
+current version with one GetItem can serve a cached result for it without any
+staleness; entries of older versions are never read again and age out of the
+backend. Values are stored pickled, so every hit returns a private copy.
+
+The backend is pluggable: an in-process LRU bounded by bytes, or any
+Redis-compatible client (`get`, `set(..., ex=)`) shared by all workers.
+"""
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class LocalLRUBackend:
+    """In-process LRU of pickled values bounded by their total size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: int):
+        # Entries of superseded versions are never hit again, so LRU order evicts them first
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'backend': 'local', 'entries': len(self._entries), 'memory_bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+class RedisBackend:
+    """Shared backend over a Redis-compatible client; entries expire after ttl_seconds"""
+
+    def __init__(self, client, prefix: str = 'booking:query:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: int):
+        self.client.set(self.prefix + key, value, ex=ttl_seconds)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def stats(self) -> dict:
+        stats = {'backend': 'redis'}
+        try:
+            stats['memory_bytes'] = self.client.info('memory').get('used_memory')
+        except Exception:
+            pass
+        return stats
+
+
+def redis_backend(url: str) -> RedisBackend:
+    try:
+        import redis
+    except ImportError as e:
+        raise RuntimeError("QUERY_CACHE_BACKEND=redis needs the redis package") from e
+    return RedisBackend(redis.Redis.from_url(url))
+
+
+class QueryCache:
+    def __init__(self, backend, ttl_seconds: int = 300):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(hotel_id: str, version: int, query: tuple) -> str:
+        return f"{hotel_id}|{version}|" + '|'.join(str(part) for part in query)
+
+    def get(self, hotel_id: str, version: int, query: tuple):
+        """Return the cached result, or None on a miss"""
+        value = self.backend.get(self._key(hotel_id, version, query))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(value)
+
+    def put(self, hotel_id: str, version: int, query: tuple, result):
+        self.backend.set(self._key(hotel_id, version, query), pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), self.ttl_seconds)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            **self.backend.stats(),
+        }
@@ -1,8 +1,32 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from contextvars import ContextVar
-from datetime import datetime
-import boto3
+from datetime import datetime, date, timedelta, timezone
 import logging
+import os
+import random
+import time
+import uuid
 from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from ..db import deadline, ids
+from ..db.client import ServiceUnavailableError, circuit_breaker, create_dynamodb_resource
+from ..db.parallel_scan import ParallelScan
+from ..db.sharding import date_partition_key, date_partition_keys
+from ..models.records import PersonRows, ReservationRecord
+from .interval_index import HotelIntervalIndex, IntervalIndexCache, RoomIntervals, to_ordinal, from_ordinal
+from .analytics import StayColumns, compute_analytics
+from .archive import ReservationArchive, months_before, open_store
+from .bulk_import import CONFLICT, CREATED, DUPLICATE, parse_rows, summarize, sweep_conflicts, validate_rows
+from .export import export_row, render
+from .idempotency import IdempotencyStore
+from .integrity import ORPHANED_PERSON, SCAN_PROJECTION, STALE_INDEX_KEY, expected_index_keys, find_orphaned_persons, find_overlaps, find_stale_index_keys
+from .daily_stats import COUNTERS, merge_contributions, stay_contributions
+from .search import CONTACT_SOURCE, entry_source, matches, parse_query, search_entries
+from .single_flight import SingleFlight
+from .query_cache import LocalLRUBackend, QueryCache, redis_backend
+from .occupancy import EMPTY_YEAR, OccupancyMatrix, nights_by_year, set_nights, year_start
 
 logger = logging.getLogger(__name__)
 
@@ -11,16 +35,87 @@ settings_args = dict(
 )
 
 # Initialize DynamoDB client (will use IAM role in Lambda, profile in local dev)
-try:
-    # Try to use private profile for local development
-    session = boto3.Session(profile_name='private')
-    dynamodb = session.resource('dynamodb', region_name='eu-central-1')
-except Exception:
-    # Fall back to default credentials (IAM role in Lambda)
-    dynamodb = boto3.resource('dynamodb', region_name='eu-central-1')
-    
+dynamodb = create_dynamodb_resource(circuit_breaker)
+
 table = dynamodb.Table('booking-system')
 
+# Optional in-memory availability index, reused across requests on warm workers
+INTERVAL_INDEX_ENABLED = os.getenv("INTERVAL_INDEX_ENABLED", "false").lower() == "true"
+INTERVAL_INDEX_LOOKBACK_DAYS = int(os.getenv("INTERVAL_INDEX_LOOKBACK_DAYS", "30"))
+INTERVAL_INDEX_HORIZON_DAYS = int(os.getenv("INTERVAL_INDEX_HORIZON_DAYS", "400"))
+interval_index_cache = IntervalIndexCache(
+    max_hotels=int(os.getenv("INTERVAL_INDEX_MAX_HOTELS", "16")),
+    max_intervals=int(os.getenv("INTERVAL_INDEX_MAX_INTERVALS", "200000")),
+)
+
+# Read availability and occupancy from the per room-year bitmaps (enable once backfilled)
+OCCUPANCY_BITMAPS_ENABLED = os.getenv("OCCUPANCY_BITMAPS_ENABLED", "false").lower() == "true"
+
+# Identical concurrent reads on this worker share one DynamoDB fetch
+single_flight = SingleFlight(enabled=os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true")
+
+# Reservation query results cached per hotel data version: "local" (in-process LRU), "redis" or "off"
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "local").lower()
+if QUERY_CACHE_BACKEND == "redis":
+    query_cache = QueryCache(redis_backend(os.getenv("QUERY_CACHE_REDIS_URL", "redis://localhost:6379/0")), int(os.getenv("QUERY_CACHE_TTL_SECONDS", "300")))
+elif QUERY_CACHE_BACKEND == "local":
+    query_cache = QueryCache(LocalLRUBackend(int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))), int(os.getenv("QUERY_CACHE_TTL_SECONDS", "300")))
+else:
+    query_cache = None
+
+# Partial listings stop fetching when fewer seconds than this are left before the request deadline
+PARTIAL_RESULT_MARGIN_SECONDS = float(os.getenv("PARTIAL_RESULT_MARGIN_SECONDS", "2"))
+
+# Stored responses of writes sent with an Idempotency-Key, expired by the table TTL
+idempotency_store = IdempotencyStore(table, int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400")), int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "30")))
+
+# Cold archive of reservations that checked out long ago: file:///path, s3://bucket/prefix or unset (off)
+ARCHIVE_URL = os.getenv("ARCHIVE_URL", "")
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "12"))
+# Days a soft-deleted reservation stays in the table before it is archived and expired by the TTL
+DELETED_RETENTION_DAYS = int(os.getenv("DELETED_RETENTION_DAYS", "30"))
+# How long an archive or purge run holds a hotel before another run may take it over
+ARCHIVE_LOCK_SECONDS = int(os.getenv("ARCHIVE_LOCK_SECONDS", "3600"))
+if ARCHIVE_URL:
+    archive = ReservationArchive(open_store(ARCHIVE_URL, os.getenv("ARCHIVE_S3_ENDPOINT_URL")), int(os.getenv("ARCHIVE_MANIFEST_TTL_SECONDS", "300")))
+else:
+    archive = None
+
+# Concurrent queries when gathering arrivals from the date index shards, and the longest range
+DATE_INDEX_READ_WORKERS = int(os.getenv("DATE_INDEX_READ_WORKERS", "8"))
+MAX_ARRIVAL_DAYS = 62
+
+# Bounds of a search lookup: index entries read per page and pages read per hotel
+SEARCH_PAGE_SIZE = 100
+MAX_SEARCH_PAGES = 5
+MAX_SEARCH_RESULTS = 100
+
+# Largest "latest reservations" page
+MAX_LATEST_RESULTS = 100
+
+# Attempts for a reservation write that loses a version race, with jittered backoff between them
+MAX_WRITE_ATTEMPTS = 3
+WRITE_RETRY_BACKOFF_SECONDS = 0.05
+
+# DynamoDB limit on actions per TransactWriteItems call
+MAX_TRANSACTION_ITEMS = 100
+
+# DynamoDB limit on operands of an IN comparison
+MAX_IN_OPERANDS = 100
+
+class ConcurrentWriteError(Exception):
+    """Raised when another writer changed the hotel between our read and our write"""
+
+class WriteContentionError(Exception):
+    """Raised when a write lost to concurrent writers on every attempt; the client may retry"""
+
+class VersionConflictError(Exception):
+    """Raised when a reservation no longer has the version the client edited"""
+
+    def __init__(self, reservation: dict):
+        super().__init__(f"Reservation {reservation['PK'].split('#', 1)[1]} was modified by someone else (current version {reservation.get('Version', 0)})")
+        self.reservation = reservation
+
 def get_companies():
     try:
         response = table.scan(
@@ -29,7 +124,7 @@ def get_companies():
         companies = response.get('Items', [])
         return companies
     except Exception as e:
-        logger.error(f"Error retrieving companies: {str(e)}", exc_info=True)
+        logger.error("Error retrieving companies: %s", e, exc_info=True)
         raise
 
 def get_company(company_id: str):
@@ -42,9 +137,10 @@ def get_company(company_id: str):
         )
         return response.get('Item')
     except Exception as e:
-        logger.error(f"Error retrieving company {company_id}: {str(e)}", exc_info=True)
+        logger.error("Error retrieving company %s: %s", company_id, e, exc_info=True)
         raise
 
+@single_flight.coalesce('hotels')
 def get_hotels():
     try:
         response = table.scan(
@@ -55,7 +151,7 @@ def get_hotels():
      
         return sorted(hotels, key=lambda x: x.get('sort_number', 0))
     except Exception as e:
-        logger.error(f"Error retrieving hotels: {str(e)}", exc_info=True)
+        logger.error("Error retrieving hotels: %s", e, exc_info=True)
         raise
 
 def get_hotel(hotel_id: str):
@@ -68,9 +164,24 @@ def get_hotel(hotel_id: str):
         )
         return response.get('Item')
     except Exception as e:
-        logger.error(f"Error retrieving hotel {hotel_id}: {str(e)}", exc_info=True)
+        logger.error("Error retrieving hotel %s: %s", hotel_id, e, exc_info=True)
+        raise
+
+def get_company_hotels(company_id: str):
+    try:
+        # Query hotels using GSI1 (locations are indexed by company)
+        response = table.query(
+            IndexName='GSI1',
+            KeyConditionExpression=Key('GSI1PK').eq(f'COMPANY#{company_id}') & Key('GSI1SK').begins_with('LOCATION#')
+        )
+        hotels = response.get('Items', [])
+
+        return sorted(hotels, key=lambda x: x.get('sort_number', 0))
+    except Exception as e:
+        logger.error("Error retrieving hotels for company %s: %s", company_id, e, exc_info=True)
         raise
 
+@single_flight.coalesce('rooms')
 def get_rooms(hotel_id: str):
     try:
         # Query rooms using GSI2 (rooms are indexed by location)
@@ -83,15 +194,52 @@ def get_rooms(hotel_id: str):
         # Sort rooms by room number (convert to int for proper numerical sorting)
         return sorted(rooms, key=lambda x: int(x.get('Number', '0')))
     except Exception as e:
-        logger.error(f"Error retrieving rooms for hotel {hotel_id}: {str(e)}", exc_info=True)
+        logger.error("Error retrieving rooms for hotel %s: %s", hotel_id, e, exc_info=True)
         raise
 
 def get_reservations(hotel_id: str, start_date: str, end_date: str):
+    """
+    Active reservations of a hotel touching [start_date, end_date], with guests.
+
+    Results are cached per hotel data version; one consistent GetItem of the
+    version marker decides whether a cached result is still current.
+    """
+    reservations, _ = _get_reservations(hotel_id, start_date, end_date, allow_partial=False)
+    return reservations
+
+def get_reservations_partial(hotel_id: str, start_date: str, end_date: str):
+    """
+    Like get_reservations, but when the request deadline gets near, stop reading
+    and return what has been fetched so far. Returns (reservations, complete);
+    every returned reservation has its guests.
+    """
+    return _get_reservations(hotel_id, start_date, end_date, allow_partial=True)
+
+def _get_reservations(hotel_id: str, start_date: str, end_date: str, allow_partial: bool):
+    if query_cache is None:
+        return _fetch_reservations(hotel_id, start_date, end_date, allow_partial)
+
+    query = ('reservations', start_date, end_date)
+    version = get_hotel_data_version(hotel_id)
+    cached = query_cache.get(hotel_id, version, query)
+    if cached is not None:
+        return cached, True
+
+    # Consistent reads, so the result holds every write up to the data version it is cached under
+    reservations, complete = _fetch_reservations(hotel_id, start_date, end_date, allow_partial, consistent=True)
+    # Partial results are never cached
+    if complete:
+        query_cache.put(hotel_id, version, query, reservations)
+    return reservations, complete
+
+@single_flight.coalesce('reservations')
+def _fetch_reservations(hotel_id: str, start_date: str, end_date: str, allow_partial: bool = False, consistent: bool = False):
     try:
         # Get all reservations and filter by hotel and date range
         # Use pagination to handle large datasets
         all_reservations = []
         last_evaluated_key = None
+        complete = True
         
         while True:
             scan_kwargs = {
@@ -102,7 +250,8 @@ def get_reservations(hotel_id: str, start_date: str, end_date: str):
                     ":start": start_date,
                     ":end": end_date,
                     ":is_deleted": False,
-                }
+                },
+                'ConsistentRead': consistent
             }
             
             if last_evaluated_key:
@@ -114,9 +263,19 @@ def get_reservations(hotel_id: str, start_date: str, end_date: str):
             last_evaluated_key = response.get('LastEvaluatedKey')
             if not last_evaluated_key:
                 break
+            # Leave time for fetching the guests of what has been scanned
+            if allow_partial and deadline.near(2 * PARTIAL_RESULT_MARGIN_SECONDS):
+                complete = False
+                break
         
         # For each reservation, get the guest data
-        for reservation in all_reservations:
+        for index, reservation in enumerate(all_reservations):
+            if allow_partial and deadline.near(PARTIAL_RESULT_MARGIN_SECONDS):
+                # Only return reservations whose guests were fetched
+                del all_reservations[index:]
+                complete = False
+                break
+
             reservation_id = reservation['PK']
             
             # Query for guest records for this reservation
@@ -125,7 +284,8 @@ def get_reservations(hotel_id: str, start_date: str, end_date: str):
                 FilterExpression="EntityType = :entity_type",
                 ExpressionAttributeValues={
                     ":entity_type": "ReservationPerson"
-                }
+                },
+                ConsistentRead=consistent
             )
             
             # Convert guest records to the format expected by frontend
@@ -138,33 +298,503 @@ def get_reservations(hotel_id: str, start_date: str, end_date: str):
             
             # Add guests to reservation
             reservation['Guests'] = guests
+
+        # Same window as the scan above
+        listed = {reservation['PK'] for reservation in all_reservations}
+        all_reservations.extend(
+            reservation for reservation in _archived_reservations(hotel_id, start_date, end_date)
+            if reservation['PK'] not in listed
+            and (start_date <= reservation['CheckInDate'] <= end_date or start_date <= reservation['CheckOutDate'] <= end_date)
+        )
         
-        return all_reservations
+        if not complete:
+            logger.warning("Returning %s reservations for hotel %s as a partial result, request deadline is near", len(all_reservations), hotel_id)
+        return all_reservations, complete
     except Exception as e:
-        logger.error(f"Error retrieving reservations for hotel {hotel_id} from {start_date} to {end_date}: {str(e)}", exc_info=True)
+        logger.error("Error retrieving reservations for hotel %s from %s to %s: %s", hotel_id, start_date, end_date, e, exc_info=True)
+        raise
+
+def get_hotel_version(hotel_id: str) -> int:
+    """Return the hotel's version marker, bumped by every write that changes room occupancy while the interval index is enabled"""
+    response = table.get_item(
+        Key={
+            'PK': f'LOCATION#{hotel_id}',
+            'SK': 'VERSION'
+        },
+        ProjectionExpression='Version',
+        ConsistentRead=True
+    )
+    item = response.get('Item')
+    return int(item['Version']) if item else 0
+
+def get_hotel_data_version(hotel_id: str) -> int:
+    """Return the hotel's data version, bumped by every write that changes its reservations"""
+    response = table.get_item(
+        Key={
+            'PK': f'LOCATION#{hotel_id}',
+            'SK': 'VERSION'
+        },
+        ProjectionExpression='DataVersion',
+        ConsistentRead=True
+    )
+    item = response.get('Item')
+    return int(item.get('DataVersion', 0)) if item else 0
+
+def _data_version_bump(hotel_id: str):
+    """Transaction action that invalidates the hotel's cached query results"""
+    return {
+        'Update': {
+            'TableName': table.name,
+            'Key': {
+                'PK': f'LOCATION#{hotel_id}',
+                'SK': 'VERSION'
+            },
+            'UpdateExpression': "SET EntityType = :entity_type ADD DataVersion :one",
+            'ExpressionAttributeValues': {
+                ":entity_type": "HotelVersion",
+                ":one": 1,
+            },
+        }
+    }
+
+def _hotel_version_guard(hotel_id: str, expected_version: int):
+    """
+    Transaction action that bumps the hotel version only if nobody else did since
+    we read it, and with it the data version that keys cached query results.
+    """
+    expression_values = {
+        ":entity_type": "HotelVersion",
+        ":one": 1,
+    }
+    if expected_version:
+        condition = "Version = :expected"
+        expression_values[":expected"] = expected_version
+    else:
+        condition = "attribute_not_exists(Version)"
+
+    return {
+        'Update': {
+            'TableName': table.name,
+            'Key': {
+                'PK': f'LOCATION#{hotel_id}',
+                'SK': 'VERSION'
+            },
+            'UpdateExpression': "SET EntityType = :entity_type ADD Version :one, DataVersion :one",
+            'ConditionExpression': condition,
+            'ExpressionAttributeValues': expression_values,
+        }
+    }
+
+def _room_version_key(hotel_id: str, room_id: str):
+    return {
+        'PK': f'LOCATION#{hotel_id}',
+        'SK': f'ROOMVERSION#{room_id}'
+    }
+
+def _room_version_guard(hotel_id: str, room_id: str, expected_version: int):
+    """Transaction action that bumps a room's version only if nobody else did since we read it"""
+    expression_values = {
+        ":entity_type": "RoomVersion",
+        ":one": 1,
+    }
+    if expected_version:
+        condition = "Version = :expected"
+        expression_values[":expected"] = expected_version
+    else:
+        condition = "attribute_not_exists(Version)"
+
+    return {
+        'Update': {
+            'TableName': table.name,
+            'Key': _room_version_key(hotel_id, room_id),
+            'UpdateExpression': "SET EntityType = :entity_type ADD Version :one",
+            'ConditionExpression': condition,
+            'ExpressionAttributeValues': expression_values,
+        }
+    }
+
+def _data_version_guard(hotel_id: str, expected_version: int):
+    """Transaction action that bumps the data version only if no reservation write did since we read it"""
+    expression_values = {
+        ":entity_type": "HotelVersion",
+        ":one": 1,
+    }
+    if expected_version:
+        condition = "DataVersion = :expected"
+        expression_values[":expected"] = expected_version
+    else:
+        condition = "attribute_not_exists(DataVersion)"
+
+    return {
+        'Update': {
+            'TableName': table.name,
+            'Key': {
+                'PK': f'LOCATION#{hotel_id}',
+                'SK': 'VERSION'
+            },
+            'UpdateExpression': "SET EntityType = :entity_type ADD DataVersion :one",
+            'ConditionExpression': condition,
+            'ExpressionAttributeValues': expression_values,
+        }
+    }
+
+def _guard_versions(hotel_id: str, room_ids) -> dict:
+    """
+    Read the versions a stay change is validated against and guarded on.
+
+    While the interval index is enabled that is the hotel version (keyed None),
+    which every worker's index is checked against. Otherwise it is the version of
+    each touched room, so writes to different rooms of a hotel do not conflict.
+    """
+    if INTERVAL_INDEX_ENABLED:
+        return {None: get_hotel_version(hotel_id)}
+    versions = {room_id: 0 for room_id in room_ids}
+    keys = [_room_version_key(hotel_id, room_id) for room_id in versions]
+    for item in _batch_get_items(keys, projection="SK, Version", consistent=True):
+        versions[item['SK'].split('#', 1)[1]] = int(item['Version'])
+    return versions
+
+def _version_guards(hotel_id: str, versions: dict) -> list:
+    """Transaction actions that bump the versions read by _guard_versions, and with them the data version"""
+    if None in versions:
+        return [_hotel_version_guard(hotel_id, versions[None])]
+    return [_room_version_guard(hotel_id, room_id, version) for room_id, version in versions.items()] + [_data_version_bump(hotel_id)]
+
+def _record_index_write(hotel_id: str, versions: dict, apply):
+    """Apply a committed stay change to this worker's interval index, when it was guarded by the hotel version"""
+    if None in versions:
+        interval_index_cache.record_write(hotel_id, versions[None], versions[None] + 1, apply)
+
+def _write_backoff(attempt: int):
+    """Wait before another attempt at a write that lost a version race (full jitter, doubling per attempt)"""
+    time.sleep(random.uniform(0, WRITE_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+
+def _bump_hotel_version(hotel_id: str) -> int:
+    """Unconditionally bump the hotel version marker and return the new value"""
+    response = table.update_item(
+        Key={
+            'PK': f'LOCATION#{hotel_id}',
+            'SK': 'VERSION'
+        },
+        UpdateExpression="SET EntityType = :entity_type ADD Version :one, DataVersion :one",
+        ExpressionAttributeValues={
+            ":entity_type": "HotelVersion",
+            ":one": 1,
+        },
+        ReturnValues="UPDATED_NEW"
+    )
+    return int(response['Attributes']['Version'])
+
+def _transact_write(actions: list):
+    """Run a write transaction, raising ConcurrentWriteError if it was cancelled"""
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=actions)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'TransactionCanceledException':
+            raise ConcurrentWriteError(str(e)) from e
         raise
 
-def check_room_availability(hotel_id: str, room_id: str, check_in_date: str, check_out_date: str, exclude_reservation_id: str = None):
+def _transact_guarded_chunks(hotel_id: str, data_version: int, actions: list) -> int:
+    """
+    Write actions in transactions of up to 99 items, each guarded by the next data
+    version, which every reservation write bumps
+    """
+    for i in range(0, len(actions), MAX_TRANSACTION_ITEMS - 1):
+        _transact_write(actions[i:i + MAX_TRANSACTION_ITEMS - 1] + [_data_version_guard(hotel_id, data_version)])
+        data_version += 1
+    return data_version
+
+def _batch_get_items(keys: list, projection: str = None, consistent: bool = False):
+    """Fetch items by primary key with BatchGetItem, 100 keys per request"""
+    items = []
+    for i in range(0, len(keys), 100):
+        request = {'Keys': keys[i:i + 100]}
+        if projection:
+            request['ProjectionExpression'] = projection
+        if consistent:
+            request['ConsistentRead'] = True
+
+        request_items = {table.name: request}
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            items.extend(response.get('Responses', {}).get(table.name, []))
+            request_items = response.get('UnprocessedKeys')
+    return items
+
+def _occupancy_key(hotel_id: str, room_id: str, year: int):
+    return {
+        'PK': f'LOCATION#{hotel_id}',
+        'SK': f'OCCUPANCY#{room_id}#{year}'
+    }
+
+def _occupancy_item(hotel_id: str, room_id: str, year: int, nights: bytes):
+    return {
+        **_occupancy_key(hotel_id, room_id, year),
+        'EntityType': 'RoomOccupancy',
+        'RoomId': room_id,
+        'Year': year,
+        'Nights': nights
+    }
+
+def _occupancy_actions(hotel_id: str, changes: list):
+    """
+    Transaction puts that apply stay changes to the hotel's occupancy bitmaps.
+
+    `changes` is a list of (room_id, check_in_date, check_out_date, occupied) applied
+    in order. The bitmaps are read here and rewritten whole, which is only safe
+    inside a transaction guarded by the versions of their rooms (or the hotel).
+    """
+    touched = {}
+    for room_id, check_in_date, check_out_date, _ in changes:
+        for year in nights_by_year(to_ordinal(check_in_date), to_ordinal(check_out_date)):
+            touched[(room_id, year)] = None
+
+    # Consistent, so the bitmaps hold every write up to the guarded versions
+    keys = [_occupancy_key(hotel_id, room_id, year) for room_id, year in touched]
+    for item in _batch_get_items(keys, consistent=True):
+        touched[(item['RoomId'], int(item['Year']))] = item['Nights'].value
+
+    for room_id, check_in_date, check_out_date, occupied in changes:
+        for year, (first, last) in nights_by_year(to_ordinal(check_in_date), to_ordinal(check_out_date)).items():
+            touched[(room_id, year)] = set_nights(touched[(room_id, year)], first, last, occupied)
+
+    return [
+        {'Put': {'TableName': table.name, 'Item': _occupancy_item(hotel_id, room_id, year, nights)}}
+        for (room_id, year), nights in touched.items()
+    ]
+
+def load_occupancy(hotel_id: str, room_ids: list, start_date: str, end_date: str) -> OccupancyMatrix:
+    """Load a rooms x nights occupancy matrix for the nights [start_date, end_date)"""
+    matrix = OccupancyMatrix(room_ids, to_ordinal(start_date), to_ordinal(end_date))
+
+    if OCCUPANCY_BITMAPS_ENABLED:
+        years = range(date.fromordinal(matrix.start).year, date.fromordinal(max(matrix.end - 1, matrix.start)).year + 1)
+        keys = [_occupancy_key(hotel_id, room_id, year) for room_id in room_ids for year in years]
+        for item in _batch_get_items(keys):
+            matrix.load_year(item['RoomId'], int(item['Year']), item['Nights'].value)
+    else:
+        # Bitmaps not backfilled yet - derive the same matrix from the reservations
+        for item in _scan_active_reservations(hotel_id, start_date, end_date):
+            matrix.mark(item['RoomId'], to_ordinal(item['CheckInDate']), to_ordinal(item['CheckOutDate']))
+
+    return matrix
+
+def _daily_stats_key(hotel_id: str, day: str):
+    return {
+        'PK': f'LOCATION#{hotel_id}',
+        'SK': f'DAY#{day}'
+    }
+
+def _guest_count(reservation: dict) -> int:
+    """Number of guests on a stored reservation, counting PERSON rows for older items"""
+    if 'GuestCount' in reservation:
+        return int(reservation['GuestCount'])
+    response = table.query(
+        KeyConditionExpression=Key('PK').eq(reservation['PK']) & Key('SK').begins_with('PERSON#'),
+        Select='COUNT'
+    )
+    return response.get('Count', 0)
+
+def _reservation_contributions(reservation: dict, sign: int):
+    """Daily aggregate contributions of a stored reservation item"""
+    return stay_contributions(
+        reservation['CheckInDate'],
+        reservation['CheckOutDate'],
+        _guest_count(reservation),
+        reservation.get('RoomPrice'),
+        reservation.get('TransportPrice'),
+        sign
+    )
+
+def _daily_stats_actions(hotel_id: str, contributions: list):
+    """Transaction updates that ADD the net contributions to the hotel's day items"""
+    actions = []
+    for day, counters in merge_contributions(contributions).items():
+        expression_values = {f":{counter}": delta for counter, delta in counters.items()}
+        expression_values[":entity_type"] = "HotelDailyStats"
+        actions.append({
+            'Update': {
+                'TableName': table.name,
+                'Key': _daily_stats_key(hotel_id, day),
+                'UpdateExpression': "SET EntityType = :entity_type ADD " + ", ".join(f"{counter} :{counter}" for counter in counters),
+                'ExpressionAttributeValues': expression_values,
+            }
+        })
+    return actions
+
+def _transact_with_daily_stats(actions: list, stats_actions: list):
+    """
+    Run a reservation transaction together with its daily aggregate updates.
+
+    Stays so long that their day items would exceed the transaction limit apply the
+    aggregate updates right after the commit instead; the rebuild tool reports
+    the drift this leaves if the process dies in between.
+    """
+    if len(actions) + len(stats_actions) <= MAX_TRANSACTION_ITEMS:
+        _transact_write(stats_actions + actions)
+        return
+
+    _transact_write(actions)
+    for action in stats_actions:
+        update = dict(action['Update'])
+        update.pop('TableName')
+        table.update_item(**update)
+
+def _archived_reservations(hotel_id: str, start_date: str, end_date: str, include_deleted: bool = False):
+    """Archived reservations of a hotel whose stay overlaps [start_date, end_date], with their 'Guests'"""
+    if archive is None or not archive.covers(hotel_id, start_date, include_deleted):
+        return
+    for reservation in archive.reservations(hotel_id, start_date, end_date):
+        if include_deleted or not reservation.get('IsDeleted'):
+            yield reservation
+
+def _scan_active_reservations(hotel_id: str, window_start: str, window_end: str, projection: str = "PK, RoomId, CheckInDate, CheckOutDate", consistent: bool = False):
+    """
+    Yield a hotel's active reservations with at least one night in [window_start, window_end),
+    followed by archived ones. Archived items come whole, whatever the projection.
+
+    Pass consistent=True when the result is validated against versions read
+    before the scan, so it includes every write up to those versions.
+    """
+    seen = set()
+    last_evaluated_key = None
+    while True:
+        scan_kwargs = {
+            'FilterExpression': "EntityType = :entity_type AND HotelId = :hotel_id AND (attribute_not_exists(IsDeleted) OR IsDeleted = :is_deleted) AND CheckInDate < :window_end AND CheckOutDate > :window_start",
+            'ProjectionExpression': projection,
+            'ExpressionAttributeValues': {
+                ":entity_type": "Reservation",
+                ":hotel_id": hotel_id,
+                ":is_deleted": False,
+                ":window_start": window_start,
+                ":window_end": window_end,
+            }
+        }
+
+        if consistent:
+            scan_kwargs['ConsistentRead'] = True
+        if last_evaluated_key:
+            scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+        response = table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            seen.add(item['PK'])
+            yield item
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
+
+    for item in _archived_reservations(hotel_id, window_start, window_end):
+        if item['PK'] not in seen and item['CheckInDate'] < window_end and item['CheckOutDate'] > window_start:
+            yield item
+
+def _query_hotel_stays(hotel_id: str, window_start: str, window_end: str):
+    """
+    Yield a hotel's active reservations with at least one night in [window_start, window_end)
+    from its GSI7 partition, followed by archived ones
+    """
+    seen = set()
+    last_evaluated_key = None
+    while True:
+        query_kwargs = {
+            'IndexName': 'GSI7',
+            'KeyConditionExpression': Key('GSI7PK').eq(f"BOOKING#{hotel_id}"),
+            'FilterExpression': "(attribute_not_exists(IsDeleted) OR IsDeleted = :is_deleted) AND CheckInDate < :window_end AND CheckOutDate > :window_start",
+            'ProjectionExpression': "PK, RoomId, CheckInDate, CheckOutDate",
+            'ExpressionAttributeValues': {
+                ":is_deleted": False,
+                ":window_start": window_start,
+                ":window_end": window_end,
+            }
+        }
+        if last_evaluated_key:
+            query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+        response = table.query(**query_kwargs)
+        for item in response.get('Items', []):
+            seen.add(item['PK'])
+            yield item
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
+
+    for item in _archived_reservations(hotel_id, window_start, window_end):
+        if item['PK'] not in seen and item['CheckInDate'] < window_end and item['CheckOutDate'] > window_start:
+            yield item
+
+def _load_interval_index(hotel_id: str, version: int) -> HotelIntervalIndex:
+    """Build a hotel's interval index from one query of the hotel's GSI7 partition"""
+    today = date.today().toordinal()
+    index = HotelIntervalIndex(
+        hotel_id,
+        version,
+        today - INTERVAL_INDEX_LOOKBACK_DAYS,
+        today + INTERVAL_INDEX_HORIZON_DAYS
+    )
+
+    # GSI7 lags the table by a moment, like the GSI4 query of the default availability check
+    for item in _query_hotel_stays(hotel_id, from_ordinal(index.window_start), from_ordinal(index.window_end)):
+        index.add(
+            item['RoomId'],
+            to_ordinal(item['CheckInDate']),
+            to_ordinal(item['CheckOutDate']),
+            item['PK'].split('#', 1)[1]
+        )
+
+    logger.info("Built interval index for hotel %s at version %s with %s reservations", hotel_id, version, len(index))
+    return index
+
+def _get_interval_index(hotel_id: str, version: int) -> HotelIntervalIndex:
+    """Return the cached interval index for a hotel, rebuilding it if the version moved"""
+    index = interval_index_cache.get(hotel_id)
+    if index is None or index.version != version:
+        index = _load_interval_index(hotel_id, version)
+        interval_index_cache.put(index)
+    return index
+
+def _query_room_reservations(hotel_id: str, room_id: str, check_in_date: str, check_out_date: str):
+    """Query active reservations of a room that overlap the given date range using GSI4"""
+    response = table.query(
+        IndexName='GSI4',
+        KeyConditionExpression=Key('GSI4PK').eq(f'ROOM#{room_id}') & Key('GSI4SK').begins_with('RESERVATION#'),
+        FilterExpression="CheckInDate < :check_out AND CheckOutDate > :check_in AND HotelId = :hotel_id AND (attribute_not_exists(IsDeleted) OR IsDeleted = :is_deleted)",
+        ExpressionAttributeValues={
+            ":check_in": check_in_date,
+            ":check_out": check_out_date,
+            ":hotel_id": hotel_id,
+            ":is_deleted": False,
+        },
+    )
+    return response.get('Items', [])
+
+def check_room_availability(hotel_id: str, room_id: str, check_in_date: str, check_out_date: str, exclude_reservation_id: str = None, version: int = None):
     """
     Check if a room is available for the given date range
     Returns True if available, False if there's a conflict
+
+    The answer comes from the in-memory interval index or the occupancy bitmaps
+    when those are enabled, otherwise from GSI4. The index may be stale - writes
+    stay safe because they are guarded by the hotel version marker.
     """
     try:
+        if INTERVAL_INDEX_ENABLED:
+            if version is None:
+                version = get_hotel_version(hotel_id)
+            index = _get_interval_index(hotel_id, version)
+            check_in, check_out = to_ordinal(check_in_date), to_ordinal(check_out_date)
+            if index.covers(check_in, check_out):
+                return index.is_available(room_id, check_in, check_out, exclude_reservation_id)
+
+        # Bitmaps cannot tell which reservation owns a night, so exclusions use GSI4
+        if OCCUPANCY_BITMAPS_ENABLED and not exclude_reservation_id:
+            matrix = load_occupancy(hotel_id, [room_id], check_in_date, check_out_date)
+            return matrix.is_free(room_id, matrix.start, matrix.end)
+
         # Query reservations for this room using GSI4, but only for the specific hotel
         # Exclude deleted reservations from availability check
-        response = table.query(
-            IndexName='GSI4',
-            KeyConditionExpression=Key('GSI4PK').eq(f'ROOM#{room_id}') & Key('GSI4SK').begins_with('RESERVATION#'),
-            FilterExpression="CheckInDate < :check_out AND CheckOutDate > :check_in AND HotelId = :hotel_id AND (attribute_not_exists(IsDeleted) OR IsDeleted = :is_deleted)",
-            ExpressionAttributeValues={
-                ":check_in": check_in_date,
-                ":check_out": check_out_date,
-                ":hotel_id": hotel_id,
-                ":is_deleted": False,
-            },
-        )
-        
-        conflicting_reservations = response.get('Items', [])
+        conflicting_reservations = _query_room_reservations(hotel_id, room_id, check_in_date, check_out_date)
         
         # If we're updating an existing reservation, exclude it from conflicts
         if exclude_reservation_id:
@@ -176,237 +806,1260 @@ def check_room_availability(hotel_id: str, room_id: str, check_in_date: str, che
         is_available = len(conflicting_reservations) == 0
         return is_available
         
+    except (ServiceUnavailableError, deadline.DeadlineExceededError):
+        raise
     except Exception as e:
-        logger.error(f"Error checking room availability: {str(e)}", exc_info=True)
+        logger.error("Error checking room availability: %s", e, exc_info=True)
         return False
 
-def add_reservation(hotel_id: str, reservation: dict):
+def get_room_free_slots(hotel_id: str, room_id: str, start_date: str, end_date: str):
+    """Return the free date ranges of a room inside [start_date, end_date)"""
     try:
-        # Validate room availability
-        availability_result = check_room_availability(
-            hotel_id, 
-            reservation['room_number'], 
-            reservation['check_in_date'], 
-            reservation['check_out_date']
-        )
-        
-        if not availability_result:
-            raise ValueError(f"Room {reservation['room_number']} is not available for the selected dates")
-        
-        # Set default user since auth is disabled
-        user_id = 'system'
-        
-        # Create reservation item with new schema
-        item = {
-            "PK": f"RESERVATION#{reservation['reservation_id']}",
-            "SK": "METADATA",
-            "EntityType": "Reservation",
-            "HotelId": hotel_id,
-            "RoomId": reservation['room_number'],
-            "CheckInDate": reservation['check_in_date'],
-            "CheckOutDate": reservation['check_out_date'],
-            "Status": reservation['status'],
-            "ContactName": reservation['contact_name'],
-            "ContactLastName": reservation['contact_last_name'],
-            "ContactPhone": reservation.get('contact_phone', ''),
-            "Notes": reservation.get('notes', ''),
-            "UserId": user_id,
-            "ModifiedBy": user_id,
-            "CreatedOn": datetime.now().isoformat(),
-            "ModifiedOn": datetime.now().isoformat(),
-            "IsDeleted": False,
-            # GSI keys
-            "GSI3PK": f"USER#{user_id}",
-            "GSI3SK": f"RESERVATION#{reservation['reservation_id']}",
-            "GSI4PK": f"ROOM#{reservation['room_number']}",
-            "GSI4SK": f"RESERVATION#{reservation['reservation_id']}",
-            "GSI5PK": f"DATE#{reservation['check_in_date']}",
-            "GSI5SK": f"RESERVATION#{reservation['reservation_id']}"
-        }
+        start, end = to_ordinal(start_date), to_ordinal(end_date)
+        slots = None
 
-        table.put_item(Item=item)
-        
-        # Add reservation persons if provided
-        if 'guests' in reservation:
-            for i, guest in enumerate(reservation['guests']):
-                person_item = {
-                    "PK": f"RESERVATION#{reservation['reservation_id']}",
-                    "SK": f"PERSON#{i+1}",
-                    "EntityType": "ReservationPerson",
-                    "FirstName": guest['first_name'],
-                    "LastName": guest['last_name']
-                }
-                table.put_item(Item=person_item)
-        
-        logger.info(f"Successfully created reservation {reservation['reservation_id']} for hotel {hotel_id}")
-        return item
+        if INTERVAL_INDEX_ENABLED:
+            index = _get_interval_index(hotel_id, get_hotel_version(hotel_id))
+            if index.covers(start, end):
+                slots = index.free_slots(room_id, start, end)
+
+        if slots is None:
+            room = RoomIntervals()
+            for item in _query_room_reservations(hotel_id, room_id, start_date, end_date):
+                room.add(to_ordinal(item['CheckInDate']), to_ordinal(item['CheckOutDate']), item['PK'])
+            slots = room.free_slots(start, end)
+
+        return [
+            {'start_date': from_ordinal(slot_start), 'end_date': from_ordinal(slot_end)}
+            for slot_start, slot_end in slots
+        ]
     except Exception as e:
-        logger.error(f"Error creating reservation for hotel {hotel_id}: {str(e)}", exc_info=True)
+        logger.error("Error retrieving free slots for room %s in hotel %s: %s", room_id, hotel_id, e, exc_info=True)
         raise
 
-def update_reservation(hotel_id: str, reservation_id: str, updates: dict):
+def _build_reservation_items(hotel_id: str, reservation: dict, user_id: str):
+    """Build the reservation item and its PERSON# items from API reservation data"""
+    reservation_id = reservation['reservation_id']
+    room_id = reservation['room_number']
+    check_in_date = reservation['check_in_date']
+
+    # Create reservation item with new schema
+    item = {
+        "PK": f"RESERVATION#{reservation_id}",
+        "SK": "METADATA",
+        "EntityType": "Reservation",
+        "HotelId": hotel_id,
+        "RoomId": room_id,
+        "CheckInDate": check_in_date,
+        "CheckOutDate": reservation['check_out_date'],
+        "Status": reservation['status'],
+        "ContactName": reservation['contact_name'],
+        "ContactLastName": reservation['contact_last_name'],
+        "ContactPhone": reservation.get('contact_phone', ''),
+        "Notes": reservation.get('notes', ''),
+        "GuestCount": len(reservation.get('guests', [])),
+        "UserId": user_id,
+        "ModifiedBy": user_id,
+        "CreatedOn": datetime.now().isoformat(),
+        "ModifiedOn": datetime.now().isoformat(),
+        "IsDeleted": False,
+        "Version": 1,
+        # GSI keys
+        "GSI3PK": f"USER#{user_id}",
+        "GSI3SK": f"RESERVATION#{reservation_id}",
+        "GSI4PK": f"ROOM#{room_id}",
+        "GSI4SK": f"RESERVATION#{reservation_id}",
+        "GSI5PK": date_partition_key(check_in_date, hotel_id, f"RESERVATION#{reservation_id}"),
+        "GSI5SK": f"RESERVATION#{reservation_id}",
+        # Bookings of the hotel in creation order: generated ids are time-sortable,
+        # client-supplied ones get a generated sort key
+        "GSI7PK": f"BOOKING#{hotel_id}",
+        "GSI7SK": reservation_id if ids.is_ulid(reservation_id) else ids.new_id()
+    }
+    if reservation.get('room_price') is not None:
+        item["RoomPrice"] = reservation['room_price']
+    if reservation.get('transport_price') is not None:
+        item["TransportPrice"] = reservation['transport_price']
+
+    # Reservation persons, written in the same transaction as the reservation
+    person_items = []
+    if 'guests' in reservation:
+        for i, guest in enumerate(reservation['guests']):
+            person_items.append({
+                "PK": f"RESERVATION#{reservation_id}",
+                "SK": f"PERSON#{i+1}",
+                "EntityType": "ReservationPerson",
+                "FirstName": guest['first_name'],
+                "LastName": guest['last_name']
+            })
+
+    return item, person_items
+
+def _reservation_exists(reservation_id: str) -> bool:
+    response = table.get_item(
+        Key={'PK': f"RESERVATION#{reservation_id}", 'SK': 'METADATA'},
+        ProjectionExpression='PK',
+        ConsistentRead=True
+    )
+    return 'Item' in response
+
+def add_reservation(hotel_id: str, reservation: dict):
+    """
+    Create a reservation. Without a reservation_id the server generates a
+    time-sortable one; the reservation is only put if its id is not taken, so
+    an existing reservation is never overwritten.
+    """
     try:
+        generated_id = not reservation.get('reservation_id')
+        if generated_id:
+            reservation['reservation_id'] = ids.new_id()
+        reservation_id = reservation['reservation_id']
+        room_id = reservation['room_number']
+        check_in_date = reservation['check_in_date']
+        check_out_date = reservation['check_out_date']
+
         # Set default user since auth is disabled
         user_id = 'system'
-        
-        # Check if we're updating dates or room - if so, validate availability
-        if 'check_in_date' in updates or 'check_out_date' in updates or 'room_number' in updates:
-            # Get current reservation to get the room number if not being updated
-            current_reservation = table.get_item(
-                Key={
-                    "PK": f"RESERVATION#{reservation_id}",
-                    "SK": "METADATA"
-                }
-            ).get('Item')
-            
-            if not current_reservation:
-                raise ValueError(f"Reservation {reservation_id} not found")
-            
-            # Use updated values or current values
-            room_id = updates.get('room_number', current_reservation.get('RoomId'))
-            check_in = updates.get('check_in_date', current_reservation.get('CheckInDate'))
-            check_out = updates.get('check_out_date', current_reservation.get('CheckOutDate'))
-            
-            # Validate availability (excluding current reservation)
-            if not check_room_availability(hotel_id, room_id, check_in, check_out, reservation_id):
+        item, person_items = _build_reservation_items(hotel_id, reservation, user_id)
+
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            if attempt:
+                _write_backoff(attempt)
+            # Validate room availability as of a known room (or hotel) version
+            versions = _guard_versions(hotel_id, [room_id])
+            if not check_room_availability(hotel_id, room_id, check_in_date, check_out_date, version=versions.get(None)):
                 raise ValueError(f"Room {room_id} is not available for the selected dates")
-        
-        # Map frontend field names to DynamoDB field names
-        field_mapping = {
-            'room_number': 'RoomId',
-            'check_in_date': 'CheckInDate',
-            'check_out_date': 'CheckOutDate',
-            'contact_name': 'ContactName',
-            'contact_last_name': 'ContactLastName',
-            'contact_phone': 'ContactPhone',
-            'notes': 'Notes'
-        }
-        
-        update_expressions = []
-        expression_values = {}
-        expression_names = {}
-        
-        for k, v in updates.items():
-            if k in ["PK", "SK", "reservation_id", "EntityType"]:
+
+            actions = [{'Put': {'TableName': table.name, 'Item': item, 'ConditionExpression': 'attribute_not_exists(PK)'}}]
+            actions.extend({'Put': {'TableName': table.name, 'Item': person}} for person in person_items)
+            actions.extend(_occupancy_actions(hotel_id, [(room_id, check_in_date, check_out_date, True)]))
+            actions.extend(_version_guards(hotel_id, versions))
+            stats_actions = _daily_stats_actions(hotel_id, [_reservation_contributions(item, 1)])
+
+            try:
+                _transact_with_daily_stats(actions, stats_actions)
+            except ConcurrentWriteError:
+                if _reservation_exists(reservation_id):
+                    if not generated_id:
+                        raise ValueError(f"Reservation {reservation_id} already exists")
+                    logger.warning("Generated reservation id %s is taken, generating another", reservation_id)
+                    reservation['reservation_id'] = reservation_id = ids.new_id()
+                    item, person_items = _build_reservation_items(hotel_id, reservation, user_id)
+                    continue
+                logger.warning("Room %s of hotel %s changed while creating reservation %s, retrying", room_id, hotel_id, reservation_id)
                 continue
-            
-            # Use mapped field name if available, otherwise use original
-            db_field = field_mapping.get(k, k)
-            
-            # Handle reserved keywords by using expression attribute names
-            if db_field in ["status", "name", "date", "type", "key", "value"]:
-                expression_names[f"#{db_field}"] = db_field
-                update_expressions.append(f"#{db_field} = :{k}")
-            else:
-                update_expressions.append(f"{db_field} = :{k}")
-            
-            expression_values[f":{k}"] = v
 
-        if not update_expressions:
-            logger.warning(f"No valid updates provided for reservation {reservation_id} in hotel {hotel_id}")
-            return None
+            _record_index_write(
+                hotel_id, versions,
+                lambda index: index.add(room_id, to_ordinal(check_in_date), to_ordinal(check_out_date), reservation_id)
+            )
+            _sync_search_entries(item, reservation.get('guests', []))
+            logger.info("Successfully created reservation %s for hotel %s", reservation_id, hotel_id)
+            return item
 
-        # Add metadata updates
-        update_expressions.append("ModifiedBy = :modified_by")
-        update_expressions.append("ModifiedOn = :modified_on")
-        update_expressions.append("HotelId = :hotel_id")
-        expression_values[":modified_by"] = user_id
-        expression_values[":modified_on"] = datetime.now().isoformat()
-        expression_values[":hotel_id"] = hotel_id
+        raise WriteContentionError(f"Room {room_id} could not be reserved because it was modified concurrently, please retry")
+    except Exception as e:
+        logger.error("Error creating reservation for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise
 
-        update_expression = "SET " + ", ".join(update_expressions)
+# Reservation API fields and the attributes they are stored in
+RESERVATION_FIELDS = {
+    'room_number': 'RoomId',
+    'check_in_date': 'CheckInDate',
+    'check_out_date': 'CheckOutDate',
+    'status': 'Status',
+    'contact_name': 'ContactName',
+    'contact_last_name': 'ContactLastName',
+    'contact_phone': 'ContactPhone',
+    'notes': 'Notes',
+    'room_price': 'RoomPrice',
+    'transport_price': 'TransportPrice'
+}
 
-        update_kwargs = {
-            "Key": {
-                "PK": f"RESERVATION#{reservation_id}",
-                "SK": "METADATA"
-            },
-            "UpdateExpression": update_expression,
-            "ExpressionAttributeValues": expression_values,
-            "ReturnValues": "ALL_NEW"
+def _reservation_guests(reservation_key: str):
+    """Stored guests of a reservation in PERSON# order"""
+    persons = []
+    last_evaluated_key = None
+    while True:
+        query_kwargs = {
+            'KeyConditionExpression': Key('PK').eq(reservation_key) & Key('SK').begins_with('PERSON#'),
+            'ConsistentRead': True
         }
-        
-        # Add expression attribute names if we have any reserved keywords
-        if expression_names:
-            update_kwargs["ExpressionAttributeNames"] = expression_names
-        
-        response = table.update_item(**update_kwargs)
+        if last_evaluated_key:
+            query_kwargs['ExclusiveStartKey'] = last_evaluated_key
 
-        logger.info(f"Successfully updated reservation {reservation_id} for hotel {hotel_id}")
-        return response.get('Attributes', {})
-    except Exception as e:
-        logger.error(f"Error updating reservation {reservation_id} for hotel {hotel_id}: {str(e)}", exc_info=True)
-        raise
+        response = table.query(**query_kwargs)
+        persons.extend(response.get('Items', []))
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
 
-def soft_delete_reservation(reservation_id: str, deleted_by: str):
-    """Soft delete a reservation by setting IsDeleted=True"""
-    try:
-        from datetime import datetime
-        
-        # Update the reservation to mark it as deleted
-        response = table.update_item(
-            Key={
-                'PK': f'RESERVATION#{reservation_id}',
-                'SK': 'METADATA'
-            },
-            UpdateExpression="SET IsDeleted = :is_deleted, DeletedOn = :deleted_on, DeletedBy = :deleted_by",
-            ExpressionAttributeValues={
-                ':is_deleted': True,
-                ':deleted_on': datetime.utcnow().isoformat(),
-                ':deleted_by': deleted_by
-            },
-            ReturnValues="ALL_NEW"
-        )
-        
-        logger.info(f"Successfully soft deleted reservation {reservation_id} by {deleted_by}")
-        return response.get('Attributes', {})
-    except Exception as e:
-        logger.error(f"Error soft deleting reservation {reservation_id}: {str(e)}", exc_info=True)
-        raise
+    persons.sort(key=lambda person: int(person['SK'].split('#', 1)[1]))
+    return [{'first_name': person.get('FirstName'), 'last_name': person.get('LastName')} for person in persons]
 
-def get_deleted_reservations(hotel_id: str, start_date: str, end_date: str):
-    """Get deleted reservations for a hotel within a deletion date range"""
+def _guest_actions(reservation_key: str, current_guests: list, new_guests: list):
+    """Puts for the PERSON# rows whose guest changed and deletes for rows past the new guest list"""
+    actions = []
+    for i, guest in enumerate(new_guests):
+        guest = {'first_name': guest['first_name'], 'last_name': guest['last_name']}
+        if i < len(current_guests) and current_guests[i] == guest:
+            continue
+        actions.append({'Put': {'TableName': table.name, 'Item': {
+            "PK": reservation_key,
+            "SK": f"PERSON#{i+1}",
+            "EntityType": "ReservationPerson",
+            "FirstName": guest['first_name'],
+            "LastName": guest['last_name']
+        }}})
+    for i in range(len(new_guests), len(current_guests)):
+        actions.append({'Delete': {'TableName': table.name, 'Key': {'PK': reservation_key, 'SK': f"PERSON#{i+1}"}}})
+    return actions
+
+def _reservation_update_kwargs(key: dict, current: dict, changes: dict, removals: list):
+    """update_item arguments that write only the changed attributes, if the item is still as read"""
+    names, values, assignments = {}, {}, []
+    for i, (attribute, value) in enumerate(changes.items()):
+        names[f"#a{i}"] = attribute
+        values[f":a{i}"] = value
+        assignments.append(f"#a{i} = :a{i}")
+
+    update_expression = "SET " + ", ".join(assignments)
+    if removals:
+        for i, attribute in enumerate(removals):
+            names[f"#r{i}"] = attribute
+        update_expression += " REMOVE " + ", ".join(f"#r{i}" for i in range(len(removals)))
+
+    # Optimistic check: the reservation still has the version we diffed against
+    update_expression += " ADD #version :one"
+    names["#version"] = "Version"
+    values[":one"] = 1
+    if current.get('Version'):
+        condition = "attribute_exists(PK) AND #version = :expected_version"
+        values[":expected_version"] = current['Version']
+    else:
+        condition = "attribute_exists(PK) AND attribute_not_exists(#version)"
+
+    return {
+        "Key": key,
+        "UpdateExpression": update_expression,
+        "ConditionExpression": condition,
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": values,
+    }
+
+_deserializer = TypeDeserializer()
+
+# Fields whose values are in the search index
+SEARCH_FIELDS = ('contact_name', 'contact_last_name', 'contact_phone')
+
+def _sync_search_entries(reservation: dict, guests: list = None):
+    """
+    Bring a reservation's search entries in line with the reservation after a
+    committed write. Guest entries are only touched when `guests` is given.
+    Failures are logged rather than raised: the write itself has succeeded, and
+    rebuild_search_index repairs the entries.
+    """
     try:
-        from datetime import datetime
-        
-        # Create start and end datetime strings for the range
-        start_datetime = f"{start_date}T00:00:00"
-        end_datetime = f"{end_date}T23:59:59"
-        
-        all_reservations = []
+        desired = search_entries(reservation, guests)
+        current = {}
         last_evaluated_key = None
-        
         while True:
-            scan_kwargs = {
-                'FilterExpression': "EntityType = :entity_type AND HotelId = :hotel_id AND IsDeleted = :is_deleted AND DeletedOn >= :start_datetime AND DeletedOn <= :end_datetime",
-                'ExpressionAttributeValues': {
-                    ":entity_type": "Reservation",
-                    ":hotel_id": hotel_id,
-                    ":start_datetime": start_datetime,
-                    ":end_datetime": end_datetime,
-                    ":is_deleted": True,
-                }
+            query_kwargs = {
+                'KeyConditionExpression': Key('PK').eq(reservation['PK']) & Key('SK').begins_with('SEARCH#'),
+                'ConsistentRead': True
             }
-            
             if last_evaluated_key:
-                scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
-                
-            response = table.scan(**scan_kwargs)
-            all_reservations.extend(response.get('Items', []))
-            
+                query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+            response = table.query(**query_kwargs)
+            current.update((entry['SK'], entry) for entry in response.get('Items', []))
             last_evaluated_key = response.get('LastEvaluatedKey')
             if not last_evaluated_key:
                 break
-        
-        # For each reservation, get the guest data
-        for reservation in all_reservations:
-            reservation_id = reservation['PK']
-            
-            # Query for guest records for this reservation
-            guest_response = table.query(
-                KeyConditionExpression=Key('PK').eq(reservation_id) & Key('SK').begins_with('PERSON#'),
-                FilterExpression="EntityType = :entity_type",
-                ExpressionAttributeValues={
+
+        if guests is None and desired:
+            current = {sk: entry for sk, entry in current.items() if entry_source(sk) == CONTACT_SOURCE}
+        puts = [entry for sk, entry in desired.items() if current.get(sk) != entry]
+        deletes = [sk for sk in current if sk not in desired]
+        if not puts and not deletes:
+            return
+        with table.batch_writer() as batch:
+            for entry in puts:
+                batch.put_item(Item=entry)
+            for sk in deletes:
+                batch.delete_item(Key={'PK': reservation['PK'], 'SK': sk})
+    except Exception as e:
+        logger.warning("Failed to update search entries of %s: %s", reservation.get('PK'), e, exc_info=True)
+
+# Fields a client can change with a single blind conditional write
+SIMPLE_FIELDS = ('status', 'contact_name', 'contact_last_name', 'contact_phone', 'notes')
+
+def _update_reservation_at_version(hotel_id: str, key: dict, updates: dict, expected_version: int, user_id: str):
+    """
+    Write simple field changes in one conditional update on the client's version,
+    without reading the reservation first: the updated item comes back from the
+    write, and on a failed condition the item as it was comes back with the error.
+    """
+    changes = {RESERVATION_FIELDS[field]: updates[field] for field in SIMPLE_FIELDS if field in updates}
+    changes["ModifiedBy"] = user_id
+    changes["ModifiedOn"] = datetime.now().isoformat()
+    update_kwargs = _reservation_update_kwargs(key, {'Version': expected_version}, changes, [])
+    # Same tenant check as a read-first update: items written before HotelId was stored pass
+    update_kwargs["ConditionExpression"] += " AND (attribute_not_exists(HotelId) OR HotelId = :hotel_id)"
+    update_kwargs["ExpressionAttributeValues"][":hotel_id"] = hotel_id
+
+    try:
+        response = table.update_item(ReturnValues='ALL_NEW', ReturnValuesOnConditionCheckFailure='ALL_OLD', **update_kwargs)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        # Error responses skip the resource layer, so the returned item is still DynamoDB-typed
+        current = {name: _deserializer.deserialize(value) for name, value in e.response.get('Item', {}).items()}
+        if not current or current.get('HotelId', hotel_id) != hotel_id:
+            raise ValueError(f"Reservation {key['PK'].split('#', 1)[1]} not found")
+        raise VersionConflictError(current)
+
+    # Bumped right after the edit rather than with it, so the write needs no transaction.
+    # A failed bump leaves cached listings stale for at most the cache TTL; the edit itself is committed
+    try:
+        dynamodb.meta.client.update_item(**_data_version_bump(hotel_id)['Update'])
+    except Exception as e:
+        logger.error("Failed to bump the data version of hotel %s after updating %s: %s", hotel_id, key['PK'], e, exc_info=True)
+    return response['Attributes']
+
+def update_reservation(hotel_id: str, reservation_id: str, updates: dict, expected_version: int = None):
+    """
+    Apply a partial update to a reservation, writing only what actually changed.
+
+    Fields missing from `updates` are left alone. Derived GSI4/GSI5 keys are
+    rewritten when the room or check-in date change, guest rows only where a
+    guest changed, and availability, occupancy and the room version guards are
+    only involved when the stay itself moves.
+
+    Every write bumps the reservation's Version and is conditioned on the version
+    it was based on. With `expected_version` (the version the client edited) a
+    mismatch raises VersionConflictError carrying the current item, and edits of
+    simple fields go out as a single conditional write with no read.
+    """
+    try:
+        # Set default user since auth is disabled
+        user_id = 'system'
+        key = {
+            "PK": f"RESERVATION#{reservation_id}",
+            "SK": "METADATA"
+        }
+
+        if expected_version is not None and set(updates) <= set(SIMPLE_FIELDS):
+            updated_reservation = _update_reservation_at_version(hotel_id, key, updates, expected_version, user_id)
+            if set(updates) & set(SEARCH_FIELDS):
+                _sync_search_entries(updated_reservation)
+            logger.info("Successfully updated reservation %s for hotel %s", reservation_id, hotel_id)
+            return updated_reservation
+
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            if attempt:
+                _write_backoff(attempt)
+            current_reservation = table.get_item(Key=key, ConsistentRead=True).get('Item')
+            if not current_reservation or current_reservation.get('HotelId', hotel_id) != hotel_id:
+                raise ValueError(f"Reservation {reservation_id} not found")
+            if expected_version is not None and int(current_reservation.get('Version', 0)) != expected_version:
+                raise VersionConflictError(current_reservation)
+
+            changes = {
+                attribute: updates[field]
+                for field, attribute in RESERVATION_FIELDS.items()
+                if field in updates and updates[field] != current_reservation.get(attribute)
+            }
+            if current_reservation.get('HotelId') != hotel_id:
+                changes['HotelId'] = hotel_id
+
+            guest_actions = []
+            if 'guests' in updates:
+                guest_actions = _guest_actions(key['PK'], _reservation_guests(key['PK']), updates['guests'])
+                if current_reservation.get('GuestCount') != len(updates['guests']):
+                    changes['GuestCount'] = len(updates['guests'])
+
+            # Index keys follow the room and check-in date, and heal if they were left stale
+            for index_key, value in expected_index_keys({**current_reservation, **changes}).items():
+                if current_reservation.get(index_key) != value:
+                    changes[index_key] = value
+            # Older updates stored the raw guests list as an unmapped attribute
+            removals = ['guests'] if 'guests' in current_reservation else []
+
+            if not changes and not guest_actions and not removals:
+                logger.info("No changes to apply to reservation %s for hotel %s", reservation_id, hotel_id)
+                return current_reservation
+
+            changes["ModifiedBy"] = user_id
+            changes["ModifiedOn"] = datetime.now().isoformat()
+            update_kwargs = _reservation_update_kwargs(key, current_reservation, changes, removals)
+            updated_reservation = {**current_reservation, **changes, "Version": int(current_reservation.get('Version', 0)) + 1}
+            for attribute in removals:
+                updated_reservation.pop(attribute, None)
+
+            active = not current_reservation.get('IsDeleted')
+            stay_moved = active and any(attribute in changes for attribute in ('RoomId', 'CheckInDate', 'CheckOutDate'))
+            stats_changed = active and (stay_moved or any(attribute in changes for attribute in ('GuestCount', 'RoomPrice', 'TransportPrice')))
+            room_id = updated_reservation['RoomId']
+            check_in = updated_reservation['CheckInDate']
+            check_out = updated_reservation['CheckOutDate']
+
+            # Contact, status and notes edits are a single conditional update
+            if not stay_moved and not stats_changed and not guest_actions:
+                try:
+                    _transact_write([{'Update': {'TableName': table.name, **update_kwargs}}, _data_version_bump(hotel_id)])
+                except ConcurrentWriteError:
+                    logger.warning("Reservation %s changed while updating it, retrying", reservation_id)
+                    continue
+                if any(RESERVATION_FIELDS[field] in changes for field in SEARCH_FIELDS):
+                    _sync_search_entries(updated_reservation)
+                logger.info("Successfully updated reservation %s for hotel %s", reservation_id, hotel_id)
+                return updated_reservation
+
+            actions = [{'Update': {'TableName': table.name, **update_kwargs}}] + guest_actions
+            versions = {}
+            if stay_moved:
+                # Validate availability (excluding current reservation) as of known room (or hotel) versions
+                versions = _guard_versions(hotel_id, dict.fromkeys([current_reservation['RoomId'], room_id]))
+                if not check_room_availability(hotel_id, room_id, check_in, check_out, reservation_id, version=versions.get(None)):
+                    raise ValueError(f"Room {room_id} is not available for the selected dates")
+                actions.extend(_occupancy_actions(hotel_id, [
+                    (current_reservation['RoomId'], current_reservation['CheckInDate'], current_reservation['CheckOutDate'], False),
+                    (room_id, check_in, check_out, True),
+                ]))
+                actions.extend(_version_guards(hotel_id, versions))
+            else:
+                actions.append(_data_version_bump(hotel_id))
+
+            stats_actions = []
+            if stats_changed:
+                stats_actions = _daily_stats_actions(hotel_id, [
+                    _reservation_contributions(current_reservation, -1),
+                    _reservation_contributions(updated_reservation, 1),
+                ])
+
+            try:
+                _transact_with_daily_stats(actions, stats_actions)
+            except ConcurrentWriteError:
+                logger.warning("Rooms or reservation %s of hotel %s changed while updating it, retrying", reservation_id, hotel_id)
+                continue
+
+            if stay_moved:
+                _record_index_write(
+                    hotel_id, versions,
+                    lambda index: index.add(room_id, to_ordinal(check_in), to_ordinal(check_out), reservation_id)
+                )
+            if guest_actions or 'HotelId' in changes or any(RESERVATION_FIELDS[field] in changes for field in SEARCH_FIELDS):
+                _sync_search_entries(updated_reservation, updates['guests'] if 'guests' in updates else None)
+            logger.info("Successfully updated reservation %s for hotel %s", reservation_id, hotel_id)
+            return updated_reservation
+
+        raise WriteContentionError(f"Reservation {reservation_id} could not be updated because it was modified concurrently, please retry")
+    except Exception as e:
+        logger.error("Error updating reservation %s for hotel %s: %s", reservation_id, hotel_id, e, exc_info=True)
+        raise
+
+def soft_delete_reservation(reservation_id: str, deleted_by: str):
+    """Soft delete a reservation by setting IsDeleted=True"""
+    try:
+        from datetime import datetime
+
+        key = {
+            'PK': f'RESERVATION#{reservation_id}',
+            'SK': 'METADATA'
+        }
+
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            if attempt:
+                _write_backoff(attempt)
+            current_reservation = table.get_item(Key=key, ConsistentRead=True).get('Item')
+            if not current_reservation:
+                raise ValueError(f"Reservation {reservation_id} not found")
+            if current_reservation.get('IsDeleted'):
+                return current_reservation
+
+            hotel_id = current_reservation.get('HotelId')
+            versions = _guard_versions(hotel_id, [current_reservation['RoomId']]) if hotel_id else {}
+            current_version = int(current_reservation.get('Version', 0))
+            deleted_values = {
+                'IsDeleted': True,
+                'DeletedOn': datetime.utcnow().isoformat(),
+                'DeletedBy': deleted_by,
+                'Version': current_version + 1
+            }
+
+            # Update the reservation to mark it as deleted
+            actions = [{
+                'Update': {
+                    'TableName': table.name,
+                    'Key': key,
+                    'UpdateExpression': "SET IsDeleted = :is_deleted, DeletedOn = :deleted_on, DeletedBy = :deleted_by ADD #version :one",
+                    'ConditionExpression': "#version = :expected_version" if current_version else "attribute_not_exists(#version)",
+                    'ExpressionAttributeNames': {'#version': 'Version'},
+                    'ExpressionAttributeValues': {
+                        ':is_deleted': True,
+                        ':deleted_on': deleted_values['DeletedOn'],
+                        ':deleted_by': deleted_by,
+                        ':one': 1,
+                        **({':expected_version': current_version} if current_version else {})
+                    }
+                }
+            }]
+
+            # Freed nights must reach the bitmaps, the daily aggregates and other workers' indexes
+            stats_actions = []
+            if hotel_id:
+                actions.extend(_occupancy_actions(hotel_id, [
+                    (current_reservation['RoomId'], current_reservation['CheckInDate'], current_reservation['CheckOutDate'], False),
+                ]))
+                actions.extend(_version_guards(hotel_id, versions))
+                stats_actions = _daily_stats_actions(hotel_id, [_reservation_contributions(current_reservation, -1)])
+
+            try:
+                _transact_with_daily_stats(actions, stats_actions)
+            except ConcurrentWriteError:
+                logger.warning("Room or reservation %s of hotel %s changed while deleting it, retrying", reservation_id, hotel_id)
+                continue
+
+            if hotel_id:
+                _record_index_write(hotel_id, versions, lambda index: index.remove(reservation_id))
+            # Deleted reservations are not searchable
+            _sync_search_entries({**current_reservation, **deleted_values})
+
+            logger.info("Successfully soft deleted reservation %s by %s", reservation_id, deleted_by)
+            return {**current_reservation, **deleted_values}
+
+        raise WriteContentionError(f"Reservation {reservation_id} could not be deleted because it was modified concurrently, please retry")
+    except Exception as e:
+        logger.error("Error soft deleting reservation %s: %s", reservation_id, e, exc_info=True)
+        raise
+
+def get_hotel_occupancy(hotel_id: str, start_date: str, end_date: str):
+    """
+    Night-by-night occupancy of every room in a hotel from start_date to end_date inclusive.
+
+    Each room maps to a string with one character per night ('1' sold, '0' free),
+    alongside per-night counts of sold and available rooms.
+    """
+    try:
+        room_ids = [room['PK'].split('#', 1)[1] for room in get_rooms(hotel_id)]
+        window_end = from_ordinal(to_ordinal(end_date) + 1)
+        matrix = load_occupancy(hotel_id, room_ids, start_date, window_end)
+
+        sold = matrix.occupied_counts()
+        characters = matrix.nights.astype('uint8') + ord('0')
+        return {
+            'dates': [from_ordinal(day) for day in range(matrix.start, matrix.end)],
+            'rooms': {room_id: characters[row].tobytes().decode('ascii') for row, room_id in enumerate(room_ids)},
+            'occupied_rooms': sold.tolist(),
+            'available_rooms': (len(room_ids) - sold).tolist(),
+        }
+    except Exception as e:
+        logger.error("Error retrieving occupancy for hotel %s from %s to %s: %s", hotel_id, start_date, end_date, e, exc_info=True)
+        raise
+
+def get_occupancy_analytics(start_date: str, end_date: str, granularity: str = 'day', hotel_id: str = None, company_id: str = None):
+    """
+    Occupancy %, ADR, RevPAR and room-type mix per day, week or month for one hotel
+    or every hotel of a company, from start_date to end_date inclusive.
+
+    Capacity counts active rooms only, so stays in inactive (or unknown) rooms are
+    left out too; otherwise occupancy could exceed 100%.
+    """
+    try:
+        if company_id:
+            hotel_ids = [hotel['PK'].split('#', 1)[1] for hotel in get_company_hotels(company_id)]
+        else:
+            hotel_ids = [hotel_id]
+
+        start = to_ordinal(start_date)
+        end = to_ordinal(end_date) + 1
+        stays = StayColumns()
+        rooms_available = 0
+
+        for current_hotel_id in hotel_ids:
+            rooms = [room for room in get_rooms(current_hotel_id) if room.get('IsActive', True)]
+            room_types = {room['PK'].split('#', 1)[1]: room.get('Type', 'Unknown') for room in rooms}
+            rooms_available += len(rooms)
+
+            for item in _scan_active_reservations(
+                current_hotel_id, start_date, from_ordinal(end),
+                projection="PK, RoomId, CheckInDate, CheckOutDate, RoomPrice, TransportPrice"
+            ):
+                if item['RoomId'] not in room_types:
+                    continue
+                stays.append(
+                    to_ordinal(item['CheckInDate']),
+                    to_ordinal(item['CheckOutDate']),
+                    item.get('RoomPrice'),
+                    item.get('TransportPrice'),
+                    room_types[item['RoomId']]
+                )
+
+        analytics = compute_analytics(stays, rooms_available, start, end, granularity)
+        analytics.update({
+            'hotel_ids': hotel_ids,
+            'start_date': start_date,
+            'end_date': end_date,
+        })
+        return analytics
+    except Exception as e:
+        logger.error("Error computing analytics from %s to %s: %s", start_date, end_date, e, exc_info=True)
+        raise
+
+def rebuild_hotel_occupancy(hotel_id: str, years: list):
+    """
+    Recompute a hotel's occupancy bitmaps for the given years from its reservations.
+
+    The bitmaps are written in version-guarded transaction chunks, so a concurrent
+    reservation write makes the rebuild start over instead of losing that write.
+    Returns the number of room-year items written.
+    """
+    try:
+        years = sorted(set(years))
+        window_start = from_ordinal(year_start(years[0]))
+        window_end = from_ordinal(year_start(years[-1] + 1))
+
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            if attempt:
+                _write_backoff(attempt)
+            data_version = get_hotel_data_version(hotel_id)
+            bitmaps = {
+                (room['PK'].split('#', 1)[1], year): None
+                for room in get_rooms(hotel_id)
+                for year in years
+            }
+
+            for item in _scan_active_reservations(hotel_id, window_start, window_end):
+                stay = nights_by_year(to_ordinal(item['CheckInDate']), to_ordinal(item['CheckOutDate']))
+                for year, (first, last) in stay.items():
+                    if year in years:
+                        key = (item['RoomId'], year)
+                        bitmaps[key] = set_nights(bitmaps.get(key), first, last, True)
+
+            puts = [
+                {'Put': {'TableName': table.name, 'Item': _occupancy_item(hotel_id, room_id, year, nights or EMPTY_YEAR)}}
+                for (room_id, year), nights in bitmaps.items()
+            ]
+
+            try:
+                _transact_guarded_chunks(hotel_id, data_version, puts)
+            except ConcurrentWriteError:
+                logger.warning("Hotel %s changed while rebuilding occupancy, retrying", hotel_id)
+                continue
+
+            interval_index_cache.invalidate(hotel_id)
+            logger.info("Rebuilt %s occupancy bitmaps for hotel %s", len(puts), hotel_id)
+            return len(puts)
+
+        raise ConcurrentWriteError(f"Hotel {hotel_id} kept changing while rebuilding occupancy")
+    except Exception as e:
+        logger.error("Error rebuilding occupancy for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise
+
+def import_reservations(hotel_id: str, body: bytes, content_type: str):
+    """
+    Bulk import reservations from JSON lines or CSV.
+
+    Every row is validated against the existing bookings and the other rows in one
+    sweep-line pass, then accepted rows are written in chunked transactions guarded
+    by the versions of their rooms (the hotel version with the interval index). If
+    those change mid-import, the rows not yet written are re-validated and the
+    import continues. Returns a per-row report.
+    """
+    try:
+        rows = parse_rows(body, content_type)
+        validate_rows(rows)
+        user_id = 'system'
+
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            if attempt:
+                _write_backoff(attempt)
+            # Imports never overwrite an existing reservation id (the puts are
+            # conditional too; a clash cancels the chunk and lands here again)
+            pending = [row for row in rows if not row.status]
+            existing_ids = {
+                item['PK'] for item in _batch_get_items(
+                    [{'PK': f"RESERVATION#{row.reservation_id}", 'SK': 'METADATA'} for row in pending],
+                    projection="PK"
+                )
+            }
+            for row in pending:
+                if f"RESERVATION#{row.reservation_id}" in existing_ids:
+                    row.reject(DUPLICATE, f"Reservation {row.reservation_id} already exists")
+
+            pending = [row for row in rows if not row.status]
+            if not pending:
+                break
+
+            versions = _guard_versions(hotel_id, dict.fromkeys(row.reservation['room_number'] for row in pending))
+            window_start = min(row.reservation['check_in_date'] for row in pending)
+            window_end = max(row.reservation['check_out_date'] for row in pending)
+            existing = [
+                (item['RoomId'], to_ordinal(item['CheckInDate']), to_ordinal(item['CheckOutDate']), item['PK'].split('#', 1)[1])
+                for item in _scan_active_reservations(hotel_id, window_start, window_end, consistent=True)
+            ]
+            sweep_conflicts(pending, existing)
+
+            try:
+                _write_import_chunks(hotel_id, versions, [row for row in pending if not row.status], user_id)
+            except ConcurrentWriteError:
+                logger.warning("Hotel %s changed during reservation import, re-validating remaining rows", hotel_id)
+                continue
+            break
+
+        for row in rows:
+            if not row.status:
+                row.reject(CONFLICT, "Hotel kept changing during the import, please retry this row")
+
+        interval_index_cache.invalidate(hotel_id)
+        report = summarize(rows)
+        logger.info("Imported reservations for hotel %s: %s", hotel_id, report['counts'])
+        return report
+    except Exception as e:
+        logger.error("Error importing reservations for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise
+
+def _write_import_chunks(hotel_id: str, versions: dict, rows: list, user_id: str):
+    """
+    Write validated import rows in guarded transactions that each fit the item
+    limit, advancing `versions` (from _guard_versions) past each committed chunk
+    """
+    def flush(chunk):
+        guarded = versions if None in versions else {item['RoomId']: versions[item['RoomId']] for _, item, _ in chunk}
+        actions = []
+        for _, item, person_items in chunk:
+            actions.append({'Put': {'TableName': table.name, 'Item': item, 'ConditionExpression': 'attribute_not_exists(PK)'}})
+            actions.extend({'Put': {'TableName': table.name, 'Item': person}} for person in person_items)
+        actions.extend(_occupancy_actions(hotel_id, [
+            (item['RoomId'], item['CheckInDate'], item['CheckOutDate'], True) for _, item, _ in chunk
+        ]))
+        actions.extend(_version_guards(hotel_id, guarded))
+        stats_actions = _daily_stats_actions(hotel_id, [_reservation_contributions(item, 1) for _, item, _ in chunk])
+
+        _transact_with_daily_stats(actions, stats_actions)
+        for row, _, _ in chunk:
+            row.status = CREATED
+        for key in guarded:
+            versions[key] += 1
+
+    chunk, puts, bitmaps, days, rooms = [], 0, set(), set(), set()
+    for row in rows:
+        item, person_items = _build_reservation_items(hotel_id, row.reservation, user_id)
+        check_in, check_out = to_ordinal(item['CheckInDate']), to_ordinal(item['CheckOutDate'])
+        row_bitmaps = {(item['RoomId'], year) for year in nights_by_year(check_in, check_out)}
+        row_days = set(range(check_in, check_out + 1))
+
+        # Puts, bitmap items, day items and the guards must fit one transaction
+        guards = 1 if None in versions else len(rooms | {item['RoomId']}) + 1
+        if chunk and puts + 1 + len(person_items) + len(bitmaps | row_bitmaps) + len(days | row_days) + guards > MAX_TRANSACTION_ITEMS:
+            flush(chunk)
+            chunk, puts, bitmaps, days, rooms = [], 0, set(), set(), set()
+
+        chunk.append((row, item, person_items))
+        puts += 1 + len(person_items)
+        bitmaps |= row_bitmaps
+        days |= row_days
+        rooms.add(item['RoomId'])
+
+    if chunk:
+        flush(chunk)
+
+def _scan_reservation_pages(hotel_ids: list, start_date: str, end_date: str, include_deleted: bool = False, segments: int = 1):
+    """
+    Yield pages of reservations of the given hotels whose stay overlaps [start_date, end_date].
+
+    With more than one segment the table is read by a parallel segmented scan and
+    pages arrive in no particular order. A filter takes at most MAX_IN_OPERANDS
+    hotels, so larger companies are read in one pass per group of hotels.
+    """
+    for hotel_values in _hotel_id_values(hotel_ids):
+        yield from _scan_hotel_group_pages(hotel_values, start_date, end_date, include_deleted, segments)
+
+def _hotel_id_values(hotel_ids: list):
+    """Expression values of `HotelId IN (...)` filters, one per group of at most MAX_IN_OPERANDS hotels"""
+    for start in range(0, len(hotel_ids), MAX_IN_OPERANDS):
+        yield {f":hotel_{i}": current_hotel_id for i, current_hotel_id in enumerate(hotel_ids[start:start + MAX_IN_OPERANDS])}
+
+def _scan_hotel_group_pages(hotel_values: dict, start_date: str, end_date: str, include_deleted: bool, segments: int):
+    filter_expression = f"EntityType = :entity_type AND HotelId IN ({', '.join(hotel_values)}) AND CheckInDate <= :end AND CheckOutDate >= :start"
+    expression_values = {
+        ":entity_type": "Reservation",
+        ":start": start_date,
+        ":end": end_date,
+        **hotel_values,
+    }
+    if not include_deleted:
+        filter_expression += " AND (attribute_not_exists(IsDeleted) OR IsDeleted = :is_deleted)"
+        expression_values[":is_deleted"] = False
+
+    if segments > 1:
+        scan = ParallelScan(table, total_segments=segments, scan_kwargs={
+            'FilterExpression': filter_expression,
+            'ExpressionAttributeValues': expression_values,
+        })
+        for page in scan.pages():
+            if page:
+                yield page
+        return
+
+    last_evaluated_key = None
+    while True:
+        scan_kwargs = {
+            'FilterExpression': filter_expression,
+            'ExpressionAttributeValues': expression_values,
+        }
+        if last_evaluated_key:
+            scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+        response = table.scan(**scan_kwargs)
+        if response.get('Items'):
+            yield response['Items']
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
+
+def _join_guests(pages):
+    """
+    Attach 'Guests' to every reservation of each page.
+
+    Reservations that record GuestCount have their PERSON#1..n rows fetched with
+    one BatchGetItem per page; older items fall back to a query per reservation.
+    """
+    for page in pages:
+        keys = []
+        for reservation in page:
+            reservation['Guests'] = []
+            if 'GuestCount' in reservation:
+                keys.extend(
+                    {'PK': reservation['PK'], 'SK': f'PERSON#{i + 1}'}
+                    for i in range(int(reservation['GuestCount']))
+                )
+
+        people = {}
+        for person in _batch_get_items(keys, projection="PK, SK, FirstName, LastName"):
+            people.setdefault(person['PK'], []).append(person)
+
+        for reservation in page:
+            if 'GuestCount' in reservation:
+                rows = sorted(people.get(reservation['PK'], []), key=lambda person: int(person['SK'].split('#', 1)[1]))
+            else:
+                rows = table.query(
+                    KeyConditionExpression=Key('PK').eq(reservation['PK']) & Key('SK').begins_with('PERSON#')
+                ).get('Items', [])
+            reservation['Guests'] = [
+                {'first_name': person.get('FirstName', ''), 'last_name': person.get('LastName', '')}
+                for person in rows
+            ]
+
+        yield page
+
+def export_reservations(start_date: str, end_date: str, export_format: str = 'ndjson', hotel_id: str = None, company_id: str = None, include_deleted: bool = False, segments: int = 1):
+    """
+    Stream the reservations of a hotel or a whole company as NDJSON or CSV text chunks.
+
+    Pages are read from DynamoDB, joined with their guests in batches and rendered
+    row by row, so memory use stays flat regardless of the export size; archived
+    stays in the range follow, one partition at a time. Offline exports can pass
+    `segments` to read the table with a parallel scan.
+    """
+    if company_id:
+        hotel_ids = [hotel['PK'].split('#', 1)[1] for hotel in get_company_hotels(company_id)]
+    else:
+        hotel_ids = [hotel_id]
+
+    def rows():
+        if not hotel_ids:
+            return
+        try:
+            exported = set()
+            for page in _join_guests(_scan_reservation_pages(hotel_ids, start_date, end_date, include_deleted, segments)):
+                for reservation in page:
+                    exported.add(reservation['PK'])
+                    yield export_row(reservation)
+            for current_hotel_id in hotel_ids:
+                for reservation in _archived_reservations(current_hotel_id, start_date, end_date, include_deleted):
+                    if reservation['PK'] not in exported:
+                        yield export_row(reservation)
+        except Exception as e:
+            logger.error("Error exporting reservations for hotels %s from %s to %s: %s", hotel_ids, start_date, end_date, e, exc_info=True)
+            raise
+
+    return render(rows(), export_format)
+
+def get_daily_stats(hotel_id: str, start_date: str, end_date: str):
+    """Materialised per-day aggregates of a hotel from start_date to end_date inclusive"""
+    try:
+        stored = _query_daily_stats(hotel_id, start_date, end_date)
+
+        daily_stats = []
+        for ordinal in range(to_ordinal(start_date), to_ordinal(end_date) + 1):
+            day = from_ordinal(ordinal)
+            # Until the rebuild has run, removing a reservation written before the counters
+            # existed subtracts what was never added; never report less than nothing
+            counters = {counter: max(value, 0) for counter, value in stored.get(day, {}).items()}
+            daily_stats.append({
+                'date': day,
+                'rooms_sold': int(counters.get('RoomsSold', 0)),
+                'arrivals': int(counters.get('Arrivals', 0)),
+                'departures': int(counters.get('Departures', 0)),
+                'guests': int(counters.get('Guests', 0)),
+                'room_revenue': counters.get('RoomRevenue', 0),
+                'transport_revenue': counters.get('TransportRevenue', 0),
+            })
+        return daily_stats
+    except Exception as e:
+        logger.error("Error retrieving daily stats for hotel %s from %s to %s: %s", hotel_id, start_date, end_date, e, exc_info=True)
+        raise
+
+def _query_daily_stats(hotel_id: str, start_date: str, end_date: str):
+    """Read the stored day items of a hotel as {YYYY-MM-DD: {counter: value}}"""
+    stored = {}
+    last_evaluated_key = None
+    while True:
+        query_kwargs = {
+            'KeyConditionExpression': Key('PK').eq(f'LOCATION#{hotel_id}') & Key('SK').between(f'DAY#{start_date}', f'DAY#{end_date}')
+        }
+        if last_evaluated_key:
+            query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+        response = table.query(**query_kwargs)
+        for item in response.get('Items', []):
+            stored[item['SK'].split('#', 1)[1]] = {counter: item[counter] for counter in COUNTERS if counter in item}
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
+    return stored
+
+def rebuild_daily_stats(hotel_id: str, start_date: str, end_date: str, fix: bool = False):
+    """
+    Recompute a hotel's daily aggregates from its reservations and report drift.
+
+    Returns one entry per drifted day with the stored and expected counters. With
+    `fix` the drifted days are overwritten in version-guarded transactions.
+    """
+    try:
+        start = to_ordinal(start_date)
+        end = to_ordinal(end_date)
+
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            if attempt:
+                _write_backoff(attempt)
+            data_version = get_hotel_data_version(hotel_id)
+
+            # Stays that checked out on start_date still count as departures
+            contributions = [
+                _reservation_contributions(item, 1)
+                for item in _scan_active_reservations(
+                    hotel_id, from_ordinal(start - 1), from_ordinal(end + 1),
+                    projection="PK, CheckInDate, CheckOutDate, RoomPrice, TransportPrice, GuestCount"
+                )
+            ]
+            expected = {
+                day: counters for day, counters in merge_contributions(contributions).items()
+                if start <= to_ordinal(day) <= end
+            }
+            stored = _query_daily_stats(hotel_id, start_date, end_date)
+
+            drift = []
+            for day in sorted(set(expected) | set(stored)):
+                expected_counters = {counter: expected.get(day, {}).get(counter, 0) for counter in COUNTERS}
+                stored_counters = {counter: stored.get(day, {}).get(counter, 0) for counter in COUNTERS}
+                if expected_counters != stored_counters:
+                    drift.append({'date': day, 'stored': stored_counters, 'expected': expected_counters})
+
+            if not fix or not drift:
+                return drift
+
+            puts = [
+                {'Put': {'TableName': table.name, 'Item': {
+                    **_daily_stats_key(hotel_id, entry['date']),
+                    'EntityType': 'HotelDailyStats',
+                    **entry['expected'],
+                }}}
+                for entry in drift
+            ]
+            try:
+                _transact_guarded_chunks(hotel_id, data_version, puts)
+            except ConcurrentWriteError:
+                logger.warning("Hotel %s changed while rebuilding daily stats, retrying", hotel_id)
+                continue
+
+            interval_index_cache.invalidate(hotel_id)
+            logger.info("Fixed %s drifted daily stats days for hotel %s", len(drift), hotel_id)
+            return drift
+
+        raise ConcurrentWriteError(f"Hotel {hotel_id} kept changing while rebuilding daily stats")
+    except Exception as e:
+        logger.error("Error rebuilding daily stats for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise
+
+def check_integrity(hotel_id: str = None, fix: bool = False, segments: int = 8, workers: int = None, read_capacity_per_second: float = None):
+    """
+    Check every reservation (or those of one hotel) for double bookings, stale
+    GSI4/GSI5 keys and orphaned PERSON# rows, reading the table once with a
+    parallel scan.
+
+    With fix=True stale index keys are rewritten and orphaned guest rows deleted,
+    each conditioned on the item not having changed since it was checked.
+    Double bookings are only reported; which stay has to move is a decision for
+    the hotel.
+    """
+    try:
+        reservations, persons = [], PersonRows()
+        scan = ParallelScan(
+            table,
+            total_segments=segments,
+            workers=workers,
+            read_capacity_per_second=read_capacity_per_second,
+            scan_kwargs={
+                'FilterExpression': "EntityType IN (:reservation, :person)",
+                'ProjectionExpression': SCAN_PROJECTION,
+                'ExpressionAttributeValues': {":reservation": "Reservation", ":person": "ReservationPerson"},
+            },
+        )
+        # Held as compact records: a whole-table check keeps every item in memory
+        for item in scan.items():
+            if item['EntityType'] == 'Reservation':
+                reservations.append(ReservationRecord.from_item(item))
+            else:
+                persons.append_item(item)
+
+        in_scope = [r for r in reservations if hotel_id is None or r.hotel_id == hotel_id]
+        orphaned = find_orphaned_persons(reservations, persons)
+        if hotel_id is not None:
+            # Guest rows carry no hotel, so rows without any reservation only show up in a full check
+            scoped_keys = {r.key for r in in_scope}
+            orphaned = [issue for issue in orphaned if f"RESERVATION#{issue['reservation_id']}" in scoped_keys]
+
+        issues = find_overlaps(in_scope) + find_stale_index_keys(in_scope) + orphaned
+        counts = {}
+        for issue in issues:
+            counts[issue['type']] = counts.get(issue['type'], 0) + 1
+
+        report = {
+            'generated_on': datetime.utcnow().isoformat(),
+            'hotel_id': hotel_id,
+            'reservations_checked': len(in_scope),
+            'persons_checked': len(persons),
+            'counts': counts,
+            'issues': issues,
+        }
+        if fix:
+            report['fixed'] = _fix_integrity_issues(issues, {r.key: r for r in in_scope})
+        return report
+    except Exception as e:
+        logger.error("Error checking reservation integrity for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise
+
+def _fix_integrity_issues(issues: list, reservations: dict):
+    """
+    Repair stale index keys and orphaned guest rows; returns the number fixed per issue type.
+    Each fix bumps its hotel's data version in the same transaction.
+    """
+    fixed = {STALE_INDEX_KEY: 0, ORPHANED_PERSON: 0}
+    for issue in issues:
+        reservation_key = f"RESERVATION#{issue['reservation_id']}"
+        reservation = reservations.get(reservation_key)
+        if issue['type'] == STALE_INDEX_KEY:
+            names = {f"#{key}": key for key in issue['expected']}
+            action = {'Update': {
+                'TableName': table.name,
+                'Key': {'PK': reservation_key, 'SK': 'METADATA'},
+                'UpdateExpression': "SET " + ", ".join(f"#{key} = :{key}" for key in issue['expected']),
+                'ConditionExpression': "RoomId = :room_id AND CheckInDate = :check_in_date",
+                'ExpressionAttributeNames': names,
+                'ExpressionAttributeValues': {
+                    **{f":{key}": value for key, value in issue['expected'].items()},
+                    ":room_id": reservation.room_id,
+                    ":check_in_date": reservation.check_in_date,
+                }
+            }}
+        elif issue['type'] == ORPHANED_PERSON:
+            # Re-check the reservation right before deleting its guest row
+            number = int(issue['person'].split('#', 1)[1])
+            current = table.get_item(Key={'PK': reservation_key, 'SK': 'METADATA'}, ConsistentRead=True).get('Item')
+            if current is not None and ('GuestCount' not in current or number <= int(current['GuestCount'])):
+                continue
+            action = {'Delete': {'TableName': table.name, 'Key': {'PK': reservation_key, 'SK': issue['person']}}}
+        else:
+            continue
+        actions = [action]
+        if reservation is not None and reservation.hotel_id:
+            actions.append(_data_version_bump(reservation.hotel_id))
+        try:
+            _transact_write(actions)
+        except ConcurrentWriteError:
+            logger.info("Skipped fixing %s of reservation %s: changed since it was checked", issue['type'], issue['reservation_id'])
+            continue
+        fixed[issue['type']] += 1
+    return fixed
+
+def _query_date_partition(partition_key: str, hotel_ids: list):
+    """Active reservations of the given hotels in one GSI5 partition"""
+    items = []
+    for hotel_values in _hotel_id_values(hotel_ids):
+        last_evaluated_key = None
+        while True:
+            query_kwargs = {
+                'IndexName': 'GSI5',
+                'KeyConditionExpression': Key('GSI5PK').eq(partition_key),
+                'FilterExpression': f"HotelId IN ({', '.join(hotel_values)}) AND (attribute_not_exists(IsDeleted) OR IsDeleted = :is_deleted)",
+                'ExpressionAttributeValues': {":is_deleted": False, **hotel_values}
+            }
+            if last_evaluated_key:
+                query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+            response = table.query(**query_kwargs)
+            items.extend(response.get('Items', []))
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+    return items
+
+def get_arrivals(start_date: str, end_date: str, hotel_id: str = None, company_id: str = None):
+    """
+    Reservations of a hotel, or of every hotel of a company, checking in from
+    start_date to end_date inclusive, with guests.
+
+    Read from the date index: the GSI5 partitions of every day (one per shard,
+    see db/sharding.py) are queried concurrently and merged, ordered by check-in
+    date, hotel and room.
+    """
+    try:
+        if company_id:
+            hotel_ids = [hotel['PK'].split('#', 1)[1] for hotel in get_company_hotels(company_id)]
+        else:
+            hotel_ids = [hotel_id]
+        start = to_ordinal(start_date)
+        end = to_ordinal(end_date)
+        if end < start or end - start >= MAX_ARRIVAL_DAYS:
+            raise ValueError(f"end_date must be on or after start_date and at most {MAX_ARRIVAL_DAYS} days later")
+        if not hotel_ids:
+            return []
+
+        partitions = [key for day in range(start, end + 1) for key in date_partition_keys(from_ordinal(day), hotel_ids)]
+        arrivals = {}
+        with ThreadPoolExecutor(max_workers=min(DATE_INDEX_READ_WORKERS, len(partitions))) as executor:
+            # Each query runs in a copy of this context, so the request deadline and tracing follow it
+            futures = [executor.submit(contextvars.copy_context().run, _query_date_partition, key, hotel_ids) for key in partitions]
+            for future in futures:
+                for item in future.result():
+                    arrivals[item['PK']] = item
+
+        results = next(_join_guests([list(arrivals.values())]))
+        for current_hotel_id in hotel_ids:
+            results.extend(
+                reservation for reservation in _archived_reservations(current_hotel_id, start_date, end_date)
+                if reservation['PK'] not in arrivals and start_date <= reservation['CheckInDate'] <= end_date
+            )
+        results.sort(key=lambda item: (item['CheckInDate'], item.get('HotelId', ''), item.get('RoomId', '')))
+        return results
+    except Exception as e:
+        logger.error("Error retrieving arrivals from %s to %s for hotel %s / company %s: %s", start_date, end_date, hotel_id, company_id, e, exc_info=True)
+        raise
+
+def _created_ms(value: str, end: bool) -> int:
+    """Milliseconds of an ISO date or timestamp (UTC unless it has an offset); a date covers its whole day"""
+    if len(value) == 10:
+        day = datetime.fromisoformat(value) + (timedelta(days=1) if end else timedelta())
+        return int(day.replace(tzinfo=timezone.utc).timestamp() * 1000) - (1 if end else 0)
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+def get_latest_reservations(hotel_id: str, limit: int = 20, created_from: str = None, created_to: str = None, before: str = None):
+    """
+    The hotel's most recently created active reservations, newest first, with guests.
+
+    Read from GSI7, whose sort key is a time-sortable id, so created_from and
+    created_to (inclusive) become a key range. To page, pass the GSI7SK of the
+    last reservation returned as `before`.
+    """
+    try:
+        limit = max(1, min(limit, MAX_LATEST_RESULTS))
+        try:
+            lower, upper = ids.id_bounds(
+                _created_ms(created_from, end=False) if created_from else 0,
+                _created_ms(created_to, end=True) if created_to else ids.MAX_TIMESTAMP
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid creation time: {e}")
+        if before:
+            if not ids.is_ulid(before):
+                raise ValueError(f"Invalid before cursor {before}")
+            upper = min(upper, ids.previous_id(before))
+        if upper < lower:
+            return []
+
+        results = []
+        last_evaluated_key = None
+        while len(results) < limit:
+            query_kwargs = {
+                'IndexName': 'GSI7',
+                'KeyConditionExpression': Key('GSI7PK').eq(f"BOOKING#{hotel_id}") & Key('GSI7SK').between(lower, upper),
+                'FilterExpression': "attribute_not_exists(IsDeleted) OR IsDeleted = :is_deleted",
+                'ExpressionAttributeValues': {":is_deleted": False},
+                'ScanIndexForward': False,
+                'Limit': limit
+            }
+            if last_evaluated_key:
+                query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+            response = table.query(**query_kwargs)
+            results.extend(response.get('Items', []))
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+
+        return next(_join_guests([results[:limit]]))
+    except Exception as e:
+        logger.error("Error retrieving latest reservations for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise
+
+def get_deleted_reservations(hotel_id: str, start_date: str, end_date: str):
+    """Get deleted reservations for a hotel within a deletion date range"""
+    try:
+        from datetime import datetime
+        
+        # Create start and end datetime strings for the range
+        start_datetime = f"{start_date}T00:00:00"
+        end_datetime = f"{end_date}T23:59:59"
+        
+        all_reservations = []
+        last_evaluated_key = None
+        
+        while True:
+            scan_kwargs = {
+                'FilterExpression': "EntityType = :entity_type AND HotelId = :hotel_id AND IsDeleted = :is_deleted AND DeletedOn >= :start_datetime AND DeletedOn <= :end_datetime",
+                'ExpressionAttributeValues': {
+                    ":entity_type": "Reservation",
+                    ":hotel_id": hotel_id,
+                    ":start_datetime": start_datetime,
+                    ":end_datetime": end_datetime,
+                    ":is_deleted": True,
+                }
+            }
+            
+            if last_evaluated_key:
+                scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+                
+            response = table.scan(**scan_kwargs)
+            all_reservations.extend(response.get('Items', []))
+            
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+        
+        # For each reservation, get the guest data
+        for reservation in all_reservations:
+            reservation_id = reservation['PK']
+            
+            # Query for guest records for this reservation
+            guest_response = table.query(
+                KeyConditionExpression=Key('PK').eq(reservation_id) & Key('SK').begins_with('PERSON#'),
+                FilterExpression="EntityType = :entity_type",
+                ExpressionAttributeValues={
                     ":entity_type": "ReservationPerson"
                 }
             )
@@ -421,8 +2074,363 @@ def get_deleted_reservations(hotel_id: str, start_date: str, end_date: str):
             
             # Add guests to reservation
             reservation['Guests'] = guests
+
+        # Purged and archived reservations answer for older deletions
+        if archive is not None:
+            listed = {reservation['PK'] for reservation in all_reservations}
+            all_reservations.extend(
+                reservation for reservation in archive.deleted_reservations(hotel_id, start_datetime, end_datetime)
+                if reservation['PK'] not in listed
+            )
         
         return all_reservations
     except Exception as e:
-        logger.error(f"Error retrieving deleted reservations for hotel {hotel_id} from {start_date} to {end_date}: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        logger.error("Error retrieving deleted reservations for hotel %s from %s to %s: %s", hotel_id, start_date, end_date, e, exc_info=True)
+        raise
+
+def search_reservations(query: str, hotel_id: str = None, company_id: str = None, limit: int = 20):
+    """
+    Find reservations of one hotel, or of every hotel of a company, by guest or
+    contact name or by phone number, through the GSI6 search entries.
+
+    Every query token has to prefix a token of the same name, in any order and
+    whatever the script ("petr" finds "Петровски"). The index is read by the
+    query's longest token and the rest are checked against the entry. Results
+    carry the fields that matched in "Matches", most recent stay first.
+    """
+    try:
+        kind, tokens = parse_query(query)
+        limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+        if company_id:
+            hotel_ids = [hotel['PK'].split('#', 1)[1] for hotel in get_company_hotels(company_id)]
+        else:
+            hotel_ids = [hotel_id]
+        lookup = max(tokens, key=len)
+
+        found = {}
+        for current_hotel_id in hotel_ids:
+            last_evaluated_key = None
+            for page in range(MAX_SEARCH_PAGES):
+                query_kwargs = {
+                    'IndexName': 'GSI6',
+                    'KeyConditionExpression': Key('GSI6PK').eq(f"SEARCH#{current_hotel_id}") & Key('GSI6SK').begins_with(f"{kind}#{lookup}"),
+                    'Limit': SEARCH_PAGE_SIZE
+                }
+                if last_evaluated_key:
+                    query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+                response = table.query(**query_kwargs)
+                for entry in response.get('Items', []):
+                    if matches(entry, kind, tokens):
+                        match = {'field': entry['Field'], 'value': entry['Value']}
+                        entry_matches = found.setdefault((current_hotel_id, entry['ReservationId']), [])
+                        if match not in entry_matches:
+                            entry_matches.append(match)
+                last_evaluated_key = response.get('LastEvaluatedKey')
+                if not last_evaluated_key or len(found) >= limit:
+                    break
+            if len(found) >= limit:
+                break
+
+        keys = [{'PK': f"RESERVATION#{reservation_id}", 'SK': 'METADATA'} for _, reservation_id in list(found)[:limit]]
+        results = []
+        for item in _batch_get_items(keys):
+            reservation_id = item['PK'].split('#', 1)[1]
+            # Entries can trail a write that failed to update them
+            if item.get('IsDeleted') or (item.get('HotelId'), reservation_id) not in found:
+                continue
+            item['Matches'] = found[(item['HotelId'], reservation_id)]
+            results.append(item)
+        results.sort(key=lambda item: item.get('CheckInDate', ''), reverse=True)
+        return results
+    except Exception as e:
+        logger.error("Error searching reservations of hotel %s / company %s: %s", hotel_id, company_id, e, exc_info=True)
+        raise
+
+def rebuild_search_index(hotel_id: str = None, segments: int = 8):
+    """
+    Rewrite the search entries of every reservation (or those of one hotel) from
+    the reservation and guest items, reading the table once with a parallel scan.
+    Used to backfill GSI6 and to repair entries a failed write left behind.
+    """
+    try:
+        reservations, persons = [], {}
+        scan = ParallelScan(table, total_segments=segments, scan_kwargs={
+            'FilterExpression': "EntityType IN (:reservation, :person)",
+            'ExpressionAttributeValues': {":reservation": "Reservation", ":person": "ReservationPerson"},
+        })
+        for item in scan.items():
+            if item['EntityType'] == 'Reservation':
+                if hotel_id is None or item.get('HotelId') == hotel_id:
+                    reservations.append(item)
+            else:
+                persons.setdefault(item['PK'], []).append(item)
+
+        for reservation in reservations:
+            rows = sorted(persons.get(reservation['PK'], []), key=lambda person: int(person['SK'].split('#', 1)[1]))
+            guests = [{'first_name': person.get('FirstName', ''), 'last_name': person.get('LastName', '')} for person in rows]
+            _sync_search_entries(reservation, guests)
+
+        logger.info("Rebuilt search entries of %d reservations", len(reservations))
+        return {'hotel_id': hotel_id, 'reservations': len(reservations)}
+    except Exception as e:
+        logger.error("Error rebuilding the search index for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise
+
+def _reservation_collection(reservation_key: str):
+    """Every item under a reservation's PK: METADATA, PERSON# and SEARCH# rows"""
+    items = []
+    last_evaluated_key = None
+    while True:
+        query_kwargs = {'KeyConditionExpression': Key('PK').eq(reservation_key), 'ConsistentRead': True}
+        if last_evaluated_key:
+            query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+        response = table.query(**query_kwargs)
+        items.extend(response.get('Items', []))
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            return items
+
+def _archive_record(collection: list):
+    """The reservation item of a collection with its guests attached, as stored in the archive"""
+    reservation = next(item for item in collection if item['SK'] == 'METADATA')
+    persons = sorted(
+        (item for item in collection if item['SK'].startswith('PERSON#')),
+        key=lambda person: int(person['SK'].split('#', 1)[1])
+    )
+    return {
+        **reservation,
+        'Guests': [{'first_name': person.get('FirstName', ''), 'last_name': person.get('LastName', '')} for person in persons],
+    }
+
+def _delete_collection(collection: list) -> bool:
+    """
+    Delete a reservation's items, the reservation first and only if its version is
+    still the one that was archived, together with its hotel's data version bump.
+    Returns False when it changed in between.
+    """
+    reservation = next(item for item in collection if item['SK'] == 'METADATA')
+    version = reservation.get('Version')
+    try:
+        _transact_write([
+            {'Delete': {
+                'TableName': table.name,
+                'Key': {'PK': reservation['PK'], 'SK': 'METADATA'},
+                'ConditionExpression': "#version = :version" if version is not None else "attribute_not_exists(#version)",
+                'ExpressionAttributeNames': {'#version': 'Version'},
+                **({'ExpressionAttributeValues': {':version': version}} if version is not None else {})
+            }},
+            _data_version_bump(reservation['HotelId']),
+        ])
+    except ConcurrentWriteError:
+        return False
+    with table.batch_writer() as batch:
+        for item in collection:
+            if item['SK'] != 'METADATA':
+                batch.delete_item(Key={'PK': item['PK'], 'SK': item['SK']})
+    return True
+
+def _expire_collection(collection: list, expires_at: int) -> bool:
+    """
+    Hand a deleted reservation's items to the table TTL, the reservation only if it
+    is still deleted at the version that was archived. Returns False otherwise.
+    """
+    reservation = next(item for item in collection if item['SK'] == 'METADATA')
+    version = reservation.get('Version')
+    try:
+        table.update_item(
+            Key={'PK': reservation['PK'], 'SK': 'METADATA'},
+            UpdateExpression="SET ExpiresAt = :expires_at",
+            ConditionExpression="IsDeleted = :is_deleted AND " + ("#version = :version" if version is not None else "attribute_not_exists(#version)"),
+            ExpressionAttributeNames={'#version': 'Version'},
+            ExpressionAttributeValues={
+                ':expires_at': expires_at,
+                ':is_deleted': True,
+                **({':version': version} if version is not None else {})
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+    with table.batch_writer() as batch:
+        for item in collection:
+            if item['SK'] != 'METADATA':
+                batch.put_item(Item={**item, 'ExpiresAt': expires_at})
+    return True
+
+def _archive_lock_key(hotel_id: str) -> dict:
+    return {'PK': f'LOCATION#{hotel_id}', 'SK': 'ARCHIVE_LOCK'}
+
+def _acquire_archive_lock(hotel_id: str, owner: str) -> bool:
+    """Claim the hotel's archive lock for ARCHIVE_LOCK_SECONDS; False when another run holds it"""
+    now = int(time.time())
+    try:
+        table.put_item(
+            Item={
+                **_archive_lock_key(hotel_id),
+                'EntityType': 'ArchiveLock',
+                'Owner': owner,
+                'LockedOn': datetime.utcnow().isoformat(),
+                'ExpiresAt': now + ARCHIVE_LOCK_SECONDS,
+            },
+            # A lock past its expiry belongs to a run that died without releasing it
+            ConditionExpression="attribute_not_exists(PK) OR ExpiresAt < :now",
+            ExpressionAttributeValues={":now": now}
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+def _release_archive_lock(hotel_id: str, owner: str):
+    try:
+        table.delete_item(
+            Key=_archive_lock_key(hotel_id),
+            ConditionExpression="#owner = :owner",
+            ExpressionAttributeNames={"#owner": "Owner"},
+            ExpressionAttributeValues={":owner": owner}
+        )
+    except ClientError as e:
+        # Taken over after it expired; the other run releases it
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+def _move_to_archive(collections: dict, retire, settle_seconds: float = 0):
+    """
+    Move reservation collections, grouped by hotel, from the table to the archive.
+
+    Partitions and manifests are written first and `retire` (delete or expire)
+    runs on each collection after `settle_seconds`, so every reader finds a moved
+    reservation in the table or in the archive. Archived copies of reservations
+    that changed since are superseded by the table and rewritten by the next run.
+    Returns the number of reservations moved and skipped per hotel.
+
+    Archive and purge runs rewrite the same partitions and manifest, so each
+    hotel is only moved under its archive lock; hotels another run holds are
+    skipped and reported as locked.
+    """
+    owner = uuid.uuid4().hex
+    counts = {}
+    locked = {}
+    for hotel_id, hotel_collections in collections.items():
+        if _acquire_archive_lock(hotel_id, owner):
+            locked[hotel_id] = hotel_collections
+        else:
+            counts[hotel_id] = {'archived': 0, 'skipped': len(hotel_collections), 'locked': True}
+            logger.warning("Skipped archiving hotel %s: another archive or purge run holds it", hotel_id)
+
+    try:
+        for hotel_id, hotel_collections in locked.items():
+            archive.append(hotel_id, [_archive_record(collection) for collection in hotel_collections])
+
+        if locked and settle_seconds:
+            time.sleep(settle_seconds)
+
+        for hotel_id, hotel_collections in locked.items():
+            moved = sum(retire(collection) for collection in hotel_collections)
+            counts[hotel_id] = {'archived': moved, 'skipped': len(hotel_collections) - moved}
+            # Archived stays still hold their nights in the bitmaps and daily stats; only listings
+            # change, and retiring bumped the data version with each reservation
+            interval_index_cache.invalidate(hotel_id)
+            logger.info("Archived %s reservations of hotel %s, %s changed meanwhile", moved, hotel_id, len(hotel_collections) - moved)
+    finally:
+        for hotel_id in locked:
+            _release_archive_lock(hotel_id, owner)
+    return counts
+
+def archive_reservations(hotel_id: str = None, months: int = None, dry_run: bool = False, segments: int = 8, settle_seconds: float = None):
+    """
+    Move reservations (deleted or not) that checked out more than `months` months
+    ago, with their guests, from the table to the archive. Listings, exports and
+    reports keep returning them from there.
+    """
+    try:
+        if archive is None:
+            raise ValueError("No archive configured, set ARCHIVE_URL")
+        cutoff = months_before(date.today(), ARCHIVE_AFTER_MONTHS if months is None else months).isoformat()
+
+        filter_expression = "EntityType = :entity_type AND CheckOutDate < :cutoff"
+        expression_values = {":entity_type": "Reservation", ":cutoff": cutoff}
+        if hotel_id:
+            filter_expression += " AND HotelId = :hotel_id"
+            expression_values[":hotel_id"] = hotel_id
+        scan = ParallelScan(table, total_segments=segments, scan_kwargs={
+            'FilterExpression': filter_expression,
+            'ProjectionExpression': "PK, HotelId",
+            'ExpressionAttributeValues': expression_values,
+        })
+
+        candidates = {}
+        for item in scan.items():
+            if item.get('HotelId'):
+                candidates.setdefault(item['HotelId'], []).append(item['PK'])
+
+        report = {'cutoff': cutoff, 'dry_run': dry_run, 'hotels': {}}
+        if dry_run:
+            report['hotels'] = {current_hotel_id: {'archived': len(keys), 'skipped': 0} for current_hotel_id, keys in candidates.items()}
+            return report
+
+        collections = {}
+        for current_hotel_id, keys in candidates.items():
+            for key in keys:
+                collection = _reservation_collection(key)
+                # Skip reservations deleted or moved to a later stay since the scan
+                if any(item['SK'] == 'METADATA' and item.get('CheckOutDate', '') < cutoff for item in collection):
+                    collections.setdefault(current_hotel_id, []).append(collection)
+        # Table items go only once workers' cached manifests list the new partitions
+        settle_seconds = archive.manifest_ttl_seconds if settle_seconds is None else settle_seconds
+        report['hotels'] = _move_to_archive(collections, _delete_collection, settle_seconds)
+        return report
+    except Exception as e:
+        logger.error("Error archiving reservations for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise
+
+def purge_deleted_reservations(hotel_id: str = None, retention_days: int = None, dry_run: bool = False, segments: int = 8):
+    """
+    Hand reservations soft deleted more than `retention_days` days ago, with their
+    guest rows, to the archive, then set ExpiresAt on their items so the table TTL
+    removes them from the table and its indexes. The deleted-reservations report
+    and exports with deleted reservations read them from the archive.
+    """
+    try:
+        if archive is None:
+            raise ValueError("No archive configured, set ARCHIVE_URL")
+        retention_days = DELETED_RETENTION_DAYS if retention_days is None else retention_days
+        cutoff = (datetime.utcnow() - timedelta(days=retention_days)).isoformat()
+
+        filter_expression = "EntityType = :entity_type AND IsDeleted = :is_deleted AND DeletedOn < :cutoff AND attribute_not_exists(ExpiresAt)"
+        expression_values = {":entity_type": "Reservation", ":is_deleted": True, ":cutoff": cutoff}
+        if hotel_id:
+            filter_expression += " AND HotelId = :hotel_id"
+            expression_values[":hotel_id"] = hotel_id
+        scan = ParallelScan(table, total_segments=segments, scan_kwargs={
+            'FilterExpression': filter_expression,
+            'ProjectionExpression': "PK, HotelId",
+            'ExpressionAttributeValues': expression_values,
+        })
+
+        candidates = {}
+        for item in scan.items():
+            if item.get('HotelId'):
+                candidates.setdefault(item['HotelId'], []).append(item['PK'])
+
+        report = {'cutoff': cutoff, 'dry_run': dry_run, 'hotels': {}}
+        if dry_run:
+            report['hotels'] = {current_hotel_id: {'archived': len(keys), 'skipped': 0} for current_hotel_id, keys in candidates.items()}
+            return report
+
+        collections = {}
+        for current_hotel_id, keys in candidates.items():
+            for key in keys:
+                collection = _reservation_collection(key)
+                if any(item['SK'] == 'METADATA' and item.get('IsDeleted') and 'ExpiresAt' not in item for item in collection):
+                    collections.setdefault(current_hotel_id, []).append(collection)
+
+        # Expiring after cached manifests have moved on keeps every tombstone readable somewhere
+        expires_at = int(time.time()) + archive.manifest_ttl_seconds
+        report['hotels'] = _move_to_archive(collections, lambda collection: _expire_collection(collection, expires_at))
+        return report
+    except Exception as e:
+        logger.error("Error purging deleted reservations for hotel %s: %s", hotel_id, e, exc_info=True)
+        raise
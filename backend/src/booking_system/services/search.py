@@ -0,0 +1,144 @@
+"""
+Search tokens for looking up reservations by guest or contact name and phone.
+
+Names are folded to one Latin spelling so that Cyrillic and Latin forms of the
+same name meet: "Петровски" and "Petrovski" both become "petrovski", and
+"Петровиќ", "Петровић" and "Petrović" all become "petrovic". Diacritics are
+dropped and the digraphs used to transliterate Cyrillic (sh, zh, ch, kj, gj)
+are folded like the letters they stand for.
+
+Phone numbers are indexed as their digits reversed, without leading zeros, so
+that a prefix lookup finds numbers by their trailing digits: "070 123 456" finds
+"+389 70 123 456".
+
+Each name (contact or guest) yields one search entry per token, kept in the
+reservation's item collection and exposed through GSI6 under the hotel:
+GSI6PK=SEARCH#{hotel_id}, GSI6SK=NAME#{token}#{reservation_id}#{source} or
+PHONE#{reversed digits}#{reservation_id}#{source}.
+"""
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+NAME = 'NAME'
+PHONE = 'PHONE'
+
+CONTACT_SOURCE = 'CONTACT'
+
+# Shortest phone query, in digits, that is still selective
+MIN_PHONE_DIGITS = 4
+
+_CYRILLIC = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'ѓ': 'gj', 'ђ': 'dj', 'е': 'e', 'ё': 'e', 'є': 'je',
+    'ж': 'z', 'з': 'z', 'ѕ': 'dz', 'и': 'i', 'і': 'i', 'ї': 'ji', 'й': 'j', 'ј': 'j', 'к': 'k', 'л': 'l',
+    'љ': 'lj', 'м': 'm', 'н': 'n', 'њ': 'nj', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'ќ': 'kj',
+    'ћ': 'c', 'у': 'u', 'ў': 'u', 'ф': 'f', 'х': 'h', 'ц': 'c', 'ч': 'c', 'џ': 'dz', 'ш': 's', 'щ': 'sc',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'ju', 'я': 'ja', 'ґ': 'g',
+}
+
+# Latin letters that do not decompose into a base letter and a diacritic
+_LATIN = {'đ': 'dj', 'ł': 'l', 'ß': 'ss', 'æ': 'ae', 'ø': 'o', 'œ': 'oe', 'ı': 'i'}
+
+_FOLD = str.maketrans({**_CYRILLIC, **_LATIN})
+
+# Transliteration digraphs, folded like the single letters they spell
+_DIGRAPHS = (('sh', 's'), ('zh', 'z'), ('ch', 'c'), ('kj', 'c'), ('gj', 'dj'))
+
+_NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+_PHONE_QUERY = re.compile(r'^[\d\s+\-()./]+$')
+
+
+def _fold_token(token: str) -> str:
+    for digraph, letter in _DIGRAPHS:
+        token = token.replace(digraph, letter)
+    return token
+
+
+def name_tokens(text: Optional[str]) -> List[str]:
+    """Folded Latin tokens of a name, in order and without duplicates"""
+    if not text:
+        return []
+    # Fold before decomposing: ќ, ѓ and й would otherwise lose their mark and read as к, г and и
+    text = unicodedata.normalize('NFKD', unicodedata.normalize('NFC', text.lower()).translate(_FOLD))
+    text = ''.join(character for character in text if not unicodedata.combining(character))
+    tokens = []
+    for token in _NON_ALPHANUMERIC.split(text):
+        token = _fold_token(token)
+        if token and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def phone_key(text: Optional[str]) -> Optional[str]:
+    """Reversed significant digits of a phone number, or None when too short to search"""
+    digits = re.sub(r'\D', '', text or '').lstrip('0')
+    return digits[::-1] if len(digits) >= MIN_PHONE_DIGITS else None
+
+
+def is_phone_query(query: str) -> bool:
+    return bool(_PHONE_QUERY.match(query)) and phone_key(query) is not None
+
+
+def _entry(hotel_id: str, reservation_id: str, kind: str, token: str, source: str, field: str, value: str, tokens: List[str]) -> dict:
+    return {
+        "PK": f"RESERVATION#{reservation_id}",
+        "SK": f"SEARCH#{kind}#{token}#{source}",
+        "EntityType": "SearchEntry",
+        "HotelId": hotel_id,
+        "ReservationId": reservation_id,
+        "Field": field,
+        "Value": value,
+        "Tokens": tokens,
+        "GSI6PK": f"SEARCH#{hotel_id}",
+        "GSI6SK": f"{kind}#{token}#{reservation_id}#{source}",
+    }
+
+
+def search_entries(reservation: dict, guests: Optional[list]) -> Dict[str, dict]:
+    """
+    Search entries of a reservation item by SK. With guests=None only the
+    contact entries are built (see entry_source).
+    """
+    if reservation.get('IsDeleted') or not reservation.get('HotelId'):
+        return {}
+    hotel_id = reservation['HotelId']
+    reservation_id = reservation['PK'].split('#', 1)[1]
+    entries = []
+
+    contact = ' '.join(part for part in (reservation.get('ContactName'), reservation.get('ContactLastName')) if part)
+    tokens = name_tokens(contact)
+    entries.extend(_entry(hotel_id, reservation_id, NAME, token, CONTACT_SOURCE, 'contact', contact, tokens) for token in tokens)
+
+    phone = phone_key(reservation.get('ContactPhone'))
+    if phone:
+        entries.append(_entry(hotel_id, reservation_id, PHONE, phone, CONTACT_SOURCE, 'phone', reservation['ContactPhone'], [phone]))
+
+    for i, guest in enumerate(guests or []):
+        name = ' '.join(part for part in (guest.get('first_name'), guest.get('last_name')) if part)
+        tokens = name_tokens(name)
+        entries.extend(_entry(hotel_id, reservation_id, NAME, token, f"PERSON{i+1}", 'guest', name, tokens) for token in tokens)
+
+    return {entry['SK']: entry for entry in entries}
+
+
+def entry_source(sk: str) -> str:
+    return sk.rsplit('#', 1)[1]
+
+
+def parse_query(query: str):
+    """(kind, tokens) of a search query; raises ValueError when there is nothing to search for"""
+    query = (query or '').strip()
+    if is_phone_query(query):
+        return PHONE, [phone_key(query)]
+    tokens = name_tokens(query)
+    if not tokens:
+        raise ValueError("Search query must contain a name or at least 4 digits of a phone number")
+    return NAME, tokens
+
+
+def matches(entry: dict, kind: str, tokens: List[str]) -> bool:
+    """Whether every query token is a prefix of one of the entry's tokens"""
+    entry_tokens = entry.get('Tokens') or []
+    if kind == PHONE:
+        return any(token.startswith(tokens[0]) for token in entry_tokens)
+    return all(any(token.startswith(query_token) for token in entry_tokens) for query_token in tokens)
@@ -0,0 +1,90 @@
+"""
+Request coalescing for identical concurrent reads within a worker process.
+
+The first caller of a read becomes its leader and runs the DynamoDB fetch;
+callers arriving with the same key while it is in flight wait for that fetch
+and get the same result (or exception), unless their own request deadline
+passes first. Nothing is cached once the fetch has finished, so results are
+exactly as fresh as without coalescing. Shared results are handed to several
+callers and must not be mutated.
+"""
+import functools
+import threading
+from typing import Callable, Dict, Hashable
+
+from ..db import deadline
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def do(self, key: tuple, fetch: Callable):
+        """Run `fetch` unless an identical call is in flight; key[0] names the read for metrics"""
+        if not self.enabled:
+            return fetch()
+
+        with self._lock:
+            counts = self._counts.setdefault(key[0], {'requests': 0, 'fetches': 0, 'collapsed': 0})
+            counts['requests'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                counts['fetches'] += 1
+            else:
+                counts['collapsed'] += 1
+
+        if not leader:
+            # Wait no longer than this caller's own deadline, which may be earlier than the leader's
+            if not call.done.wait(deadline.remaining()):
+                raise deadline.DeadlineExceededError(f"Request deadline exceeded waiting for {key[0]}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fetch()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def coalesce(self, name: str):
+        """Decorator coalescing concurrent calls of a read function with equal arguments"""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                key = (name,) + args + tuple(sorted(kwargs.items()))
+                return self.do(key, lambda: function(*args, **kwargs))
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict:
+        with self._lock:
+            reads = {name: dict(counts) for name, counts in self._counts.items()}
+            in_flight = len(self._calls)
+        requests = sum(counts['requests'] for counts in reads.values())
+        collapsed = sum(counts['collapsed'] for counts in reads.values())
+        return {
+            'enabled': self.enabled,
+            'in_flight': in_flight,
+            'requests': requests,
+            'collapsed': collapsed,
+            'collapse_ratio': round(collapsed / requests, 4) if requests else 0.0,
+            'reads': reads,
+        }
@@ -0,0 +1,72 @@
+from booking_system.services.bulk_import import CONFLICT, ImportRow, sweep_conflicts
+from booking_system.services.interval_index import to_ordinal
+
+
+def import_row(number: int, room_id: str, check_in_date: str, check_out_date: str) -> ImportRow:
+    row = ImportRow(number, {'reservation_id': f"n{number}"})
+    row.reservation = {'room_number': room_id, 'check_in_date': check_in_date, 'check_out_date': check_out_date}
+    return row
+
+
+def booking(room_id: str, check_in_date: str, check_out_date: str, reservation_id: str):
+    return room_id, to_ordinal(check_in_date), to_ordinal(check_out_date), reservation_id
+
+
+def test_row_overlapping_an_existing_booking_is_rejected():
+    row = import_row(1, '101', '2024-05-02', '2024-05-04')
+    sweep_conflicts([row], [booking('101', '2024-05-01', '2024-05-03', 'e1')])
+
+    assert row.status == CONFLICT
+    assert 'e1' in row.error
+
+
+def test_back_to_back_with_existing_bookings_is_accepted():
+    row = import_row(1, '101', '2024-05-03', '2024-05-05')
+    sweep_conflicts([row], [
+        booking('101', '2024-05-01', '2024-05-03', 'e1'),
+        booking('101', '2024-05-05', '2024-05-07', 'e2'),
+    ])
+
+    assert row.status is None
+
+
+def test_later_row_overlapping_an_earlier_row_is_rejected():
+    first = import_row(1, '101', '2024-05-01', '2024-05-04')
+    second = import_row(2, '101', '2024-05-03', '2024-05-05')
+    sweep_conflicts([first, second], [])
+
+    assert first.status is None
+    assert second.status == CONFLICT
+    assert 'import row 1' in second.error
+
+
+def test_existing_booking_starting_inside_an_accepted_row_rejects_the_row():
+    row = import_row(1, '101', '2024-05-01', '2024-05-05')
+    sweep_conflicts([row], [booking('101', '2024-05-03', '2024-05-04', 'e1')])
+
+    assert row.status == CONFLICT
+    assert 'e1' in row.error
+
+
+def test_existing_booking_starting_on_the_same_day_wins():
+    row = import_row(1, '101', '2024-05-01', '2024-05-02')
+    sweep_conflicts([row], [booking('101', '2024-05-01', '2024-05-02', 'e1')])
+
+    assert row.status == CONFLICT
+
+
+def test_rooms_are_swept_independently():
+    rows = [import_row(1, '101', '2024-05-01', '2024-05-03'), import_row(2, '102', '2024-05-01', '2024-05-03')]
+    sweep_conflicts(rows, [booking('103', '2024-05-01', '2024-05-03', 'e1')])
+
+    assert [row.status for row in rows] == [None, None]
+
+
+def test_rows_already_rejected_are_skipped():
+    rejected = import_row(1, '101', '2024-05-01', '2024-05-04')
+    rejected.reject('invalid', 'bad row')
+    row = import_row(2, '101', '2024-05-02', '2024-05-03')
+    sweep_conflicts([rejected, row], [])
+
+    assert rejected.status == 'invalid'
+    assert row.status is None
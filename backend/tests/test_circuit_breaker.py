@@ -0,0 +1,89 @@
+import pytest
+from botocore.exceptions import EndpointConnectionError, ReadTimeoutError
+
+from booking_system.db.client import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ServiceUnavailableError
+from booking_system.db.deadline import DeadlineExceededError
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def failed_call(breaker, exception):
+    breaker.before_call()
+    breaker.after_call_error(exception=exception)
+
+
+def test_opens_after_consecutive_transport_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    for _ in range(2):
+        failed_call(breaker, EndpointConnectionError(endpoint_url='http://dynamodb'))
+    assert breaker.state == CLOSED
+
+    failed_call(breaker, ReadTimeoutError(endpoint_url='http://dynamodb'))
+
+    assert breaker.state == OPEN
+    with pytest.raises(ServiceUnavailableError):
+        breaker.before_call()
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    failed_call(breaker, EndpointConnectionError(endpoint_url='http://dynamodb'))
+    breaker.before_call()
+    breaker.after_call(http_response=Response(200), parsed={})
+    failed_call(breaker, EndpointConnectionError(endpoint_url='http://dynamodb'))
+
+    assert breaker.state == CLOSED
+
+
+def test_server_errors_and_throttling_count_as_degraded():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    breaker.before_call()
+    breaker.after_call(http_response=Response(500), parsed={})
+    breaker.before_call()
+    breaker.after_call(http_response=Response(400), parsed={'Error': {'Code': 'ThrottlingException'}})
+
+    assert breaker.state == OPEN
+
+
+@pytest.mark.parametrize('exception', [
+    DeadlineExceededError("deadline passed"),
+    ServiceUnavailableError("rejected"),
+    ValueError("not a transport error"),
+])
+def test_errors_that_say_nothing_about_dynamodb_do_not_count(exception):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+
+    failed_call(breaker, exception)
+
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+def test_half_open_trial_released_by_an_unrelated_error():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    failed_call(breaker, EndpointConnectionError(endpoint_url='http://dynamodb'))
+    assert breaker.state == OPEN
+
+    # The trial call runs out of request deadline: the next call may try again
+    failed_call(breaker, DeadlineExceededError("deadline passed"))
+    assert breaker.state == HALF_OPEN
+
+    breaker.before_call()
+    breaker.after_call(http_response=Response(200), parsed={})
+    assert breaker.state == CLOSED
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    failed_call(breaker, EndpointConnectionError(endpoint_url='http://dynamodb'))
+
+    breaker.before_call()
+    with pytest.raises(ServiceUnavailableError):
+        breaker.before_call()
+
+    breaker.after_call_error(exception=EndpointConnectionError(endpoint_url='http://dynamodb'))
+    assert breaker.state == OPEN
@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+from booking_system.services.daily_stats import merge_contributions, stay_contributions
+
+
+def test_stay_counts_nights_arrival_and_departure():
+    days = stay_contributions('2024-05-01', '2024-05-03', 2, room_price='50.5', transport_price=10)
+
+    assert set(days) == {'2024-05-01', '2024-05-02', '2024-05-03'}
+    assert days['2024-05-01'] == {
+        'RoomsSold': 1, 'Guests': 2, 'RoomRevenue': Decimal('50.5'),
+        'Arrivals': 1, 'TransportRevenue': Decimal('10'),
+    }
+    assert days['2024-05-02'] == {'RoomsSold': 1, 'Guests': 2, 'RoomRevenue': Decimal('50.5')}
+    # No night is sold on the check-out day
+    assert days['2024-05-03'] == {'Departures': 1}
+
+
+def test_missing_prices_count_as_zero():
+    days = stay_contributions('2024-05-01', '2024-05-02', 1)
+
+    assert days['2024-05-01']['RoomRevenue'] == 0
+    assert days['2024-05-01']['TransportRevenue'] == 0
+
+
+def test_negative_sign_reverses_every_counter():
+    added = stay_contributions('2024-05-01', '2024-05-03', 2, room_price=40)
+    removed = stay_contributions('2024-05-01', '2024-05-03', 2, room_price=40, sign=-1)
+
+    assert merge_contributions([added, removed]) == {}
+
+
+def test_moving_a_stay_nets_out_the_shared_nights():
+    before = stay_contributions('2024-05-01', '2024-05-04', 1, room_price=30, sign=-1)
+    after = stay_contributions('2024-05-02', '2024-05-04', 1, room_price=30)
+
+    assert merge_contributions([before, after]) == {
+        '2024-05-01': {'RoomsSold': -1, 'Guests': -1, 'RoomRevenue': Decimal('-30'), 'Arrivals': -1},
+        '2024-05-02': {'Arrivals': 1},
+    }
+
+
+def test_stay_across_month_end_uses_calendar_days():
+    days = stay_contributions('2024-02-28', '2024-03-01', 1)
+
+    assert sorted(days) == ['2024-02-28', '2024-02-29', '2024-03-01']
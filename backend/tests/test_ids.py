@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+
+from booking_system.db import ids
+from booking_system.db.ids import (
+    MAX_RANDOM, UlidGenerator, encode, from_timestamp, id_bounds, is_ulid, previous_id, timestamp_ms, to_datetime,
+)
+
+
+def test_encode_round_trips_the_timestamp():
+    ulid = encode(1714521600000, 12345)
+
+    assert is_ulid(ulid)
+    assert len(ulid) == 26
+    assert timestamp_ms(ulid) == 1714521600000
+    assert to_datetime(ulid) == datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+def test_ids_sort_by_creation_time():
+    assert encode(1000, MAX_RANDOM) < encode(1001, 0)
+    assert encode(1000, 1) < encode(1000, 2)
+
+
+def test_generator_is_strictly_increasing_within_a_millisecond(monkeypatch):
+    monkeypatch.setattr(ids.time, 'time_ns', lambda: 1714521600000 * 1_000_000)
+    generator = UlidGenerator()
+
+    generated = [generator.new_id() for _ in range(1000)]
+
+    assert generated == sorted(generated)
+    assert len(set(generated)) == len(generated)
+    assert {timestamp_ms(ulid) for ulid in generated} == {1714521600000}
+
+
+def test_generator_stays_increasing_when_the_clock_steps_back(monkeypatch):
+    clock = iter([2000, 1000, 1000])
+    monkeypatch.setattr(ids.time, 'time_ns', lambda: next(clock) * 1_000_000)
+    generator = UlidGenerator()
+
+    first, second, third = (generator.new_id() for _ in range(3))
+
+    assert first < second < third
+    assert timestamp_ms(third) == 2000
+
+
+def test_exhausted_random_part_borrows_the_next_millisecond(monkeypatch):
+    monkeypatch.setattr(ids.time, 'time_ns', lambda: 1000 * 1_000_000)
+    generator = UlidGenerator()
+    generator.new_id()
+    generator._last_random = MAX_RANDOM
+
+    following = generator.new_id()
+
+    assert timestamp_ms(following) == 1001
+
+
+def test_id_bounds_cover_the_whole_range_inclusive():
+    low, high = id_bounds(1000, 2000)
+
+    assert low == encode(1000, 0)
+    assert high == encode(2000, MAX_RANDOM)
+    assert low <= encode(1000, 0) <= encode(1500, 42) <= encode(2000, MAX_RANDOM) <= high
+    assert not low <= encode(999, MAX_RANDOM) <= high
+    assert not low <= encode(2001, 0) <= high
+
+
+def test_previous_id_sorts_right_before():
+    assert previous_id(encode(1000, 5)) == encode(1000, 4)
+    assert previous_id(encode(1000, 0)) == encode(999, MAX_RANDOM)
+    assert previous_id(encode(0, 0)) == encode(0, 0)
+
+
+def test_from_timestamp_is_deterministic():
+    assert from_timestamp(1000, 'RESERVATION#r1') == from_timestamp(1000, 'RESERVATION#r1')
+    assert from_timestamp(1000, 'RESERVATION#r1') != from_timestamp(1000, 'RESERVATION#r2')
+    assert timestamp_ms(from_timestamp(1000, 'RESERVATION#r1')) == 1000
+
+
+def test_is_ulid_rejects_other_ids():
+    assert not is_ulid('r1')
+    assert not is_ulid('')
+    assert not is_ulid(encode(1000, 0).replace('0', 'I', 1))
@@ -0,0 +1,66 @@
+from booking_system.models.records import ReservationRecord
+from booking_system.services.integrity import INVALID_DATES, OVERLAP, find_overlaps
+
+
+def record(reservation_id: str, room_id: str, check_in_date: str, check_out_date: str, hotel_id: str = 'loc1', is_deleted: bool = False):
+    return ReservationRecord.from_item({
+        'PK': f"RESERVATION#{reservation_id}",
+        'HotelId': hotel_id,
+        'RoomId': room_id,
+        'CheckInDate': check_in_date,
+        'CheckOutDate': check_out_date,
+        'IsDeleted': is_deleted,
+    })
+
+
+def test_overlapping_stays_of_a_room_are_reported_once():
+    issues = find_overlaps([
+        record('a', '101', '2024-05-01', '2024-05-05'),
+        record('b', '101', '2024-05-03', '2024-05-07'),
+    ])
+
+    assert issues == [{
+        'type': OVERLAP,
+        'hotel_id': 'loc1',
+        'room_id': '101',
+        'reservation_id': 'b',
+        'conflicts_with': 'a',
+        'overlap_start': '2024-05-03',
+        'overlap_end': '2024-05-05',
+    }]
+
+
+def test_back_to_back_stays_are_not_overlaps():
+    assert find_overlaps([
+        record('a', '101', '2024-05-01', '2024-05-03'),
+        record('b', '101', '2024-05-03', '2024-05-05'),
+    ]) == []
+
+
+def test_stay_inside_a_long_stay_conflicts_with_the_long_one():
+    issues = find_overlaps([
+        record('long', '101', '2024-05-01', '2024-05-20'),
+        record('short', '101', '2024-05-02', '2024-05-03'),
+        record('later', '101', '2024-05-10', '2024-05-12'),
+    ])
+
+    assert [(issue['reservation_id'], issue['conflicts_with']) for issue in issues] == [('short', 'long'), ('later', 'long')]
+
+
+def test_same_room_in_different_hotels_and_deleted_stays_do_not_conflict():
+    assert find_overlaps([
+        record('a', '101', '2024-05-01', '2024-05-05', hotel_id='loc1'),
+        record('b', '101', '2024-05-01', '2024-05-05', hotel_id='loc2'),
+        record('c', '101', '2024-05-01', '2024-05-05', is_deleted=True),
+    ]) == []
+
+
+def test_stays_with_invalid_dates_are_reported_and_left_out_of_the_sweep():
+    issues = find_overlaps([
+        record('a', '101', '2024-05-05', '2024-05-05'),
+        record('b', '101', 'not a date', '2024-05-05'),
+        record('c', '101', '2024-05-01', '2024-05-06'),
+    ])
+
+    assert sorted(issue['reservation_id'] for issue in issues) == ['a', 'b']
+    assert {issue['type'] for issue in issues} == {INVALID_DATES}
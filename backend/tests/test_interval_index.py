@@ -0,0 +1,76 @@
+from booking_system.services.interval_index import HotelIntervalIndex, RoomIntervals, from_ordinal, to_ordinal
+
+
+def day(iso_date: str) -> int:
+    return to_ordinal(iso_date)
+
+
+def test_ordinals_round_trip_and_ignore_time():
+    assert from_ordinal(to_ordinal('2024-02-29')) == '2024-02-29'
+    assert to_ordinal('2024-03-01T14:00:00') == to_ordinal('2024-03-01')
+
+
+def test_back_to_back_stays_do_not_overlap():
+    room = RoomIntervals()
+    room.add(day('2024-05-01'), day('2024-05-04'), 'a')
+
+    # Check-out day is free for the next arrival, and the night before check-in is free too
+    assert room.overlapping(day('2024-05-04'), day('2024-05-06')) == []
+    assert room.overlapping(day('2024-04-28'), day('2024-05-01')) == []
+    assert [stay[2] for stay in room.overlapping(day('2024-05-03'), day('2024-05-05'))] == ['a']
+
+
+def test_long_stay_starting_well_before_the_query_is_found():
+    room = RoomIntervals()
+    room.add(day('2024-01-01'), day('2024-03-01'), 'long')
+    room.add(day('2024-02-10'), day('2024-02-11'), 'short')
+
+    found = room.overlapping(day('2024-02-20'), day('2024-02-21'))
+    assert [stay[2] for stay in found] == ['long']
+
+
+def test_excluded_reservation_does_not_conflict_with_itself():
+    room = RoomIntervals()
+    room.add(day('2024-05-01'), day('2024-05-04'), 'a')
+
+    assert room.overlapping(day('2024-05-02'), day('2024-05-03'), exclude_reservation_id='a') == []
+
+
+def test_free_slots_between_and_around_stays():
+    room = RoomIntervals()
+    room.add(day('2024-05-03'), day('2024-05-05'), 'a')
+    room.add(day('2024-05-05'), day('2024-05-07'), 'b')
+
+    assert room.free_slots(day('2024-05-01'), day('2024-05-10')) == [
+        (day('2024-05-01'), day('2024-05-03')),
+        (day('2024-05-07'), day('2024-05-10')),
+    ]
+    assert room.free_slots(day('2024-05-03'), day('2024-05-07')) == []
+
+
+def test_remove_frees_the_nights():
+    room = RoomIntervals()
+    room.add(day('2024-05-01'), day('2024-05-04'), 'a')
+
+    assert room.remove('a')
+    assert not room.remove('a')
+    assert room.overlapping(day('2024-05-01'), day('2024-05-04')) == []
+
+
+def test_hotel_index_moves_a_re_added_reservation():
+    index = HotelIntervalIndex('loc1', 1, day('2024-01-01'), day('2025-01-01'))
+    index.add('101', day('2024-05-01'), day('2024-05-04'), 'a')
+    index.add('102', day('2024-05-01'), day('2024-05-04'), 'a')
+
+    assert len(index) == 1
+    assert index.is_available('101', day('2024-05-01'), day('2024-05-04'))
+    assert not index.is_available('102', day('2024-05-02'), day('2024-05-03'))
+    assert index.free_slots('103', day('2024-05-01'), day('2024-05-04')) == [(day('2024-05-01'), day('2024-05-04'))]
+
+
+def test_hotel_index_covers_only_its_window():
+    index = HotelIntervalIndex('loc1', 1, day('2024-01-01'), day('2024-12-31'))
+
+    assert index.covers(day('2024-01-01'), day('2024-12-31'))
+    assert not index.covers(day('2023-12-31'), day('2024-01-02'))
+    assert not index.covers(day('2024-12-30'), day('2025-01-01'))
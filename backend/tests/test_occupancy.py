@@ -0,0 +1,65 @@
+from datetime import date
+
+from booking_system.services.occupancy import (
+    EMPTY_YEAR, YEAR_BYTES, OccupancyMatrix, decode_nights, nights_by_year, set_nights, year_start,
+)
+
+
+def day(iso_date: str) -> int:
+    return date.fromisoformat(iso_date).toordinal()
+
+
+def test_stay_across_new_year_is_split_per_year():
+    assert nights_by_year(day('2023-12-30'), day('2024-01-02')) == {
+        2023: (363, 365),
+        2024: (0, 1),
+    }
+
+
+def test_stay_ending_on_january_first_stays_in_its_year():
+    assert nights_by_year(day('2023-12-31'), day('2024-01-01')) == {2023: (364, 365)}
+
+
+def test_leap_day_is_night_59():
+    assert nights_by_year(day('2024-02-29'), day('2024-03-01')) == {2024: (59, 60)}
+    assert nights_by_year(day('2024-12-31'), day('2025-01-01')) == {2024: (365, 366)}
+
+
+def test_set_and_clear_nights_round_trip():
+    blob = set_nights(None, 0, 3, True)
+    assert len(blob) == YEAR_BYTES
+    assert decode_nights(blob)[:4].tolist() == [True, True, True, False]
+
+    blob = set_nights(blob, 1, 2, False)
+    assert decode_nights(blob)[:4].tolist() == [True, False, True, False]
+    assert set_nights(blob, 0, 3, False) == EMPTY_YEAR
+
+
+def test_last_night_of_a_leap_year_fits_the_bitmap():
+    blob = set_nights(None, 365, 366, True)
+    assert decode_nights(blob)[365]
+    assert decode_nights(blob).sum() == 1
+
+
+def test_matrix_loads_both_years_of_a_window_across_new_year():
+    matrix = OccupancyMatrix(['101'], day('2023-12-30'), day('2024-01-03'))
+    for year, (first, last) in nights_by_year(day('2023-12-31'), day('2024-01-02')).items():
+        matrix.load_year('101', year, set_nights(None, first, last, True))
+
+    assert matrix.nights[0].tolist() == [False, True, True, False]
+    assert not matrix.is_free('101', day('2023-12-31'), day('2024-01-01'))
+    assert matrix.is_free('101', day('2024-01-02'), day('2024-01-03'))
+
+
+def test_mark_clips_to_the_window_and_counts_sold_rooms():
+    matrix = OccupancyMatrix(['101', '102'], day('2024-01-01'), day('2024-01-05'))
+    matrix.mark('101', day('2023-12-20'), day('2024-01-02'))
+    matrix.mark('102', day('2024-01-04'), day('2024-01-10'))
+    matrix.mark('999', day('2024-01-01'), day('2024-01-05'))
+
+    assert matrix.occupied_counts().tolist() == [1, 0, 0, 1]
+    assert matrix.free_rooms(day('2024-01-02'), day('2024-01-04')) == ['101', '102']
+
+
+def test_year_start_is_january_first():
+    assert year_start(2024) == day('2024-01-01')
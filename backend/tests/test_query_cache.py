@@ -0,0 +1,77 @@
+from booking_system.services.query_cache import LocalLRUBackend, QueryCache
+
+
+def cache(max_bytes=1 << 20):
+    return QueryCache(LocalLRUBackend(max_bytes), ttl_seconds=60)
+
+
+def test_hit_returns_a_private_copy():
+    query_cache = cache()
+    query_cache.put('hotel1', 3, ('2024-05-01', '2024-05-31'), [{'id': 'r1'}])
+
+    first = query_cache.get('hotel1', 3, ('2024-05-01', '2024-05-31'))
+    first.append({'id': 'r2'})
+
+    assert query_cache.get('hotel1', 3, ('2024-05-01', '2024-05-31')) == [{'id': 'r1'}]
+
+
+def test_new_version_misses():
+    query_cache = cache()
+    query_cache.put('hotel1', 3, ('2024-05-01',), ['old'])
+
+    assert query_cache.get('hotel1', 4, ('2024-05-01',)) is None
+    assert query_cache.get('hotel2', 3, ('2024-05-01',)) is None
+    assert query_cache.get('hotel1', 3, ('2024-05-02',)) is None
+
+
+def test_stats_count_hits_and_misses():
+    query_cache = cache()
+    query_cache.put('hotel1', 1, ('q',), 'result')
+    query_cache.get('hotel1', 1, ('q',))
+    query_cache.get('hotel1', 2, ('q',))
+    query_cache.get('hotel1', 1, ('q',))
+
+    stats = query_cache.stats()
+
+    assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (2, 1, 0.6667)
+    assert stats['backend'] == 'local'
+    assert stats['entries'] == 1
+
+
+def test_lru_evicts_least_recently_used_within_the_byte_budget():
+    backend = LocalLRUBackend(max_bytes=30)
+    backend.set('a', b'x' * 10, 60)
+    backend.set('b', b'x' * 10, 60)
+    backend.set('c', b'x' * 10, 60)
+    backend.get('a')
+    backend.set('d', b'x' * 10, 60)
+
+    assert backend.get('b') is None
+    assert all(backend.get(key) is not None for key in ('a', 'c', 'd'))
+    assert backend.stats()['memory_bytes'] == 30
+
+
+def test_lru_replacing_a_key_keeps_the_size_exact():
+    backend = LocalLRUBackend(max_bytes=100)
+    backend.set('a', b'x' * 40, 60)
+    backend.set('a', b'x' * 10, 60)
+
+    assert backend.stats()['memory_bytes'] == 10
+
+
+def test_lru_skips_values_larger_than_the_budget():
+    backend = LocalLRUBackend(max_bytes=10)
+    backend.set('small', b'x' * 5, 60)
+    backend.set('big', b'x' * 11, 60)
+
+    assert backend.get('big') is None
+    assert backend.get('small') == b'x' * 5
+
+
+def test_clear_empties_the_backend():
+    query_cache = cache()
+    query_cache.put('hotel1', 1, ('q',), 'result')
+    query_cache.clear()
+
+    assert query_cache.get('hotel1', 1, ('q',)) is None
+    assert query_cache.stats()['memory_bytes'] == 0
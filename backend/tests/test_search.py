@@ -0,0 +1,58 @@
+import pytest
+
+from booking_system.services.search import NAME, PHONE, matches, name_tokens, parse_query, phone_key
+
+
+@pytest.mark.parametrize('name', ['Петровиќ', 'Петровић', 'Petrović', 'Petrovikj', 'PETROVIC'])
+def test_cyrillic_and_latin_spellings_meet(name):
+    assert name_tokens(name) == ['petrovic']
+
+
+def test_macedonian_letters_fold_before_their_marks_are_dropped():
+    assert name_tokens('Ѓорѓи') == ['djordji']
+    assert name_tokens('Ǵorǵi') == ['gorgi']
+    assert name_tokens('Ѓорѓиевски') == name_tokens('Gjorgjievski')
+
+
+@pytest.mark.parametrize('cyrillic, latin', [
+    ('Шишков', 'Shishkov'),
+    ('Жаклина', 'Zhaklina'),
+    ('Чавдар', 'Chavdar'),
+    ('Ђорђе', 'Đorđe'),
+    ('Јован', 'Jovan'),
+])
+def test_transliteration_digraphs_fold_like_letters(cyrillic, latin):
+    assert name_tokens(cyrillic) == name_tokens(latin)
+
+
+def test_tokens_keep_order_and_drop_duplicates():
+    assert name_tokens('Ана-Марија  Ана Петровска') == ['ana', 'marija', 'petrovska']
+    assert name_tokens('') == []
+    assert name_tokens(None) == []
+
+
+def test_phone_key_reverses_significant_digits():
+    assert phone_key('+389 70 123 456') == '65432107983'
+    assert phone_key('070 123 456') == '65432107'
+    assert phone_key('012') is None
+
+
+def test_local_number_matches_international_entry():
+    entry = {'Tokens': [phone_key('+389 70 123 456')]}
+    kind, tokens = parse_query('070 123 456')
+
+    assert kind == PHONE
+    assert matches(entry, kind, tokens)
+
+
+def test_name_query_matches_token_prefixes():
+    entry = {'Tokens': name_tokens('Марија Петровска')}
+
+    assert matches(entry, *parse_query('petrov mar'))
+    assert not matches(entry, *parse_query('petrov ivan'))
+    assert parse_query('Marija')[0] == NAME
+
+
+def test_query_without_name_or_enough_digits_is_rejected():
+    with pytest.raises(ValueError):
+        parse_query('  -- ')
@@ -0,0 +1,54 @@
+import zlib
+
+from booking_system.db import sharding
+from booking_system.db.sharding import date_partition_key, date_partition_keys, shard_of
+
+
+def test_shard_is_stable_crc32():
+    # Writers and readers in different processes must agree, so no hash() randomisation
+    assert shard_of('hotel1', 8) == zlib.crc32(b'hotel1') % 8
+    assert shard_of('hotel1', 8) == shard_of('hotel1', 8)
+    assert {shard_of(f"res-{i}", 4) for i in range(100)} == {0, 1, 2, 3}
+
+
+def test_one_shard_keeps_the_unsharded_key():
+    assert date_partition_key('2024-05-01', 'hotel1', 'RESERVATION#r1', shards=1) == 'DATE#2024-05-01'
+
+
+def test_shard_by_reservation_or_hotel():
+    by_reservation = date_partition_key('2024-05-01', 'hotel1', 'RESERVATION#r1', shards=4, shard_by='reservation')
+    by_hotel = date_partition_key('2024-05-01', 'hotel1', 'RESERVATION#r1', shards=4, shard_by='hotel')
+
+    assert by_reservation == f"DATE#2024-05-01#{shard_of('RESERVATION#r1', 4)}"
+    assert by_hotel == f"DATE#2024-05-01#{shard_of('hotel1', 4)}"
+    # Without a hotel id the reservation key is the fallback
+    assert date_partition_key('2024-05-01', None, 'RESERVATION#r1', shards=4, shard_by='hotel') == by_reservation
+
+
+def test_readers_query_every_shard_a_writer_can_use(monkeypatch):
+    monkeypatch.setattr(sharding, 'DATE_INDEX_SHARDS', 4)
+    monkeypatch.setattr(sharding, 'DATE_INDEX_SHARD_BY', 'reservation')
+    monkeypatch.setattr(sharding, 'DATE_INDEX_PREVIOUS_SHARDS', 0)
+
+    keys = date_partition_keys('2024-05-01', ['hotel1'])
+
+    assert keys == [f"DATE#2024-05-01#{shard}" for shard in range(4)]
+    assert date_partition_key('2024-05-01', 'hotel1', 'RESERVATION#r1') in keys
+
+
+def test_hotel_sharding_reads_only_the_hotels_shards(monkeypatch):
+    monkeypatch.setattr(sharding, 'DATE_INDEX_SHARDS', 8)
+    monkeypatch.setattr(sharding, 'DATE_INDEX_SHARD_BY', 'hotel')
+    monkeypatch.setattr(sharding, 'DATE_INDEX_PREVIOUS_SHARDS', 0)
+
+    keys = date_partition_keys('2024-05-01', ['hotel1', 'hotel1'])
+
+    assert keys == [f"DATE#2024-05-01#{shard_of('hotel1', 8)}"]
+
+
+def test_pending_migration_also_reads_the_previous_keys(monkeypatch):
+    monkeypatch.setattr(sharding, 'DATE_INDEX_SHARDS', 2)
+    monkeypatch.setattr(sharding, 'DATE_INDEX_SHARD_BY', 'reservation')
+    monkeypatch.setattr(sharding, 'DATE_INDEX_PREVIOUS_SHARDS', 1)
+
+    assert date_partition_keys('2024-05-01') == ['DATE#2024-05-01#0', 'DATE#2024-05-01#1', 'DATE#2024-05-01']
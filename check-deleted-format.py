@@ -1,6 +1,19 @@
 #!/usr/bin/env python3
+"""
+Print the DeletedOn format of a hotel's deleted reservations
+
+Usage: python check-deleted-format.py [--hotel loc1] [--segments 8] [--workers 4] [--rcu 200] [--checkpoint file --job name]
+"""
+import argparse
+import os
+import sys
+
 import boto3
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'src'))
+
+from booking_system.db.parallel_scan import FileCheckpointStore, ParallelScan
+
 # Initialize DynamoDB client
 try:
     session = boto3.Session(profile_name='private')
@@ -10,21 +23,38 @@ except Exception:
 
 table = dynamodb.Table('booking-system')
 
-# Get the deleted reservation to see the exact DeletedOn format
-response = table.scan(
-    FilterExpression='EntityType = :entity_type AND HotelId = :hotel_id AND IsDeleted = :is_deleted',
-    ExpressionAttributeValues={
-        ':entity_type': 'Reservation',
-        ':hotel_id': 'loc1',
-        ':is_deleted': True,
-    }
-)
-
-deleted_reservations = response.get('Items', [])
-print('Deleted reservations in loc1:')
-for reservation in deleted_reservations:
-    print(f'  PK: {reservation["PK"]}')
-    print(f'  DeletedOn: {reservation.get("DeletedOn")}')
-    print(f'  DeletedBy: {reservation.get("DeletedBy")}')
-    print()
+def check_deleted_format(args):
+    # Get the deleted reservations to see the exact DeletedOn format
+    scan = ParallelScan(
+        table,
+        total_segments=args.segments,
+        workers=args.workers,
+        scan_kwargs={
+            'FilterExpression': 'EntityType = :entity_type AND HotelId = :hotel_id AND IsDeleted = :is_deleted',
+            'ExpressionAttributeValues': {
+                ':entity_type': 'Reservation',
+                ':hotel_id': args.hotel,
+                ':is_deleted': True,
+            },
+        },
+        checkpoint_store=FileCheckpointStore(args.checkpoint) if args.checkpoint else None,
+        job_id=args.job,
+        read_capacity_per_second=args.rcu,
+    )
+
+    print(f'Deleted reservations in {args.hotel}:')
+    for reservation in scan.items():
+        print(f'  PK: {reservation["PK"]}')
+        print(f'  DeletedOn: {reservation.get("DeletedOn")}')
+        print(f'  DeletedBy: {reservation.get("DeletedBy")}')
+        print()
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the deleted reservations of a hotel with a parallel scan")
+    parser.add_argument('--hotel', default='loc1')
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rcu', type=float, default=None, help="Read capacity units per second to stay under")
+    parser.add_argument('--checkpoint', help="Checkpoint file; rerun with the same --job to resume")
+    parser.add_argument('--job', default='check-deleted-format')
+    check_deleted_format(parser.parse_args())
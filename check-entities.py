@@ -1,6 +1,22 @@
 #!/usr/bin/env python3
+"""
+List the entity types in the table with a sample of items
+
+Usage: python check-entities.py [--segments 8] [--workers 4] [--rcu 200]
+
+The types are tallied over the whole table, so there is no checkpoint: a
+resumed run would only count the rest of it.
+"""
+import argparse
+import os
+import sys
+
 import boto3
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'src'))
+
+from booking_system.db.parallel_scan import ParallelScan
+
 # Initialize DynamoDB client
 try:
     session = boto3.Session(profile_name='private')
@@ -10,21 +26,41 @@ except Exception:
 
 table = dynamodb.Table('booking-system')
 
-# Get all items to see what entity types exist
-response = table.scan()
-items = response.get('Items', [])
+def check_entities(args):
+    # Read every item to see what entity types exist
+    scan = ParallelScan(
+        table,
+        total_segments=args.segments,
+        workers=args.workers,
+        scan_kwargs={
+            'ProjectionExpression': 'PK, EntityType',
+        },
+        read_capacity_per_second=args.rcu,
+    )
+
+    entity_types = set()
+    samples = []
+    for item in scan.items():
+        if 'EntityType' in item:
+            entity_types.add(item['EntityType'])
+        if len(samples) < 5:
+            samples.append(item)
 
-entity_types = set()
-for item in items:
-    if 'EntityType' in item:
-        entity_types.add(item['EntityType'])
+    print('Available entity types:')
+    for et in sorted(entity_types):
+        print(f'  {et}')
 
-print('Available entity types:')
-for et in sorted(entity_types):
-    print(f'  {et}')
+    print()
+    print('Sample items:')
+    for item in samples:
+        print(f'  PK: {item.get("PK", "N/A")}, EntityType: {item.get("EntityType", "N/A")}')
 
-print()
-print('Sample items:')
-for item in items[:5]:
-    print(f'  PK: {item.get("PK", "N/A")}, EntityType: {item.get("EntityType", "N/A")}')
+    print()
+    print(f'Items scanned: {scan.items_scanned} ({scan.consumed_capacity:.1f} RCU consumed)')
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List the entity types in the table with a parallel scan")
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rcu', type=float, default=None, help="Read capacity units per second to stay under")
+    check_entities(parser.parse_args())
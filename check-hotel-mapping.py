@@ -1,6 +1,23 @@
 #!/usr/bin/env python3
+"""
+List the Hotel items and the deleted reservations of each
+
+Usage: python check-hotel-mapping.py [--segments 8] [--workers 4] [--rcu 200]
+
+Deleted reservations are read with one parallel scan and grouped by hotel
+rather than with a scan per hotel. The groups need the whole table, so there
+is no checkpoint: a resumed run would only report the rest of it.
+"""
+import argparse
+import os
+import sys
+
 import boto3
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'src'))
+
+from booking_system.db.parallel_scan import ParallelScan
+
 # Initialize DynamoDB client
 try:
     session = boto3.Session(profile_name='private')
@@ -10,41 +27,52 @@ except Exception:
 
 table = dynamodb.Table('booking-system')
 
-# Get all hotels
-response = table.scan(
-    FilterExpression="EntityType = :entity_type",
-    ExpressionAttributeValues={
-        ":entity_type": "Hotel"
-    }
-)
-
-hotels = response.get('Items', [])
-print("Available hotels:")
-for hotel in hotels:
-    print(f"  PK: {hotel['PK']}")
-    print(f"  Name: {hotel.get('Name', 'N/A')}")
-    print(f"  CompanyId: {hotel.get('CompanyId', 'N/A')}")
-    print()
-
-# Test deleted reservations for each hotel
-for hotel in hotels:
-    hotel_pk = hotel['PK']
-    hotel_id = hotel_pk.replace('HOTEL#', '') if hotel_pk.startswith('HOTEL#') else hotel_pk
-    
-    print(f"Testing deleted reservations for hotel {hotel_id} (PK: {hotel_pk})")
-    
-    response = table.scan(
-        FilterExpression='EntityType = :entity_type AND HotelId = :hotel_id AND IsDeleted = :is_deleted',
-        ExpressionAttributeValues={
-            ':entity_type': 'Reservation',
-            ':hotel_id': hotel_id,
-            ':is_deleted': True,
-        }
-    )
-    
-    deleted_reservations = response.get('Items', [])
-    print(f"  Deleted reservations found: {len(deleted_reservations)}")
-    for reservation in deleted_reservations:
-        print(f"    {reservation['PK']}: DeletedBy={reservation.get('DeletedBy')}, DeletedOn={reservation.get('DeletedOn')}")
-    print()
+def check_hotel_mapping(args):
+    def scan(filter_expression, expression_values):
+        return ParallelScan(
+            table,
+            total_segments=args.segments,
+            workers=args.workers,
+            scan_kwargs={
+                'FilterExpression': filter_expression,
+                'ExpressionAttributeValues': expression_values,
+            },
+            read_capacity_per_second=args.rcu,
+        )
+
+    # Get all hotels
+    hotels = sorted(scan("EntityType = :entity_type", {":entity_type": "Hotel"}).items(), key=lambda item: item['PK'])
+    print("Available hotels:")
+    for hotel in hotels:
+        print(f"  PK: {hotel['PK']}")
+        print(f"  Name: {hotel.get('Name', 'N/A')}")
+        print(f"  CompanyId: {hotel.get('CompanyId', 'N/A')}")
+        print()
+
+    # Deleted reservations of every hotel, in one pass
+    deleted_by_hotel = {}
+    deleted = scan('EntityType = :entity_type AND IsDeleted = :is_deleted', {
+        ':entity_type': 'Reservation',
+        ':is_deleted': True,
+    })
+    for reservation in deleted.items():
+        deleted_by_hotel.setdefault(reservation.get('HotelId'), []).append(reservation)
+
+    for hotel in hotels:
+        hotel_pk = hotel['PK']
+        hotel_id = hotel_pk.replace('HOTEL#', '') if hotel_pk.startswith('HOTEL#') else hotel_pk
+
+        print(f"Testing deleted reservations for hotel {hotel_id} (PK: {hotel_pk})")
+
+        deleted_reservations = deleted_by_hotel.get(hotel_id, [])
+        print(f"  Deleted reservations found: {len(deleted_reservations)}")
+        for reservation in deleted_reservations:
+            print(f"    {reservation['PK']}: DeletedBy={reservation.get('DeletedBy')}, DeletedOn={reservation.get('DeletedOn')}")
+        print()
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List hotels and their deleted reservations with parallel scans")
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rcu', type=float, default=None, help="Read capacity units per second to stay under")
+    check_hotel_mapping(parser.parse_args())
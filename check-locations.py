@@ -1,6 +1,23 @@
 #!/usr/bin/env python3
+"""
+List the Location items and the deleted reservations of each
+
+Usage: python check-locations.py [--segments 8] [--workers 4] [--rcu 200]
+
+Deleted reservations are read with one parallel scan and grouped by location
+rather than with a scan per location. The groups need the whole table, so there
+is no checkpoint: a resumed run would only report the rest of it.
+"""
+import argparse
+import os
+import sys
+
 import boto3
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'src'))
+
+from booking_system.db.parallel_scan import ParallelScan
+
 # Initialize DynamoDB client
 try:
     session = boto3.Session(profile_name='private')
@@ -10,41 +27,52 @@ except Exception:
 
 table = dynamodb.Table('booking-system')
 
-# Get all locations (hotels)
-response = table.scan(
-    FilterExpression="EntityType = :entity_type",
-    ExpressionAttributeValues={
-        ":entity_type": "Location"
-    }
-)
-
-locations = response.get('Items', [])
-print("Available locations (hotels):")
-for location in locations:
-    print(f"  PK: {location['PK']}")
-    print(f"  Name: {location.get('Name', 'N/A')}")
-    print(f"  CompanyId: {location.get('CompanyId', 'N/A')}")
-    print()
-
-# Test deleted reservations for each location
-for location in locations:
-    location_pk = location['PK']
-    location_id = location_pk.replace('LOCATION#', '') if location_pk.startswith('LOCATION#') else location_pk
-    
-    print(f"Testing deleted reservations for location {location_id} (PK: {location_pk})")
-    
-    response = table.scan(
-        FilterExpression='EntityType = :entity_type AND HotelId = :hotel_id AND IsDeleted = :is_deleted',
-        ExpressionAttributeValues={
-            ':entity_type': 'Reservation',
-            ':hotel_id': location_id,
-            ':is_deleted': True,
-        }
-    )
-    
-    deleted_reservations = response.get('Items', [])
-    print(f"  Deleted reservations found: {len(deleted_reservations)}")
-    for reservation in deleted_reservations:
-        print(f"    {reservation['PK']}: DeletedBy={reservation.get('DeletedBy')}, DeletedOn={reservation.get('DeletedOn')}")
-    print()
+def check_locations(args):
+    def scan(filter_expression, expression_values):
+        return ParallelScan(
+            table,
+            total_segments=args.segments,
+            workers=args.workers,
+            scan_kwargs={
+                'FilterExpression': filter_expression,
+                'ExpressionAttributeValues': expression_values,
+            },
+            read_capacity_per_second=args.rcu,
+        )
+
+    # Get all locations (hotels)
+    locations = sorted(scan("EntityType = :entity_type", {":entity_type": "Location"}).items(), key=lambda item: item['PK'])
+    print("Available locations (hotels):")
+    for location in locations:
+        print(f"  PK: {location['PK']}")
+        print(f"  Name: {location.get('Name', 'N/A')}")
+        print(f"  CompanyId: {location.get('CompanyId', 'N/A')}")
+        print()
+
+    # Deleted reservations of every location, in one pass
+    deleted_by_location = {}
+    deleted = scan('EntityType = :entity_type AND IsDeleted = :is_deleted', {
+        ':entity_type': 'Reservation',
+        ':is_deleted': True,
+    })
+    for reservation in deleted.items():
+        deleted_by_location.setdefault(reservation.get('HotelId'), []).append(reservation)
+
+    for location in locations:
+        location_pk = location['PK']
+        location_id = location_pk.replace('LOCATION#', '') if location_pk.startswith('LOCATION#') else location_pk
+
+        print(f"Testing deleted reservations for location {location_id} (PK: {location_pk})")
+
+        deleted_reservations = deleted_by_location.get(location_id, [])
+        print(f"  Deleted reservations found: {len(deleted_reservations)}")
+        for reservation in deleted_reservations:
+            print(f"    {reservation['PK']}: DeletedBy={reservation.get('DeletedBy')}, DeletedOn={reservation.get('DeletedOn')}")
+        print()
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List locations (hotels) and their deleted reservations with parallel scans")
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rcu', type=float, default=None, help="Read capacity units per second to stay under")
+    check_locations(parser.parse_args())
@@ -150,10 +150,10 @@ const ReservationModal: React.FC<ReservationModalProps> = ({
       console.log('Event resource reservationId:', event.resource?.reservationId);
       
       if (event.id === 'new') {
-        // Generate a unique reservation ID
-        reservationData.reservation_id = `res_${Date.now()}`;
-        console.log('Creating reservation with data:', reservationData);
-        await apiService.createReservation(hotelId, reservationData);
+        // The server generates a time-sortable reservation ID
+        const { reservation_id, ...createData } = reservationData;
+        console.log('Creating reservation with data:', createData);
+        await apiService.createReservation(hotelId, createData);
       } else {
         // Remove reservation_id from payload for updates since it's in the URL
         const { reservation_id, ...updateData } = reservationData;
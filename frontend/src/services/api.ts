@@ -98,7 +98,7 @@ export interface Guest {
 }
 
 export interface Reservation {
-  reservation_id: string;
+  reservation_id?: string;
   room_number: string;
   check_in_date: string;
   check_out_date: string;
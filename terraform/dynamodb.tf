@@ -105,6 +105,48 @@ resource "aws_dynamodb_table" "main" {
     projection_type = "ALL"
   }
 
+  # GSI6 - Reservation search entries by Hotel
+  attribute {
+    name = "GSI6PK"
+    type = "S"
+  }
+
+  attribute {
+    name = "GSI6SK"
+    type = "S"
+  }
+
+  global_secondary_index {
+    name            = "GSI6"
+    hash_key        = "GSI6PK"
+    range_key       = "GSI6SK"
+    projection_type = "ALL"
+  }
+
+  # GSI7 - Reservations by Hotel in creation order (time-sortable ids)
+  attribute {
+    name = "GSI7PK"
+    type = "S"
+  }
+
+  attribute {
+    name = "GSI7SK"
+    type = "S"
+  }
+
+  global_secondary_index {
+    name            = "GSI7"
+    hash_key        = "GSI7PK"
+    range_key       = "GSI7SK"
+    projection_type = "ALL"
+  }
+
+  # Expiry of idempotency records
+  ttl {
+    attribute_name = "ExpiresAt"
+    enabled        = true
+  }
+
   # Point-in-time recovery
   point_in_time_recovery {
     enabled = true